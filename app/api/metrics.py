@@ -0,0 +1,44 @@
+import time
+
+from app.db.metrics import http_request_seconds, http_requests_in_progress
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request until its body is sent.
+
+    Requests are labelled by the matched route template (e.g.
+    /shortest_path/{source}/{target}) rather than the raw path, so
+    the number of series stays bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        method = scope["method"]
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_progress.inc(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_progress.dec(method)
+            route = scope.get("route")
+            http_request_seconds.observe(
+                time.perf_counter() - start,
+                getattr(route, "path", "unmatched"),
+                method,
+                str(status),
+            )
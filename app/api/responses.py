@@ -0,0 +1,199 @@
+import json
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from urllib.parse import parse_qs
+
+from fastapi import Request
+from fastapi.exceptions import HTTPException
+from fastapi.responses import Response, StreamingResponse
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import Receive, Scope, Send
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the standard library encoder
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional: msgpack responses are unavailable without it
+    msgpack = None
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+COLUMNAR_MEDIA_TYPE = "application/vnd.columnar+json"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+FORMAT_PATTERN = "^(json|columnar|msgpack)$"
+
+
+async def _ndjson_lines(records: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    try:
+        async for record in records:
+            yield (json.dumps(record, default=str) + "\n").encode()
+    except Exception as e:
+        # The status line is already sent, so the failure becomes the last record
+        yield (json.dumps({"error": str(e)}) + "\n").encode()
+
+
+def ndjson_response(records: AsyncIterator[Dict[str, Any]]) -> StreamingResponse:
+    """Stream records as newline-delimited JSON, one line per record as it is produced."""
+    return StreamingResponse(_ndjson_lines(records), media_type=NDJSON_MEDIA_TYPE)
+
+
+def wants_ndjson(scope: Scope) -> bool:
+    """Whether the request asks a route for its NDJSON stream (format=ndjson)."""
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return "ndjson" in query.get("format", [])
+
+
+class NDJSONAwareGZipMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware that leaves NDJSON streams alone: the gzip stream is
+    flushed in compressor-sized blocks, so the client would not see records
+    as they are produced.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and wants_ndjson(scope):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+def _is_table(value: Any) -> bool:
+    return isinstance(value, list) and bool(value) and all(isinstance(row, dict) for row in value)
+
+
+def select_fields(payload: Any, fields: Optional[List[str]]) -> Any:
+    """Keep only `fields` in every row of every list of row dicts inside `payload`."""
+    if not fields:
+        return payload
+    if _is_table(payload):
+        return [{k: select_fields(v, fields) for k, v in row.items() if k in fields} for row in payload]
+    if isinstance(payload, dict):
+        return {k: select_fields(v, fields) for k, v in payload.items()}
+    return payload
+
+
+def _entry_key(item: Dict[str, Any]) -> Any:
+    """Hashable identity of a dictionary entry such as {"id": ..., "name": ...}."""
+    key = tuple(item.items())
+    try:
+        hash(key)
+    except TypeError:
+        return json.dumps(item, sort_keys=True, default=str)
+    return key
+
+
+class ColumnarEncoder:
+    """
+    Rewrites lists of row dicts as {"length", "columns"} tables.
+
+    String columns with repeated values become integer codes into a shared
+    dictionary named after the column, and list columns of dicts (such as top
+    artists) become lists of codes into a dictionary of distinct entries, so
+    each country and artist is sent once per response.
+    """
+
+    def __init__(self, fields: Optional[List[str]] = None):
+        self.fields = fields
+        self.dictionaries: Dict[str, List[Any]] = {}
+        self._codes: Dict[str, Dict[Any, int]] = {}
+
+    def _code(self, name: str, value: Any, key: Any) -> int:
+        codes = self._codes.setdefault(name, {})
+        code = codes.get(key)
+        if code is None:
+            code = codes[key] = len(codes)
+            self.dictionaries.setdefault(name, []).append(value)
+        return code
+
+    def _column(self, name: str, values: List[Any]) -> Any:
+        present = [v for v in values if v is not None]
+        if present and all(isinstance(v, str) for v in present) and len(set(present)) < len(present):
+            return [None if v is None else self._code(name, v, v) for v in values]
+        if present and all(isinstance(v, list) for v in present) and all(
+            isinstance(item, dict) for v in present for item in v
+        ):
+            return [
+                None if v is None else [self._code(name, item, _entry_key(item)) for item in v]
+                for v in values
+            ]
+        return [self.encode(v) for v in values]
+
+    def encode(self, value: Any) -> Any:
+        if _is_table(value):
+            keys = list(dict.fromkeys(k for row in value for k in row))
+            if self.fields:
+                keys = [k for k in keys if k in self.fields]
+            return {
+                "length": len(value),
+                "columns": {k: self._column(k, [row.get(k) for row in value]) for k in keys},
+            }
+        if isinstance(value, dict):
+            return {k: self.encode(v) for k, v in value.items()}
+        return value
+
+
+def to_columnar(payload: Any, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    encoder = ColumnarEncoder(fields)
+    data = encoder.encode(payload)
+    return {"format": "columnar", "data": data, "dictionaries": encoder.dictionaries}
+
+
+def dumps_json(payload: Any) -> bytes:
+    """Serialize with orjson when available, else the standard library."""
+    if orjson is not None:
+        return orjson.dumps(
+            payload, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY, default=str
+        )
+    return json.dumps(payload, default=str).encode()
+
+
+def dumps_msgpack(payload: Any) -> bytes:
+    return msgpack.packb(payload, use_bin_type=True, default=str)
+
+
+def requested_format(request: Request, format: Optional[str]) -> str:
+    """The response format from the `format` query parameter, else the Accept header."""
+    if format:
+        return format
+    accept = request.headers.get("accept", "")
+    if any(media in accept for media in MSGPACK_MEDIA_TYPES):
+        return "msgpack"
+    if COLUMNAR_MEDIA_TYPE in accept:
+        return "columnar"
+    return "json"
+
+
+def formatted_response(
+    request: Request, payload: Any, format: Optional[str] = None, fields: Optional[str] = None
+) -> Any:
+    """
+    Render an analytics payload in the format the client asked for.
+
+    "json" returns the payload as is (minus unselected fields) for FastAPI to
+    encode; "columnar" and "msgpack" return the dictionary-encoded columnar
+    form serialized with orjson or msgpack. `fields` is a comma-separated list
+    of row fields to keep.
+    """
+    selected = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    chosen = requested_format(request, format)
+    if chosen == "json":
+        return select_fields(payload, selected)
+
+    start = time.perf_counter()
+    columnar = to_columnar(payload, selected)
+    if chosen == "msgpack":
+        if msgpack is None:
+            raise HTTPException(status_code=406, detail="msgpack responses are not available on this server")
+        body, media_type = dumps_msgpack(columnar), MSGPACK_MEDIA_TYPES[0]
+    else:
+        body, media_type = dumps_json(columnar), COLUMNAR_MEDIA_TYPE
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return Response(
+        content=body,
+        media_type=media_type,
+        headers={"X-Encode-Time-Ms": f"{elapsed_ms:.2f}"},
+    )
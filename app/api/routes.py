@@ -1,53 +1,261 @@
-from fastapi import APIRouter, Depends
-from app.db.neo4j_connection import get_db
-from typing import List, Dict, Any
+import os
+import sys
+from fastapi import APIRouter, Depends, Query, Request
+from app.db.neo4j_connection import driver, get_db
+from typing import List, Dict, Any, AsyncIterator, Literal, Optional, Tuple
 from app.methods import (
     get_shortest_path,
+    get_shortest_paths_batch,
+    get_distance,
+    get_recommendations,
+    get_link_predictions,
+    get_similar_users,
+    get_all_similar_users,
+    get_users_batch,
+    get_connected_nodes_batch,
+    get_common_neighbors_batch,
     get_user_data,
+    get_users_data,
     get_artist_names,
     get_connected_nodes_data,
+    get_connected_nodes_page,
+    get_common_neighbors_page,
     get_common_neighbors_with_data,
     get_artist_name,
     get_community_data,
+    get_community_summary,
     get_pagerank_with_full_metrics,
     get_centrality_analysis,
     get_combined_analysis,
     compare_approaches,
+    stream_path_approaches,
 )
 from fastapi.exceptions import HTTPException
-from pydantic import BaseModel
-from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi import Body
+from app.api.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor
+from app.api.responses import FORMAT_PATTERN, formatted_response, ndjson_response
+from app.methods.graph_snapshot import get_snapshot
+from app.methods.landmarks import get_landmark_index
+from app.methods.taste_index import get_taste_index
+from app.methods.projection import projection_manager
+from app.methods.edge_import import import_edge_stream, write_edges
+from app.methods.jobs import job_manager
+from app.db.cache import cache_stats, notify_graph_write
+from app.db.metrics import render_metrics
+from app.db.graph_version import current_graph_version
 
 router = APIRouter()
-driver = get_db()
+
+MAX_BATCH_PAIRS = int(os.getenv("MAX_BATCH_PAIRS", "100000"))
+MAX_BATCH_IDS = int(os.getenv("MAX_BATCH_IDS", "100000"))
+
+
+async def users_exist(*user_ids: int) -> List[bool]:
+    """Check user existence against the graph snapshot, falling back to Neo4j."""
+    snapshot = await get_snapshot()
+    if snapshot is not None and all(snapshot.has_user(uid) for uid in user_ids):
+        return [True] * len(user_ids)
+
+    async with driver.session() as session:
+        result = await session.run(
+            """
+            UNWIND $ids AS id
+            OPTIONAL MATCH (u:User {id: id})
+            RETURN id, u IS NOT NULL AS exists
+            """,
+            ids=list(user_ids),
+        )
+        return [record["exists"] async for record in result]
 
 
 @router.get("/count_nodes")
-def count_nodes(db=Depends(get_db)):
+async def count_nodes(db=Depends(get_db)):
     query = "MATCH (n) RETURN count(n) AS node_count"
-    with db.session() as session:
-        result = session.run(query)
-        return {"node_count": result.single()["node_count"]}
+    async with db.session() as session:
+        result = await session.run(query)
+        return {"node_count": (await result.single())["node_count"]}
 
 
 @router.get("/shortest_path/{source}/{target}")
-def shortest_path(source:int, target:int) -> Dict[str, Any]:
+async def shortest_path(source:int, target:int) -> Dict[str, Any]:
  
     print(f"Finding shortest path from {source} to {target}")
     
     """Fetch the shortest path between two nodes using Dijkstra in Neo4j."""
-    result = get_shortest_path(source, target)
+    result = await get_shortest_path(source, target)
     
     if "error" in result:
         raise HTTPException(status_code=404, detail=result["error"])
     
     return result
 
+class UserBatchRequest(BaseModel):
+    user_ids: List[int]
+    artist_names: bool = False
+
+
+class PairBatchRequest(BaseModel):
+    pairs: List[Tuple[int, int]]
+    include_users: bool = False
+
+
+def check_batch_size(size: int, limit: int, what: str) -> None:
+    if size > limit:
+        raise HTTPException(status_code=413, detail=f"At most {limit} {what} per request")
+
+
+@router.post("/users/batch")
+async def users_batch(request: UserBatchRequest) -> Dict[str, Any]:
+    """Profiles of many users in one request, as columns aligned with `user_ids`."""
+    check_batch_size(len(request.user_ids), MAX_BATCH_IDS, "user IDs")
+    try:
+        return await get_users_batch(request.user_ids, artist_names=request.artist_names)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/connected_nodes/batch")
+async def connected_nodes_batch(request: UserBatchRequest) -> Dict[str, Any]:
+    """Following and follower IDs of many users, as columns aligned with `user_ids`."""
+    check_batch_size(len(request.user_ids), MAX_BATCH_IDS, "user IDs")
+    try:
+        return await get_connected_nodes_batch(request.user_ids)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/common_neighbors/batch")
+async def common_neighbors_batch(request: PairBatchRequest) -> Dict[str, Any]:
+    """Common neighbor IDs of many user pairs, as columns aligned with `pairs`."""
+    check_batch_size(len(request.pairs), MAX_BATCH_PAIRS, "pairs")
+    try:
+        return await get_common_neighbors_batch(request.pairs, include_users=request.include_users)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/shortest_path/batch")
+async def shortest_path_batch(request: PairBatchRequest) -> Dict[str, Any]:
+    """Shortest paths for many (source, target) pairs in one request, answered from memory."""
+    check_batch_size(len(request.pairs), MAX_BATCH_PAIRS, "pairs")
+    try:
+        return await get_shortest_paths_batch(request.pairs, include_users=request.include_users)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _cursor_after(position: Dict[str, Any], key: str) -> Optional[int]:
+    after = position.get(key)
+    if after == "end":
+        return sys.maxsize  # this list was exhausted on an earlier page
+    if after is not None and not isinstance(after, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return after
+
+
+@router.get("/distance/{source}/{target}")
+async def distance(source: int, target: int, exact: bool = False) -> Dict[str, Any]:
+    """
+    Lower and upper bounds on the directed hop distance from the landmark
+    index; `reachable` is False when a landmark proves there is no path.
+    With exact=true the distance and path are also found with ALT A*.
+    """
+    try:
+        result = await get_distance(source, target, exact=exact)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="User not found in the graph snapshot")
+    return result
+
+
+LINK_METHOD_PATTERN = "^(common_neighbors|jaccard|adamic_adar)$"
+
+
+@router.get("/recommendations")
+async def all_recommendations(
+    request: Request,
+    method: str = Query("adamic_adar", pattern=LINK_METHOD_PATTERN),
+    top_k: int = Query(10, ge=1, le=100),
+    format: Optional[str] = Query(None, pattern=FORMAT_PATTERN),
+    fields: Optional[str] = Query(None, description="Comma-separated row fields to keep"),
+):
+    """Top-k candidate follows for every user, computed in bulk and cached per graph version."""
+    try:
+        result = await get_link_predictions(method=method, top_k=top_k)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return formatted_response(request, result, format, fields)
+
+
+@router.get("/recommendations/{user_id}")
+async def user_recommendations(
+    user_id: int,
+    method: str = Query("adamic_adar", pattern=LINK_METHOD_PATTERN),
+    top_k: int = Query(10, ge=1, le=1000),
+) -> Dict[str, Any]:
+    """
+    Users that `user_id` does not follow yet, ranked by common neighbors,
+    Jaccard or Adamic-Adar over the undirected FOLLOWS graph.
+    """
+    try:
+        candidates = await get_recommendations(user_id, method=method, top_k=top_k)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if candidates is None:
+        raise HTTPException(status_code=404, detail=f"User with ID {user_id} not found")
+    return {"user_id": user_id, "method": method, "candidates": candidates}
+
+
+@router.get("/similar_users")
+async def all_similar_users(
+    request: Request,
+    top_k: int = Query(10, ge=1, le=100),
+    format: Optional[str] = Query(None, pattern=FORMAT_PATTERN),
+    fields: Optional[str] = Query(None, description="Comma-separated row fields to keep"),
+):
+    """Top-k most similar users by top artists for everyone, from the LSH taste index."""
+    try:
+        result = await get_all_similar_users(top_k=top_k)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return formatted_response(request, result, format, fields)
+
+
+@router.get("/similar_users/{user_id}")
+async def similar_users(
+    user_id: int,
+    top_k: int = Query(10, ge=1, le=1000),
+    bands: Optional[int] = Query(None, ge=1, description="LSH bands to probe; fewer is faster with lower recall"),
+) -> Dict[str, Any]:
+    """
+    Users whose top artists overlap most with `user_id`'s, ranked by exact
+    Jaccard over the candidates sharing an LSH bucket with them.
+    """
+    try:
+        result = await get_similar_users(user_id, top_k=top_k, bands=bands)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"User with ID {user_id} not found")
+    return result
+
+
 @router.get("/connected_nodes/{user_id}")
-def connected_nodes(user_id: int) -> Dict[str, Any]:
+async def connected_nodes(
+    user_id: int,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+) -> Dict[str, Any]:
     """
     Get users connected to the specified user, separated into followers and following.
 
+    With `limit` (or a `cursor`), both lists are paged by ID: each page holds
+    up to `limit` IDs per list, the counts are the full degrees, and
+    `next_cursor` fetches the next page (None after the last one).
+
     Returns:
     - Detailed information about the specified user (ID, country, top artists)
     - List of user IDs that the specified user follows
@@ -55,19 +263,29 @@ def connected_nodes(user_id: int) -> Dict[str, Any]:
     - Count of each category
     """
     # Get user data
-    user_data = get_user_data(user_id)
+    user_data = await get_user_data(user_id)
     if not user_data:
         raise HTTPException(status_code=404, detail=f"User with ID {user_id} not found")
 
-    # Get connected nodes (followers and following)
-    connected = get_connected_nodes_data(user_id)
+    paged = limit is not None or cursor is not None
+    if paged:
+        position = decode_cursor(cursor)
+        connected = await get_connected_nodes_page(
+            user_id,
+            limit or DEFAULT_PAGE_SIZE,
+            after_following=_cursor_after(position, "following"),
+            after_followers=_cursor_after(position, "followers"),
+        )
+    else:
+        # Get connected nodes (followers and following)
+        connected = await get_connected_nodes_data(user_id)
 
     # Get artist names for the user
     top_artists = []
     if user_data.get("top_artists"):
-        top_artists = get_artist_names(user_data["top_artists"][:10])
+        top_artists = await get_artist_names(user_data["top_artists"][:10])
 
-    return {
+    response = {
         "user": {
             "id": user_id,
             "country_code": user_data.get("country_code"),
@@ -76,13 +294,29 @@ def connected_nodes(user_id: int) -> Dict[str, Any]:
         },
         "following": connected["following"],
         "followers": connected["followers"],
-        "following_count": len(connected["following"]),
-        "followers_count": len(connected["followers"]),
+        "following_count": connected.get("following_total", len(connected["following"])),
+        "followers_count": connected.get("followers_total", len(connected["followers"])),
     }
+    if paged:
+        next_position = {}
+        for key in ("following", "followers"):
+            page = connected[key]
+            if connected[f"{key}_more"]:
+                next_position[key] = page[-1]
+            else:
+                next_position[key] = "end"
+        more = connected["following_more"] or connected["followers_more"]
+        response["next_cursor"] = encode_cursor(next_position) if more else None
+    return response
 
 
 @router.get("/common_neighbors/{user1_id}/{user2_id}")
-def common_neighbors(user1_id: int, user2_id: int) -> Dict[str, Any]:
+async def common_neighbors(
+    user1_id: int,
+    user2_id: int,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+) -> Dict[str, Any]:
     """
     Get all users that are common neighbors of the two specified users,
     along with detailed information about each common neighbor.
@@ -90,6 +324,8 @@ def common_neighbors(user1_id: int, user2_id: int) -> Dict[str, Any]:
     Parameters:
         - user1_id: ID of the first user
         - user2_id: ID of the second user
+        - limit / cursor: page the neighbors by ID; only the returned page is
+          hydrated, `count` is the total and `next_cursor` fetches the next page
 
     Returns:
         - Information about the two specified users
@@ -97,13 +333,7 @@ def common_neighbors(user1_id: int, user2_id: int) -> Dict[str, Any]:
         - Count of common neighbors
     """
     # Verify users exist
-    with driver.session() as session:
-        user1_exists = session.run(
-            "MATCH (u:User {id: $id}) RETURN count(u) > 0 AS exists", id=user1_id
-        ).single()["exists"]
-        user2_exists = session.run(
-            "MATCH (u:User {id: $id}) RETURN count(u) > 0 AS exists", id=user2_id
-        ).single()["exists"]
+    user1_exists, user2_exists = await users_exist(user1_id, user2_id)
 
     if not user1_exists:
         raise HTTPException(
@@ -114,8 +344,21 @@ def common_neighbors(user1_id: int, user2_id: int) -> Dict[str, Any]:
             status_code=404, detail=f"User with ID {user2_id} not found"
         )
 
+    if limit is not None or cursor is not None:
+        position = decode_cursor(cursor)
+        page = await get_common_neighbors_page(
+            user1_id, user2_id, limit or DEFAULT_PAGE_SIZE, after=_cursor_after(position, "after")
+        )
+        return {
+            "user1_id": user1_id,
+            "user2_id": user2_id,
+            "common_neighbors": page["common_neighbors"],
+            "count": page["total"],
+            "next_cursor": encode_cursor({"after": page["last_id"]}) if page["has_more"] else None,
+        }
+
     # Get common neighbors with their data
-    common_neighbors = get_common_neighbors_with_data(user1_id, user2_id)
+    common_neighbors = await get_common_neighbors_with_data(user1_id, user2_id)
 
     return {
         "user1_id": user1_id,
@@ -125,8 +368,86 @@ def common_neighbors(user1_id: int, user2_id: int) -> Dict[str, Any]:
     }
 
 
+# Paths hydrated per user lookup while streaming all shortest paths
+ALL_PATHS_CHUNK = 100
+
+
+def _path_node(node_id: int, user_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    # Get artist names
+    top_artists = []
+    if user_data and user_data.get("top_artists"):
+        top_artists = get_artist_name(user_data["top_artists"][:10])
+
+    return {
+        "id": node_id,
+        "country_code": user_data.get("country_code") if user_data else None,
+        "country_name": user_data.get("country_name") if user_data else None,
+        "top_artists": top_artists,
+    }
+
+
+async def iter_all_shortest_paths(
+    user1_id: int, user2_id: int, chunk_size: Optional[int] = ALL_PATHS_CHUNK
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield every shortest path as it comes off the result cursor.
+
+    Paths are hydrated `chunk_size` at a time with one user lookup per chunk,
+    and each distinct node is looked up only once. With chunk_size=None all
+    paths are read first and hydrated with a single lookup.
+    """
+    nodes: Dict[int, Dict[str, Any]] = {}
+
+    async def hydrate(chunk: List[List[int]]) -> List[Dict[str, Any]]:
+        new_ids = list({node_id for ids in chunk for node_id in ids if node_id not in nodes})
+        users = await get_users_data(new_ids)
+        for node_id in new_ids:
+            nodes[node_id] = _path_node(node_id, users.get(node_id))
+        return [
+            {
+                "path_nodes": [nodes[node_id] for node_id in ids],
+                "length": len(ids) - 1,  # Number of hops
+            }
+            for ids in chunk
+        ]
+
+    async with driver.session() as session:
+        result = await session.run(
+            """
+            MATCH (source:User {id: $user1_id}), (target:User {id: $user2_id})
+            MATCH paths = ALL SHORTEST (source)-[:FOLLOWS*]-(target)
+            RETURN [node IN nodes(paths) | node.id] AS node_ids
+            """,
+            user1_id=user1_id,
+            user2_id=user2_id,
+        )
+        chunk = []
+        async for record in result:
+            chunk.append(record["node_ids"])
+            if chunk_size is not None and len(chunk) >= chunk_size:
+                for path in await hydrate(chunk):
+                    yield path
+                chunk = []
+        for path in await hydrate(chunk):
+            yield path
+
+
+async def _with_path_summary(
+    paths: AsyncIterator[Dict[str, Any]], user1_id: int, user2_id: int
+) -> AsyncIterator[Dict[str, Any]]:
+    count = 0
+    async for path in paths:
+        count += 1
+        yield path
+    yield {"summary": {"source_id": user1_id, "target_id": user2_id, "path_count": count}}
+
+
 @router.get("/all_shortest_paths/{user1_id}/{user2_id}")
-def all_shortest_paths(user1_id: int, user2_id: int) -> Dict[str, Any]:
+async def all_shortest_paths(
+    user1_id: int,
+    user2_id: int,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+):
     """
     Find all shortest paths between two users.
 
@@ -137,6 +458,8 @@ def all_shortest_paths(user1_id: int, user2_id: int) -> Dict[str, Any]:
     Parameters:
         - user1_id: ID of the first user
         - user2_id: ID of the second user
+        - format: "ndjson" streams one path per line as it is found, followed
+          by a {"summary": ...} line
 
     Returns:
         - Information about source and target users
@@ -144,13 +467,7 @@ def all_shortest_paths(user1_id: int, user2_id: int) -> Dict[str, Any]:
         - Count of paths found
     """
     # Verify users exist
-    with driver.session() as session:
-        user1_exists = session.run(
-            "MATCH (u:User {id: $id}) RETURN count(u) > 0 AS exists", id=user1_id
-        ).single()["exists"]
-        user2_exists = session.run(
-            "MATCH (u:User {id: $id}) RETURN count(u) > 0 AS exists", id=user2_id
-        ).single()["exists"]
+    user1_exists, user2_exists = await users_exist(user1_id, user2_id)
 
     if not user1_exists:
         raise HTTPException(
@@ -161,55 +478,12 @@ def all_shortest_paths(user1_id: int, user2_id: int) -> Dict[str, Any]:
             status_code=404, detail=f"User with ID {user2_id} not found"
         )
 
-    # Find all shortest paths
-    with driver.session() as session:
-        result = session.run(
-            """
-            MATCH (source:User {id: $user1_id}), (target:User {id: $user2_id})
-            MATCH paths = ALL SHORTEST (source)-[:FOLLOWS*]-(target)
-            RETURN paths
-            """,
-            user1_id=user1_id,
-            user2_id=user2_id,
-        )
-
-        all_paths = []
-        for record in result:
-            path = record["paths"]
-            path_nodes = []
-
-            # Process each node in the path
-            for node in path.nodes:
-                node_id = node["id"]
-
-                # Get user data including country and artists
-                user_data = get_user_data(node_id)
-
-                # Get artist names
-                top_artists = []
-                if user_data and user_data.get("top_artists"):
-                    top_artists = get_artist_name(user_data["top_artists"][:10])
-
-                path_nodes.append(
-                    {
-                        "id": node_id,
-                        "country_code": (
-                            user_data.get("country_code") if user_data else None
-                        ),
-                        "country_name": (
-                            user_data.get("country_name") if user_data else None
-                        ),
-                        "top_artists": top_artists,
-                    }
-                )
-
-            all_paths.append(
-                {
-                    "path_nodes": path_nodes,
-                    "length": len(path_nodes) - 1,  # Number of hops
-                }
-            )
+    if format == "ndjson":
+        paths = iter_all_shortest_paths(user1_id, user2_id)
+        return ndjson_response(_with_path_summary(paths, user1_id, user2_id))
 
+    # One user lookup for every path, however many there are
+    all_paths = [path async for path in iter_all_shortest_paths(user1_id, user2_id, chunk_size=None)]
     return {
         "source_id": user1_id,
         "target_id": user2_id,
@@ -224,7 +498,7 @@ class PathCreateRequest(BaseModel):
     path_nodes: List[int]
 
 @router.post("/add_path")
-def add_path(request: PathCreateRequest) -> Dict[str, Any]:
+async def add_path(request: PathCreateRequest) -> Dict[str, Any]:
     """
     Add a path between nodes in the given order: node_ids[0] -> node_ids[1] -> ... -> node_ids[n]
     Creates FOLLOWS relationships if they don't already exist.
@@ -233,56 +507,326 @@ def add_path(request: PathCreateRequest) -> Dict[str, Any]:
     if len(request.path_nodes) < 2:
         raise HTTPException(status_code=400, detail="At least two nodes are required to create a path.")
 
-    with driver.session() as session:
-        for i in range(len(request.path_nodes) - 1):
-            source_id = request.path_nodes[i]
-            target_id = request.path_nodes[i + 1]
-
-            session.run(
-                """
-                MATCH (source:User {id: $source_id}), (target:User {id: $target_id})
-                MERGE (source)-[:FOLLOWS]->(target)
-                """,
-                source_id=source_id,
-                target_id=target_id
-            )
+    # All pairs are written in one transaction, so a failure leaves no partial path
+    result = await write_edges(list(zip(request.path_nodes, request.path_nodes[1:])))
+    # Only new edges change the graph; re-merged ones leave caches valid
+    if result["created_edges"]:
+        notify_graph_write(result["created_edges"])
 
     return {
         "message": "Path added successfully.",
-        "path": request.path_nodes
+        "path": request.path_nodes,
+        "edges_created": result["created"],
+        "edges_existing": result["existing"],
+        "edges_missing_users": result["missing"],
     }
 
 
+@router.post("/edges/bulk")
+async def bulk_import_edges(request: Request) -> Dict[str, Any]:
+    """
+    Stream a large FOLLOWS edge list into the graph.
+
+    The body is read incrementally and written in batched transactions. Send
+    NDJSON (`Content-Type: application/x-ndjson`, one `{"source": 1, "target": 2}`
+    or `[1, 2]` per line) or CSV (`text/csv`, `source,target` per line with an
+    optional header row).
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type in ("application/x-ndjson", "application/jsonl", "application/json"):
+        fmt = "ndjson"
+    elif content_type in ("text/csv", "text/plain"):
+        fmt = "csv"
+    else:
+        raise HTTPException(
+            status_code=415,
+            detail="Send the edges as application/x-ndjson or text/csv.",
+        )
+
+    return await import_edge_stream(request.stream(), fmt)
+
+
 @router.get("/community-detection", response_model=Dict[str, Any])
-def community_detection_endpoint():
+async def community_detection_endpoint(
+    request: Request,
+    write: bool = Query(False, description="Also write community IDs to every node"),
+    top_k: int = Query(10, ge=1, le=1000),
+    format: Optional[str] = Query(None, pattern=FORMAT_PATTERN),
+    fields: Optional[str] = Query(None, description="Comma-separated row fields to keep"),
+):
     """Endpoint to retrieve community detection results"""
     try:
-        return get_community_data()
+        result = await get_community_data(write=write, top_k=top_k)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return formatted_response(request, result, format, fields)
+
+
+async def _community_summary_or_404(algorithm: str):
+    if algorithm not in ("louvain", "labelProp"):
+        raise HTTPException(
+            status_code=404, detail="Algorithm must be 'louvain' or 'labelProp'"
+        )
+    try:
+        summary = await get_community_summary(algorithm)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if summary is None:
+        raise HTTPException(status_code=503, detail="Graph snapshot is not available")
+    return summary
+
+
+@router.get("/community-detection/{algorithm}/summary", response_model=Dict[str, Any])
+async def community_summary_endpoint(
+    request: Request,
+    algorithm: str,
+    top_k: int = Query(10, ge=1, le=1000),
+    format: Optional[str] = Query(None, pattern=FORMAT_PATTERN),
+    fields: Optional[str] = Query(None, description="Comma-separated row fields to keep"),
+):
+    """Metrics, largest communities and strongest inter-community links of the latest run."""
+    summary = await _community_summary_or_404(algorithm)
+    result = {
+        "metrics": summary.metrics,
+        "graph_version": summary.graph_version,
+        "largest": summary.largest_communities(top_k),
+        "edges": summary.top_edges(top_k),
+    }
+    return formatted_response(request, result, format, fields)
+
+
+@router.get("/community-detection/{algorithm}/communities/{community_id}", response_model=Dict[str, Any])
+async def community_drilldown_endpoint(
+    algorithm: str,
+    community_id: int,
+    top_k: int = Query(10, ge=1, le=1000),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+) -> Dict[str, Any]:
+    """
+    Strongest links and one page of members (by ID) of one community from the
+    latest run; `next_cursor` fetches the next page of members.
+    """
+    summary = await _community_summary_or_404(algorithm)
+    position = decode_cursor(cursor)
+    after = _cursor_after(position, "after")
+    community = summary.community(community_id, top_k, limit=limit, after=after)
+    if community is None:
+        raise HTTPException(
+            status_code=404, detail=f"Community {community_id} not found in the latest {algorithm} run"
+        )
+    more = community.pop("members_more")
+    community["next_cursor"] = encode_cursor({"after": community["members"][-1]}) if more else None
+    return community
 
 
 @router.get("/top_pagerank_full", response_model=Dict[str, Any])
-def get_top_pagerank_full() -> Dict[str, Any]:
+async def get_top_pagerank_full(
+    request: Request,
+    format: Optional[str] = Query(None, pattern=FORMAT_PATTERN),
+    fields: Optional[str] = Query(None, description="Comma-separated row fields to keep"),
+):
     """Returns ranked users with complete profile data and execution metrics."""
-    return get_pagerank_with_full_metrics()
+    try:
+        result = await get_pagerank_with_full_metrics()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return formatted_response(request, result, format, fields)
 
 @router.get("/centrality-analysis", response_model=Dict[str, Any])
-def get_centrality_analysis_endpoint():
-    """Endpoint to retrieve centrality analysis results"""
+async def get_centrality_analysis_endpoint(
+    request: Request,
+    write: bool = Query(False, description="Also write scores back to every node"),
+    top_k: int = Query(10, ge=1, le=1000),
+    format: Optional[str] = Query(None, pattern=FORMAT_PATTERN),
+    fields: Optional[str] = Query(None, description="Comma-separated row fields to keep"),
+):
+    """
+    Endpoint to retrieve centrality analysis results. format=columnar (or
+    Accept: application/vnd.columnar+json) and format=msgpack return
+    dictionary-encoded columns instead of row dicts.
+    """
     try:
-        return get_centrality_analysis()
+        result = await get_centrality_analysis(write=write, top_k=top_k)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return formatted_response(request, result, format, fields)
 
 
 # FastAPI Router
 @router.get("/full_triangle_analysis", response_model=Dict[str, Any])
-def get_country_triangle_analysis_with_metrics() -> Dict[str, Any]:
+async def get_country_triangle_analysis_with_metrics(
+    engine: str = Query("snapshot", pattern="^(snapshot|cypher)$"),
+) -> Dict[str, Any]:
     """Returns triangle data with execution metrics for both queries."""
-    return get_combined_analysis()
+    try:
+        return await get_combined_analysis(engine=engine)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+APSP_MODE_PATTERN = "^(compare|exact|approximate)$"
 
 
 @router.get("/all-pairs-shortest-paths", response_model=Dict[str, Any])
-def get_all_pairs_shortest_paths() -> Dict[str, Any]:
-    return compare_approaches()
+async def get_all_pairs_shortest_paths(
+    mode: str = Query("compare", pattern=APSP_MODE_PATTERN),
+    directed: bool = True,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+):
+    """
+    mode=compare runs the Cypher and GDS queries side by side; mode=exact
+    computes the statistics for every pair in process with bit-parallel BFS;
+    mode=approximate estimates them with HyperANF in memory linear in the nodes.
+
+    format=ndjson streams one path per line, tagged with its approach, and a
+    {"summary": ...} line after each approach's paths.
+    """
+    if format == "ndjson":
+        return ndjson_response(stream_path_approaches(mode=mode, directed=directed))
+    try:
+        return await compare_approaches(mode=mode, directed=directed)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    """
+    Request and Neo4j query latency histograms, driver session counts, cache
+    hit ratios, Last.fm latency and errors, and process RSS, in the
+    Prometheus text format.
+
+    Metrics are kept per worker process and not aggregated: with several
+    uvicorn workers a scrape sees only the worker that answered it, told
+    apart by process_info{pid}. Scrape each worker separately (e.g. one
+    port each) or run a single worker when the totals matter.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/admin/cache_stats", response_model=Dict[str, Any])
+async def get_cache_stats() -> Dict[str, Any]:
+    """Size, hit/miss and eviction counters for every in-process cache."""
+    return {"graph_version": current_graph_version(), "caches": cache_stats()}
+
+
+@router.get("/admin/landmarks", response_model=Dict[str, Any])
+async def get_landmark_status() -> Dict[str, Any]:
+    """Size, build time and graph fingerprint of the landmark distance index."""
+    landmarks = await get_landmark_index()
+    if landmarks is None:
+        raise HTTPException(status_code=503, detail="Graph snapshot is not available")
+    return landmarks[0].stats()
+
+
+@router.get("/admin/taste_index", response_model=Dict[str, Any])
+async def get_taste_index_status() -> Dict[str, Any]:
+    """Size, LSH parameters and source hash of the top-artists taste index."""
+    try:
+        index = await get_taste_index()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return index.stats()
+
+
+@router.post("/admin/taste_index/rebuild", response_model=Dict[str, Any])
+async def rebuild_taste_index() -> Dict[str, Any]:
+    """Rebuild the taste index from the current top_artists, e.g. after a re-bootstrap."""
+    try:
+        index = await get_taste_index(rebuild=True)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return index.stats()
+
+
+@router.get("/admin/projection", response_model=Dict[str, Any])
+async def get_projection_status() -> Dict[str, Any]:
+    """Name of the GDS projection in use and the state of pending rebuilds."""
+    return projection_manager.status()
+
+
+# --- Background jobs for heavy analytics ---
+
+# Job parameters carry the same limits as the matching GET endpoints. Jobs are
+# shared between identical submissions, so they never write back to the graph.
+class JobParams(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+
+class CentralityJobParams(JobParams):
+    write: Literal[False] = False
+    top_k: int = Field(10, ge=1, le=1000)
+
+
+class CommunityJobParams(JobParams):
+    write: Literal[False] = False
+    top_k: int = Field(10, ge=1, le=1000)
+
+
+class AllPairsJobParams(JobParams):
+    mode: str = Field("compare", pattern=APSP_MODE_PATTERN)
+    directed: bool = True
+
+
+class LinkPredictionJobParams(JobParams):
+    method: str = Field("adamic_adar", pattern=LINK_METHOD_PATTERN)
+    top_k: int = Field(10, ge=1, le=100)
+
+
+class TasteSimilarityJobParams(JobParams):
+    top_k: int = Field(10, ge=1, le=100)
+
+
+job_manager.register("centrality-analysis", get_centrality_analysis, CentralityJobParams)
+job_manager.register("community-detection", get_community_data, CommunityJobParams)
+job_manager.register("all-pairs-shortest-paths", compare_approaches, AllPairsJobParams)
+job_manager.register("link-prediction", get_link_predictions, LinkPredictionJobParams)
+job_manager.register("taste-similarity", get_all_similar_users, TasteSimilarityJobParams)
+
+
+@router.post("/jobs/{kind}", status_code=202)
+async def submit_job(kind: str, params: Dict[str, Any] = Body(default={})) -> Dict[str, Any]:
+    """
+    Start an analytics run in the background and return its job ID.
+
+    Parameters are checked against the kind's JobParams model (422 if invalid).
+    If the same analysis with the same parameters is already queued or running,
+    that job is returned instead of starting another run.
+    """
+    try:
+        job = job_manager.submit(kind, params)
+    except KeyError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown job kind '{kind}'. Available: {', '.join(job_manager.kinds)}",
+        )
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+    return job.describe()
+
+
+@router.get("/jobs")
+async def list_jobs() -> Dict[str, Any]:
+    return {"jobs": [job.describe() for job in job_manager.list()]}
+
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(job_id: str) -> Dict[str, Any]:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found or expired")
+    return job.describe()
+
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """The job's result once done; 202 with the job status while it is still running."""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found or expired")
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    if not job.finished:
+        return JSONResponse(status_code=202, content=job.describe())
+    return job.result
@@ -0,0 +1,153 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+
+def _sizeof(value: Any) -> int:
+    """Rough deep size in bytes of the dict/list/str values we cache."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_sizeof(v) for v in value)
+    return size
+
+
+class BoundedCache:
+    """
+    Thread-safe LRU cache bounded by entry count and (approximate) bytes.
+
+    Entries optionally expire `ttl` seconds after they were set. Hits, misses,
+    evictions, expirations and invalidations are counted for the stats endpoint.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 10_000,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, size, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        size = _sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, size, expires_at)
+            self._bytes += size
+            while self._data and (
+                len(self._data) > self.max_entries
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        with self._lock:
+            if key not in self._data:
+                return False
+            self._remove(key)
+            self.invalidations += 1
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self.invalidations += len(self._data)
+            self._data.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+_caches: Dict[str, BoundedCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name: str, **options) -> BoundedCache:
+    """Return the named cache, creating it with `options` on first use."""
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = BoundedCache(name, **options)
+        return _caches[name]
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+
+_write_hooks: List[Callable[[Optional[List[tuple]]], None]] = []
+
+
+def on_graph_write(hook: Callable[[Optional[List[tuple]]], None]) -> Callable[[Optional[List[tuple]]], None]:
+    """Register `hook(edges)` to run after FOLLOWS edges are written. Usable as a decorator."""
+    _write_hooks.append(hook)
+    return hook
+
+
+def notify_graph_write(edges: Optional[List[tuple]]) -> None:
+    """
+    Run every registered write hook with the (source_id, target_id) edges written.
+
+    edges=None reports a bulk write whose edges were not kept; hooks treat it
+    as a change anywhere in the graph.
+    """
+    for hook in _write_hooks:
+        try:
+            hook(edges)
+        except Exception as e:
+            print(f"Graph write hook {hook.__name__} failed: {e}")
@@ -0,0 +1,138 @@
+import asyncio
+import functools
+import inspect
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.db.cache import get_cache, on_graph_write
+from app.db.neo4j_connection import driver
+
+# Analytics results are few but large; bound them by bytes as well as count
+analytics_cache = get_cache("analytics", max_entries=256, max_bytes=64 * 1024**2)
+
+# Run alongside a write so the version stored by the bootstrap moves with the graph
+BUMP_GRAPH_VERSION_QUERY = """
+MERGE (m:GraphMeta {name: 'lastfm'})
+SET m.graph_version = coalesce(m.graph_version, 0) + 1
+RETURN m.graph_version AS graph_version
+"""
+
+READ_GRAPH_VERSION_QUERY = """
+MATCH (m:GraphMeta {name: 'lastfm'})
+RETURN m.graph_version AS graph_version
+"""
+
+# How long a worker trusts its version before re-reading the stored one, i.e.
+# how stale results can be after a write handled by another worker
+GRAPH_VERSION_TTL = float(os.getenv("GRAPH_VERSION_TTL", "2"))
+
+_graph_version = 0
+_inflight: Dict[tuple, asyncio.Future] = {}
+_checked_at = 0.0
+_refresh_failing = False
+_remote_write_hooks: List[Callable[[], None]] = []
+
+
+def current_graph_version() -> int:
+    """Version of the FOLLOWS graph as seen by this process; bumped on every write."""
+    return _graph_version
+
+
+def set_graph_version(version: Optional[int]) -> None:
+    """Seed the counter from the version stored in Neo4j (it only ever moves forward)."""
+    global _graph_version
+    if version is not None and version > _graph_version:
+        _graph_version = version
+
+
+@on_graph_write
+def bump_graph_version(edges: Optional[List[tuple]]) -> None:
+    global _graph_version
+    _graph_version += 1
+
+
+def on_remote_graph_write(hook: Callable[[], None]) -> Callable[[], None]:
+    """Register `hook()` to run when another process is seen to have written the graph."""
+    _remote_write_hooks.append(hook)
+    return hook
+
+
+async def refresh_graph_version() -> int:
+    """
+    Pick up writes made by other workers from the version stored on GraphMeta.
+
+    The stored version is read at most once per GRAPH_VERSION_TTL seconds;
+    when it is ahead of this process, the counter jumps to it and the remote
+    write hooks drop per-process state such as the snapshot.
+    """
+    global _checked_at, _graph_version, _refresh_failing
+    now = time.monotonic()
+    if now - _checked_at < GRAPH_VERSION_TTL:
+        return _graph_version
+    _checked_at = now
+    try:
+        async with driver.session() as session:
+            result = await session.run(READ_GRAPH_VERSION_QUERY)
+            record = await result.single()
+    except Exception as e:
+        if not _refresh_failing:
+            print(f"Could not read the stored graph version: {e}")
+        _refresh_failing = True
+        return _graph_version
+    _refresh_failing = False
+
+    stored = record["graph_version"] if record else None
+    if stored is not None and stored > _graph_version:
+        _graph_version = stored
+        for hook in _remote_write_hooks:
+            try:
+                hook()
+            except Exception as e:
+                print(f"Remote graph write hook {hook.__name__} failed: {e}")
+    return _graph_version
+
+
+def memoize_on_graph_version(endpoint: str, scope: Optional[Callable[[], Any]] = None):
+    """
+    Cache an async analytics function's result per (endpoint, arguments, graph version).
+
+    Results stay valid until the next graph write bumps the version, in this
+    process or (seen within GRAPH_VERSION_TTL) in another worker. `scope`
+    adds another component to the key (a value or a coroutine function), e.g.
+    the GDS projection name for results computed on a projection that is
+    rebuilt after writes. Concurrent calls
+    with the same key share one computation; failures are not cached. A
+    `progress` callback is passed through but left out of the key, so a
+    shared computation reports to the caller that started it.
+    """
+
+    def decorator(fn: Callable[..., Awaitable[Any]]):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            await refresh_graph_version()
+            scope_value = scope() if scope is not None else None
+            if inspect.isawaitable(scope_value):
+                scope_value = await scope_value
+            keyed = tuple(sorted((k, v) for k, v in kwargs.items() if k != "progress"))
+            key = (endpoint, args, keyed, _graph_version, scope_value)
+            cached = analytics_cache.get(key)
+            if cached is not None:
+                return cached
+
+            future = _inflight.get(key)
+            if future is None:
+                future = asyncio.ensure_future(fn(*args, **kwargs))
+                _inflight[key] = future
+
+                def store(done: asyncio.Future) -> None:
+                    _inflight.pop(key, None)
+                    if not done.cancelled() and done.exception() is None:
+                        analytics_cache.set(key, done.result())
+
+                future.add_done_callback(store)
+            return await asyncio.shield(future)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,209 @@
+import os
+import resource
+import sys
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from app.db.cache import cache_stats
+
+# Seconds; spans cached lookups (sub-millisecond) to whole-graph analytics
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+PROCESS_START = time.time()
+
+
+class Counter:
+    """Monotonic counter per label set."""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values: Dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_labels(self.labels, label_values)} {_number(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """Value that goes up and down per label set."""
+
+    def dec(self, *label_values, amount: float = 1) -> None:
+        self.inc(*label_values, amount=-amount)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram per label set, in the Prometheus exposition
+    layout. Each label set holds per-bucket counts, a sum and a total count.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self.series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values) -> None:
+        series = self.series.get(label_values)
+        if series is None:
+            # [per-bucket counts (last one is +Inf), sum, count]
+            series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                labels = _labels(self.labels + ("le",), label_values + (le,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {_number(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+def _number(value: float) -> str:
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+# Every metric below is updated from the event loop thread only (middleware,
+# driver sessions, async Last.fm wrapper), so plain increments need no lock.
+http_request_seconds = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template, method and status, until the body is sent.",
+    ("route", "method", "status"),
+)
+http_requests_in_progress = Gauge(
+    "http_requests_in_progress", "HTTP requests currently being handled.", ("method",)
+)
+neo4j_query_seconds = Histogram(
+    "neo4j_query_seconds",
+    "Wall time until a Neo4j result is available (or a transaction function returns), "
+    "by query name.",
+    ("query",),
+)
+neo4j_query_server_seconds = Histogram(
+    "neo4j_query_server_seconds",
+    "Server-reported result_available_after + result_consumed_after, by logical query name.",
+    ("query",),
+)
+neo4j_query_errors = Counter(
+    "neo4j_query_errors_total", "Neo4j queries and transaction functions that raised, by query name.", ("query",)
+)
+neo4j_sessions_opened = Counter("neo4j_sessions_opened_total", "Sessions checked out of the Neo4j driver.")
+neo4j_sessions_active = Gauge("neo4j_sessions_active", "Neo4j driver sessions currently checked out.")
+lastfm_request_seconds = Histogram(
+    "lastfm_request_seconds", "Last.fm artist lookup latency by outcome.", ("outcome",)
+)
+lastfm_errors = Counter(
+    "lastfm_errors_total", "Last.fm lookups that returned no artist name (HTTP, network or lookup errors)."
+)
+
+REGISTRY = (
+    http_request_seconds,
+    http_requests_in_progress,
+    neo4j_query_seconds,
+    neo4j_query_server_seconds,
+    neo4j_query_errors,
+    neo4j_sessions_opened,
+    neo4j_sessions_active,
+    lastfm_request_seconds,
+    lastfm_errors,
+)
+
+
+def observe_query_summary(name: str, summary) -> None:
+    """Record the server-side timings of a consumed Neo4j result summary under `name`."""
+    if summary is None or summary.result_available_after is None:
+        return
+    elapsed_ms = summary.result_available_after + (summary.result_consumed_after or 0)
+    neo4j_query_server_seconds.observe(elapsed_ms / 1000, name)
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Current resident set size from /proc, or the peak RSS where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS and kilobytes elsewhere
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _cache_metrics() -> List[str]:
+    stats = cache_stats()
+    families = (
+        ("cache_hits_total", "counter", "Lookups served from the cache.", "hits"),
+        ("cache_misses_total", "counter", "Lookups not in the cache (or expired).", "misses"),
+        ("cache_evictions_total", "counter", "Entries evicted by the size bounds.", "evictions"),
+        ("cache_hit_ratio", "gauge", "Hits over lookups since start.", "hit_ratio"),
+        ("cache_entries", "gauge", "Entries currently cached.", "entries"),
+        ("cache_bytes", "gauge", "Approximate bytes currently cached.", "bytes"),
+    )
+    lines = []
+    for name, kind, help, key in families:
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+        for cache_name, cache in sorted(stats.items()):
+            if cache[key] is not None:
+                lines.append(f'{name}{{cache="{_escape(cache_name)}"}} {_number(cache[key])}')
+    return lines
+
+
+def render_metrics() -> str:
+    """Every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    lines += _cache_metrics()
+    rss = process_rss_bytes()
+    if rss is not None:
+        lines += [
+            "# HELP process_resident_memory_bytes Resident memory size in bytes.",
+            "# TYPE process_resident_memory_bytes gauge",
+            f"process_resident_memory_bytes {rss}",
+        ]
+    lines += [
+        "# HELP process_info The worker process these metrics belong to; each worker keeps its own.",
+        "# TYPE process_info gauge",
+        f'process_info{{pid="{os.getpid()}"}} 1',
+        "# HELP process_start_time_seconds Start time of the process since the Unix epoch.",
+        "# TYPE process_start_time_seconds gauge",
+        f"process_start_time_seconds {_number(round(PROCESS_START, 3))}",
+    ]
+    return "\n".join(lines) + "\n"
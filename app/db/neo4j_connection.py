@@ -1,15 +1,99 @@
-from neo4j import GraphDatabase
+from neo4j import AsyncGraphDatabase
+import functools
 import os
+import sys
+import time
+from typing import Optional
 from dotenv import load_dotenv
 
+from app.db.metrics import neo4j_query_errors, neo4j_query_seconds, neo4j_sessions_active, neo4j_sessions_opened
+
 load_dotenv()
 
 NEO4J_URI = os.getenv("NEO4J_URI")
 NEO4J_USER = os.getenv("NEO4J_USER")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
 
-driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+
+class InstrumentedSession:
+    """
+    Async session that counts checkouts and times `run` (until the result is
+    available) and `execute_read`/`execute_write` (the whole transaction
+    function, retries included). Each is labelled with its `query_name=`
+    keyword, else with the calling function or the transaction function's
+    name. Helpers that run queries on behalf of others should pass
+    `query_name=`, or every query they run shares the helper's label. Other
+    keywords, `name` included, go to Neo4j as query parameters. Everything
+    else is delegated.
+
+    Metrics live in the worker process that recorded them; see /metrics.
+    """
+
+    def __init__(self, session):
+        self._session = session
+
+    async def __aenter__(self):
+        await self._session.__aenter__()
+        neo4j_sessions_opened.inc()
+        neo4j_sessions_active.inc()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        neo4j_sessions_active.dec()
+        return await self._session.__aexit__(*exc_info)
+
+    async def _timed(self, query_name: str, call, /, *args, **kwargs):
+        # Positional-only, so any keyword is left for the query or transaction function
+        start = time.perf_counter()
+        try:
+            result = await call(*args, **kwargs)
+        except Exception:
+            neo4j_query_errors.inc(query_name)
+            raise
+        neo4j_query_seconds.observe(time.perf_counter() - start, query_name)
+        return result
+
+    async def run(self, query, *args, query_name: Optional[str] = None, **kwargs):
+        query_name = query_name or sys._getframe(1).f_code.co_name
+        return await self._timed(query_name, self._session.run, query, *args, **kwargs)
+
+    async def execute_read(self, transaction_function, *args, query_name: Optional[str] = None, **kwargs):
+        query_name = query_name or _function_name(transaction_function)
+        return await self._timed(
+            query_name, self._session.execute_read, transaction_function, *args, **kwargs
+        )
+
+    async def execute_write(self, transaction_function, *args, query_name: Optional[str] = None, **kwargs):
+        query_name = query_name or _function_name(transaction_function)
+        return await self._timed(
+            query_name, self._session.execute_write, transaction_function, *args, **kwargs
+        )
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+def _function_name(fn) -> str:
+    while isinstance(fn, functools.partial):
+        fn = fn.func
+    return getattr(fn, "__name__", "transaction")
+
+
+class InstrumentedDriver:
+    """The async driver, handing out InstrumentedSession wrappers."""
+
+    def __init__(self, driver):
+        self._driver = driver
+
+    def session(self, **config) -> InstrumentedSession:
+        return InstrumentedSession(self._driver.session(**config))
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+
+driver = InstrumentedDriver(AsyncGraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD)))
 
 
-def get_db():
+async def get_db():
     return driver
@@ -1,9 +1,14 @@
+import argparse
+import hashlib
 import json
 import pandas as pd
 from py2neo import Graph
 import pycountry
 import requests
 import os
+import socket
+import time
+import uuid
 
 # Neo4j connection details
 NEO4J_URI = "bolt://localhost:7687"
@@ -20,20 +25,16 @@ FEATURES_FILE = (
 TARGET_FILE = "./lasftm_asia/lastfm_asia_target.csv"  # Your CSV with country targets
 
 
-# Load features from JSON string or file
+# Load features from the JSON file. This also runs during API startup, so a
+# missing file raises instead of prompting for another path.
 def load_features():
     try:
-        # Try to open as a file
         with open(FEATURES_FILE, "r") as f:
-            features = json.load(f)
+            return json.load(f)
     except FileNotFoundError:
-        # If file doesn't exist, check if the file is in the current directory
-        print(f"File {FEATURES_FILE} not found. Current directory: {os.getcwd()}")
-        print("Please enter the correct path to your features.json file:")
-        file_path = input()
-        with open(file_path, "r") as f:
-            features = json.load(f)
-    return features
+        raise FileNotFoundError(
+            f"Features file {FEATURES_FILE} not found (current directory: {os.getcwd()})"
+        ) from None
 
 
 # Load target CSV
@@ -41,10 +42,9 @@ def load_target():
     try:
         return pd.read_csv(TARGET_FILE)
     except FileNotFoundError:
-        print(f"File {TARGET_FILE} not found. Current directory: {os.getcwd()}")
-        print("Please enter the correct path to your target.csv file:")
-        file_path = input()
-        return pd.read_csv(file_path)
+        raise FileNotFoundError(
+            f"Target file {TARGET_FILE} not found (current directory: {os.getcwd()})"
+        ) from None
 
 
 # Get country name from target
@@ -68,7 +68,10 @@ COUNTRY_CODES = {
     16: "MM",
     17: "KH",
 }
-graph = Graph(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+
+
+def connect():
+    return Graph(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
 
 
 def get_country_name(country_code):
@@ -79,86 +82,254 @@ def get_country_name(country_code):
         return "Unknown"
 
 
-# Update Neo4j database while preserving existing projection
-def update_neo4j(features, target):
-    graph = Graph(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+# Country names resolved once instead of a pycountry lookup per user
+COUNTRY_NAMES = {code: get_country_name(code) for code in COUNTRY_CODES.values()}
+
+# Number of users written per UNWIND transaction
+BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "5000"))
+
+USER_BATCH_QUERY = """
+UNWIND $rows AS row
+MATCH (u:User {id: row.id})
+SET u.country_code = row.country_code,
+    u.country_name = row.country_name,
+    u.top_artists = row.top_artists
+RETURN count(u) AS updated
+"""
+
 
+def build_user_rows(features, target):
+    """Yield one parameter row per user with country info and top 10 artists."""
     # Process target data into a dictionary for easier lookup
     target_dict = dict(zip(target["id"], target["target"]))
 
-    # Check if the projection exists
+    for user_id, artist_ids in features.items():
+        country_idx = target_dict.get(int(user_id), -1)
+        country_code = COUNTRY_CODES.get(country_idx, "Unknown")
+        yield {
+            "id": int(user_id),
+            "country_code": country_code,
+            "country_name": COUNTRY_NAMES.get(country_code, "Unknown"),
+            "top_artists": artist_ids[:10],  # Store top 10 artists
+        }
+
+
+def batched(rows, size):
+    """Group an iterable of rows into lists of at most `size` rows."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ensure_projection(graph):
+    """Create the 'lastfm' GDS projection if it does not exist yet."""
+    # The API rebuilds the projection after writes as 'lastfm_v2', 'lastfm_v3', ...
     projection_exists = graph.run(
-        "CALL gds.graph.exists('lastfm') YIELD exists RETURN exists"
+        """
+        CALL gds.graph.list() YIELD graphName
+        WHERE graphName = 'lastfm' OR graphName =~ 'lastfm_v[0-9]+'
+        RETURN count(*) > 0 AS exists
+        """
     ).evaluate()
 
     print(f"Projection 'lastfm' status: {projection_exists}")
 
-    # Update user nodes with country info without affecting the projection
-    counter = 0
-    total = len(features)
-
-    print(f"Processing {total} users...")
     if not projection_exists:
         print("Projection 'lastfm' does not exist. Creating it.")
-        try:
-            graph.run(
-                """
-                    CALL gds.graph.project(
-                    'lastfm',
-                    'User',
-                        {
-                            FOLLOWS: {
-                                orientation: 'NATURAL'
-                            }
+        graph.run(
+            """
+                CALL gds.graph.project(
+                'lastfm',
+                'User',
+                    {
+                        FOLLOWS: {
+                            orientation: 'NATURAL'
                         }
-                    );
-                """
-            )
+                    }
+                );
+            """
+        )
+
+
+# Update Neo4j database while preserving existing projection
+def update_neo4j(features, target, graph=None, batch_size=BATCH_SIZE):
+    graph = graph or connect()
+
+    # Lookups by id are what every batch does, so make sure they are indexed
+    graph.run("CREATE INDEX user_id IF NOT EXISTS FOR (u:User) ON (u.id)")
+
+    # Properties are only written to the store, so the projection is unaffected
+    ensure_projection(graph)
+
+    total = len(features)
+    updated = 0
+    missing = 0
+    failed_batches = 0
+    failed_rows = 0
+    start = time.perf_counter()
+
+    print(f"Processing {total} users in batches of {batch_size}...")
+    for batch in batched(build_user_rows(features, target), batch_size):
+        tx = graph.begin()
+        try:
+            batch_updated = tx.run(USER_BATCH_QUERY, rows=batch).evaluate() or 0
+            graph.commit(tx)
         except Exception as e:
-            print(f"Error creating projection: {e}")
-            return
-
-        for user_id, artist_ids in features.items():
-            # Get country info
-            country_idx = target_dict.get(int(user_id), -1)
-            country_code = COUNTRY_CODES.get(country_idx, "Unknown")
-            country_name = get_country_name(country_code)
-
-            # Update user node with country info without affecting relationships
-            try:
-                result = graph.run(
-                    """
-                    MATCH (u:User {id: toInteger($user_id)})
-                    SET u.country_code = $country_code, u.country_name = $country_name
-                    RETURN u.id AS id, u.country_code AS country_code, u.country_name AS country_name
-                    """,
-                    user_id=int(user_id),  # Convert to integer here
-                    country_code=country_code,
-                    country_name=country_name,
-                ).data()
-
-                if not result:
-                    raise ValueError(f"User {user_id} not found in Neo4j database.")
-
-            except Exception as e:
-                print(f"Error updating user {user_id}: {e}")
-                continue
-
-            # Store top artist IDs as a property on the user node
-            # This avoids creating new relationships that might affect the projection
-            graph.run(
-                "MATCH (u:User {id: toInteger($user_id)}) SET u.top_artists = $artist_ids",
-                user_id=str(user_id),
-                artist_ids=artist_ids[:10],  # Store top 10 artists
-            )
-
-            counter += 1
-            if counter % 100 == 0:
-                print(f"Processed {counter}/{total} users")
+            graph.rollback(tx)
+            print(f"Error writing batch of {len(batch)} users: {e}")
+            failed_batches += 1
+            failed_rows += len(batch)
+            continue
+
+        updated += batch_updated
+        missing += len(batch) - batch_updated
+        elapsed = time.perf_counter() - start
+        processed = updated + missing + failed_rows
+        print(f"Processed {processed}/{total} users ({processed / elapsed:.0f} rows/s)")
+
+    elapsed = time.perf_counter() - start
+    if missing:
+        print(f"{missing} users were not found in the Neo4j database.")
+    if failed_batches:
+        print(f"{failed_batches} batches ({failed_rows} users) failed and were not written.")
+    print(
+        f"Updated {updated} users in {elapsed:.2f}s "
+        f"({updated / elapsed if elapsed else 0:.0f} rows/s)"
+    )
+    return {
+        "updated": updated,
+        "missing": missing,
+        "failed_batches": failed_batches,
+        "failed_rows": failed_rows,
+        "seconds": elapsed,
+    }
+
+
+def source_hash(paths=(FEATURES_FILE, TARGET_FILE)):
+    """SHA-256 over the contents of the bootstrap source files."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_bootstrap_state(graph):
+    """Return the stored source hash and graph version, if the graph was bootstrapped."""
+    return graph.run(
+        """
+        MATCH (m:GraphMeta {name: 'lastfm'})
+        RETURN m.source_hash AS source_hash, m.graph_version AS graph_version
+        """
+    ).data()
+
+
+def save_bootstrap_state(graph, digest):
+    """Bump the graph version and store `digest`; None clears it so the next start-up retries."""
+    return graph.run(
+        """
+        MERGE (m:GraphMeta {name: 'lastfm'})
+        SET m.source_hash = $digest,
+            m.graph_version = coalesce(m.graph_version, 0) + 1,
+            m.bootstrapped_at = datetime()
+        RETURN m.graph_version AS graph_version
+        """,
+        digest=digest,
+    ).evaluate()
+
+
+# Only one process bootstraps at a time; the lease frees the lock if its holder dies
+BOOTSTRAP_LOCK_SECONDS = int(os.getenv("BOOTSTRAP_LOCK_SECONDS", "900"))
+BOOTSTRAP_LOCK_POLL = float(os.getenv("BOOTSTRAP_LOCK_POLL", "1"))
+
+# Setting a property first takes the node's write lock, so a concurrent
+# attempt reads the owner only after this transaction has committed
+ACQUIRE_BOOTSTRAP_LOCK_QUERY = """
+MERGE (m:GraphMeta {name: 'lastfm'})
+SET m.bootstrap_lock_check = true
+WITH m, m.bootstrap_owner IS NULL OR m.bootstrap_lease_until < datetime() AS free
+SET m.bootstrap_owner = CASE WHEN free THEN $owner ELSE m.bootstrap_owner END,
+    m.bootstrap_lease_until = CASE
+        WHEN free THEN datetime() + duration({seconds: $lease})
+        ELSE m.bootstrap_lease_until
+    END
+REMOVE m.bootstrap_lock_check
+RETURN free
+"""
+
+RELEASE_BOOTSTRAP_LOCK_QUERY = """
+MATCH (m:GraphMeta {name: 'lastfm'})
+WHERE m.bootstrap_owner = $owner
+REMOVE m.bootstrap_owner, m.bootstrap_lease_until
+"""
+
+
+def acquire_bootstrap_lock(graph, owner, lease=BOOTSTRAP_LOCK_SECONDS, poll=BOOTSTRAP_LOCK_POLL):
+    """Block until `owner` holds the bootstrap lock on the GraphMeta node."""
+    # Two workers racing to create the node must not end up with one each
+    graph.run(
+        "CREATE CONSTRAINT graph_meta_name IF NOT EXISTS "
+        "FOR (m:GraphMeta) REQUIRE m.name IS UNIQUE"
+    )
+    waiting = False
+    while not graph.run(ACQUIRE_BOOTSTRAP_LOCK_QUERY, owner=owner, lease=lease).evaluate():
+        if not waiting:
+            print("Another process is bootstrapping the graph, waiting for it to finish...")
+            waiting = True
+        time.sleep(poll)
+
+
+def release_bootstrap_lock(graph, owner):
+    graph.run(RELEASE_BOOTSTRAP_LOCK_QUERY, owner=owner)
 
 
 # Main function
-def start_up():
+def start_up(force=False):
+    """
+    Bring Neo4j in line with the source files, doing nothing if it already is.
+
+    The hash of the features and target files is stored on a GraphMeta node
+    together with a graph version; user properties are only rewritten when the
+    hash changes (or `force` is set), and the hash is saved only once every
+    batch was written. The GDS projection lives in memory and is lost on a
+    database restart, so its existence is checked either way.
+
+    Every API worker runs this on startup, so it holds a lock on the GraphMeta
+    node throughout: one worker bootstraps while the others wait and then find
+    the hash up to date.
+    """
+    missing = [p for p in (FEATURES_FILE, TARGET_FILE) if not os.path.exists(p)]
+    if missing:
+        print(f"Skipping bootstrap, source files not found: {', '.join(missing)}")
+        return None
+
+    digest = source_hash()
+    graph = connect()
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    acquire_bootstrap_lock(graph, owner)
+    try:
+        return _bootstrap(graph, digest, force)
+    finally:
+        release_bootstrap_lock(graph, owner)
+
+
+def _bootstrap(graph, digest, force):
+    state = get_bootstrap_state(graph)
+
+    if state and state[0]["source_hash"] == digest and not force:
+        print(
+            f"Source files unchanged (graph version {state[0]['graph_version']}), "
+            "skipping data bootstrap"
+        )
+        ensure_projection(graph)
+        return state[0]["graph_version"]
+
     print("Loading features data...")
     features = load_features()
     print(f"Loaded features for {len(features)} users")
@@ -168,10 +339,28 @@ def start_up():
     print(f"Loaded target data with {len(target)} entries")
 
     print("Updating Neo4j database...")
-    update_neo4j(features, target)
-    print("Database update complete!")
-
-    print("\nAPI Endpoint for Frontend Integration:")
+    stats = update_neo4j(features, target, graph=graph)
+    if stats["failed_batches"]:
+        # Some users were rewritten, so the version still moves on
+        graph_version = save_bootstrap_state(graph, None)
+        raise RuntimeError(
+            f"{stats['failed_batches']} batches ({stats['failed_rows']} users) failed; "
+            f"graph version is now {graph_version} but the source hash was not saved, "
+            "so the next start-up retries"
+        )
+    graph_version = save_bootstrap_state(graph, digest)
+    print(f"Database update complete! Graph version is now {graph_version}")
+    return graph_version
 
 
-instance = start_up()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Load LastFM Asia user properties into Neo4j."
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="rewrite user properties even if the source files are unchanged",
+    )
+    args = parser.parse_args()
+    start_up(force=args.force)
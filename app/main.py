@@ -1,11 +1,62 @@
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from app.db.neo4j_connection import get_db
 
 from fastapi.middleware.cors import CORSMiddleware
+from app.api.metrics import RequestMetricsMiddleware
+from app.api.responses import NDJSONAwareGZipMiddleware
 from app.api.routes import router
+from app.db.graph_version import set_graph_version
 from app.initial_conn import start_up
+from app.methods import apsp
+from app.methods.artist_resolver import artist_resolver
+from app.methods.projection import projection_manager
+from app.methods.jobs import job_manager
+from app.methods.landmarks import schedule_landmark_index_build
+from app.methods.taste_index import load_saved_taste_index, schedule_taste_index_build
+
+BOOTSTRAP_ON_STARTUP = os.getenv("BOOTSTRAP_ON_STARTUP", "1") == "1"
+
+# Responses at least this large are gzipped for clients that accept it
+GZIP_MIN_BYTES = int(os.getenv("GZIP_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Checksum-gated, so this is a single metadata read when nothing changed.
+    # Workers take turns on a Neo4j-side lock, so only one of them rewrites.
+    # Run `python -m app.initial_conn` to bootstrap outside the API.
+    if BOOTSTRAP_ON_STARTUP:
+        try:
+            set_graph_version(await run_in_threadpool(start_up))
+        except Exception as e:
+            print(f"Data bootstrap failed: {e}")
+    try:
+        print(f"Using GDS projection '{await projection_manager.discover()}'")
+    except Exception as e:
+        print(f"Could not list GDS projections: {e}")
+    # Indexes never hold up startup. The saved taste index is adopted if
+    # still valid; checking the landmark index needs the graph snapshot, so it
+    # is loaded (or rebuilt) in the background along with any missing index.
+    if await load_saved_taste_index() is None:
+        schedule_taste_index_build()
+    schedule_landmark_index_build()
+    loaded = await run_in_threadpool(artist_resolver.load)
+    print(f"Loaded {loaded} artist names from {artist_resolver.store.path}")
+    yield
+    await job_manager.close()
+    await projection_manager.close()
+    apsp.shutdown_pool()
+    artist_resolver.close()
+    db = await get_db()
+    await db.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,6 +66,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(NDJSONAwareGZipMiddleware, minimum_size=GZIP_MIN_BYTES, compresslevel=GZIP_LEVEL)
+
+# Outermost, so request latency includes compression
+app.add_middleware(RequestMetricsMiddleware)
+
 app.include_router(router)
 
 
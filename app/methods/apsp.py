@@ -0,0 +1,282 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.methods.graph_snapshot import GraphSnapshot
+
+# Sources per BFS batch are 64 * APSP_WORDS: one bit per source in the frontier words
+APSP_WORDS = int(os.getenv("APSP_WORDS", "4"))
+APSP_WORKERS = int(os.getenv("APSP_WORKERS", str(os.cpu_count() or 1)))
+APSP_TOP_PAIRS = 1000
+# Forking a process that runs the event loop and driver threads is unsafe, so
+# workers start from a fresh interpreter
+APSP_START_METHOD = os.getenv(
+    "APSP_START_METHOD",
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn",
+)
+
+ALL_BITS = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+# One process pool for the app's lifetime, created on first use; the API
+# lifespan shuts it down
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_size = 0
+
+# CSR a pool worker last attached to: (spec, shared memory blocks, arrays)
+_worker_graph: Optional[tuple] = None
+
+
+def get_pool(workers: int) -> Tuple[ProcessPoolExecutor, int]:
+    """The shared pool and its size; `workers` sizes it when it is first created."""
+    global _pool, _pool_size
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context(APSP_START_METHOD)
+        )
+        _pool_size = workers
+    return _pool, _pool_size
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+
+class _SharedArrays:
+    """
+    Copies of arrays in shared memory, so a call's CSR reaches the long-lived
+    pool workers once rather than pickled with every batch. Workers attach
+    by `spec`.
+    """
+
+    def __init__(self, *arrays: np.ndarray):
+        self._blocks = []
+        spec = []
+        for array in arrays:
+            block = SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, array.dtype, buffer=block.buf)[:] = array
+            self._blocks.append(block)
+            spec.append((block.name, array.shape, array.dtype.str))
+        self.spec = tuple(spec)
+
+    def close(self) -> None:
+        # Workers keep their mapping until they attach to the next call's CSR
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+
+
+def _attach_untracked(name: str) -> SharedMemory:
+    """
+    Attach to a block the parent owns without registering it with the
+    resource tracker (SharedMemory's track=False, which Python 3.11 lacks).
+
+    A tracker unlinks what is registered with it when it shuts down, and
+    unregistering after attaching is no better: the workers share the
+    parent's tracker, so that would drop the parent's registration and make
+    the next worker's or the parent's unregister fail.
+    """
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _attach(spec: tuple) -> Tuple[np.ndarray, ...]:
+    global _worker_graph
+    if _worker_graph is None or _worker_graph[0] != spec:
+        if _worker_graph is not None:
+            blocks = _worker_graph[1]
+            _worker_graph = None  # drop the array views before closing their buffers
+            for block in blocks:
+                block.close()
+        blocks = [_attach_untracked(name) for name, _, _ in spec]
+        arrays = tuple(
+            np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+            for block, (_, shape, dtype) in zip(blocks, spec)
+        )
+        _worker_graph = (spec, blocks, arrays)
+    return _worker_graph[2]
+
+
+def _bfs_batch_in_worker(spec: tuple, first: int, words: int, top: int):
+    offsets, neighbors = _attach(spec)
+    return bfs_batch(offsets, neighbors, first, words, top)
+
+
+def _source_mask(n: int, first: int, words: int) -> np.ndarray:
+    """Bits of the batch's sources whose index is below each target's (source < target pairs)."""
+    mask = np.empty((n, words), dtype=np.uint64)
+    targets = np.arange(n, dtype=np.int64)
+    for w in range(words):
+        k = np.clip(targets - first - 64 * w, 0, 64)
+        low = (np.uint64(1) << np.minimum(k, 63).astype(np.uint64)) - np.uint64(1)
+        mask[:, w] = np.where(k >= 64, ALL_BITS, low)
+    return mask
+
+
+def bfs_batch(
+    offsets: np.ndarray, neighbors: np.ndarray, first: int, words: int, top: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    BFS from sources first .. first + 64 * words - 1 at once, one bit per source.
+
+    `offsets`/`neighbors` is the pull adjacency: the row of v lists the nodes
+    a path can come from to reach v. Each level ORs the frontier words of a
+    node's row together with one reduceat, so all sources in the batch advance
+    together. Only pairs with source index < target index are counted.
+
+    Returns (histogram, longest): histogram[d] counts pairs at distance d, and
+    longest holds up to `top` (distance, source, target) rows from the deepest
+    levels.
+    """
+    n = len(offsets) - 1
+    sources = np.arange(first, min(first + 64 * words, n))
+    bits = np.arange(len(sources))
+    seen = np.zeros((n, words), dtype=np.uint64)
+    seen[sources, bits // 64] = np.uint64(1) << (bits % 64).astype(np.uint64)
+    frontier = seen.copy()
+    mask = _source_mask(n, first, words)
+
+    nonempty = np.flatnonzero(np.diff(offsets))
+    starts = offsets[nonempty]
+    histogram = [0]
+    levels: List[Tuple[np.ndarray, np.ndarray]] = []
+    while True:
+        reached = np.zeros_like(seen)
+        if len(starts):
+            reached[nonempty] = np.bitwise_or.reduceat(frontier[neighbors], starts, axis=0)
+        reached &= ~seen
+        if not reached.any():
+            break
+        seen |= reached
+        frontier = reached
+        counted = reached & mask
+        histogram.append(int(np.bitwise_count(counted).sum()))
+        rows = np.flatnonzero(counted.any(axis=1))
+        levels.append((rows, counted[rows]))
+
+    longest = []
+    remaining = top
+    for distance in range(len(levels), 0, -1):
+        if remaining <= 0:
+            break
+        rows, counted = levels[distance - 1]
+        flags = np.unpackbits(counted.view(np.uint8), axis=1, bitorder="little")
+        target_pos, bit = np.nonzero(flags)
+        target_pos, bit = target_pos[:remaining], bit[:remaining]
+        longest.append(
+            np.stack(
+                [np.full(len(bit), distance), first + bit, rows[target_pos]], axis=1
+            )
+        )
+        remaining -= len(bit)
+
+    longest = np.concatenate(longest) if longest else np.empty((0, 3), dtype=np.int64)
+    return np.asarray(histogram, dtype=np.int64), longest.astype(np.int64)
+
+
+def _estimated_memory(n: int, m: int, words: int, workers: int) -> int:
+    # seen, frontier, reached, mask plus the gathered frontier rows, per worker
+    return workers * 8 * words * (4 * n + m)
+
+
+async def all_pairs_statistics(
+    snapshot: GraphSnapshot,
+    directed: bool = True,
+    top: int = APSP_TOP_PAIRS,
+    words: int = APSP_WORDS,
+    workers: int = APSP_WORKERS,
+    progress: Optional[Callable[[float], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Exact shortest path statistics over every (source < target) user pair.
+
+    Sources are split into batches of 64 * `words` and each batch runs one
+    bit-parallel BFS (see `bfs_batch`); batches are spread over the shared
+    process pool (see `get_pool`), or run in a thread when `workers` is 1.
+    Directed mode follows FOLLOWS edges from source to target,
+    like the Cypher and GDS queries; otherwise edges are undirected.
+    """
+    start = time.perf_counter()
+    if directed:
+        offsets, neighbors = snapshot.in_offsets, snapshot.in_neighbors
+    else:
+        offsets, neighbors = snapshot.und_offsets, snapshot.und_neighbors
+    n = snapshot.node_count
+    firsts = list(range(0, n, 64 * words))
+    workers = max(1, min(workers, len(firsts)))
+
+    results = []
+    if workers == 1:
+        for i, first in enumerate(firsts):
+            results.append(await asyncio.to_thread(bfs_batch, offsets, neighbors, first, words, top))
+            if progress:
+                progress((i + 1) / len(firsts))
+    else:
+        loop = asyncio.get_running_loop()
+        pool, pool_size = get_pool(workers)
+        workers = min(pool_size, len(firsts))
+        shared = _SharedArrays(offsets, neighbors)
+        pending = [
+            loop.run_in_executor(pool, _bfs_batch_in_worker, shared.spec, first, words, top)
+            for first in firsts
+        ]
+        try:
+            for i, done in enumerate(asyncio.as_completed(pending)):
+                results.append(await done)
+                if progress:
+                    progress((i + 1) / len(firsts))
+        finally:
+            # Batches not started yet would find the shared CSR gone
+            for future in pending:
+                future.cancel()
+            shared.close()
+
+    depth = max((len(histogram) for histogram, _ in results), default=1)
+    histogram = np.zeros(depth, dtype=np.int64)
+    for batch_histogram, _ in results:
+        histogram[: len(batch_histogram)] += batch_histogram
+
+    longest = np.concatenate([batch_longest for _, batch_longest in results])
+    order = np.lexsort((longest[:, 2], longest[:, 1], -longest[:, 0]))[:top]
+    ids = snapshot.ids
+    paths = [
+        {"source": int(ids[s]), "target": int(ids[t]), "distance": int(d)}
+        for d, s, t in longest[order]
+    ]
+
+    distances = np.flatnonzero(histogram)
+    total = int(histogram.sum())
+    return {
+        "paths": paths,
+        "performance_metrics": {
+            "estimated_memory_bytes": _estimated_memory(n, len(neighbors), words, workers),
+            "execution_time_ms": round((time.perf_counter() - start) * 1000, 2),
+            "workers": workers,
+            "sources_per_batch": 64 * words,
+        },
+        "statistics": {
+            "path_lengths": {
+                "min": int(distances.min()) if total else 0,
+                "max": int(distances.max()) if total else 0,
+                "average": round(float((np.arange(depth) * histogram).sum()) / total, 4) if total else 0,
+                "distribution": {int(d): int(histogram[d]) for d in distances},
+            },
+            "diameter": int(distances.max()) if total else 0,
+            "reachable_pairs": total,
+            "total_pairs": n * (n - 1) // 2,
+            "directed": directed,
+        },
+    }
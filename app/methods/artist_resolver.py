@@ -0,0 +1,229 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.db.cache import BoundedCache, get_cache
+from app.db.metrics import lastfm_errors, lastfm_request_seconds
+
+LASTFM_API_URL = os.getenv("LASTFM_API_URL", "http://ws.audioscrobbler.com/2.0/")
+LASTFM_API_KEY = os.getenv("LASTFM_API_KEY", "fecd9e604929382f5f4f7a92e2b58c08")
+ARTIST_DB_PATH = os.getenv("ARTIST_DB_PATH", "./artist_names.sqlite3")
+
+# Last.fm asks clients to stay under 5 requests per second
+LASTFM_CONCURRENCY = int(os.getenv("LASTFM_CONCURRENCY", "4"))
+LASTFM_RATE_LIMIT = float(os.getenv("LASTFM_RATE_LIMIT", "5"))
+LASTFM_TIMEOUT = float(os.getenv("LASTFM_TIMEOUT", "5"))
+
+# Failed lookups are retried after this many seconds instead of on every request
+UNKNOWN_ARTIST_TTL = 300
+
+
+def unknown_artist_name(artist_id) -> str:
+    return f"Unknown Artist ({artist_id})"
+
+
+class ArtistNameStore:
+    """SQLite table of artist ID -> name that survives restarts."""
+
+    def __init__(self, path: str = ARTIST_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS artist_names (id TEXT PRIMARY KEY, name TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def load_all(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT id, name FROM artist_names"))
+
+    def get_many(self, artist_ids: List[str]) -> Dict[str, str]:
+        if not artist_ids:
+            return {}
+        placeholders = ",".join("?" * len(artist_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, name FROM artist_names WHERE id IN ({placeholders})",
+                artist_ids,
+            )
+            return dict(rows)
+
+    def put_many(self, names: Dict[str, str]) -> None:
+        if not names:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO artist_names (id, name) VALUES (?, ?)",
+                names.items(),
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class _RateLimiter:
+    """Spaces calls at least 1/rate seconds apart (no limit when rate is 0)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        now = time.monotonic()
+        delay = self._next - now
+        self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class ArtistResolver:
+    """
+    Resolves Last.fm artist IDs to names.
+
+    Lookups go through the in-memory 'artists' cache, then the SQLite store,
+    and only then to the Last.fm API. API calls share one pooled HTTP session,
+    are limited in concurrency and rate, and concurrent requests for the same
+    artist wait on a single in-flight fetch. `api_url` can point at a local
+    stub server.
+    """
+
+    def __init__(
+        self,
+        store: Optional[ArtistNameStore] = None,
+        cache: Optional[BoundedCache] = None,
+        api_url: str = LASTFM_API_URL,
+        api_key: Optional[str] = LASTFM_API_KEY,
+        concurrency: int = LASTFM_CONCURRENCY,
+        rate_limit: float = LASTFM_RATE_LIMIT,
+        timeout: float = LASTFM_TIMEOUT,
+    ):
+        self.store = store
+        self.cache = cache or get_cache("artists", max_entries=50_000, max_bytes=16 * 1024**2)
+        self.api_url = api_url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._rate_limiter = _RateLimiter(rate_limit)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._session: Optional[requests.Session] = None
+
+    def load(self) -> int:
+        """Open the name store and warm the cache from it. Returns the names loaded."""
+        if self.store is None:
+            self.store = ArtistNameStore()
+        names = self.store.load_all()
+        for artist_id, name in names.items():
+            self.cache.set(artist_id, name)
+        return len(names)
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1, pool_maxsize=self.concurrency, max_retries=1
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._session = session
+        return self._session
+
+    def _fetch_name(self, artist_id: str) -> Optional[str]:
+        """Blocking Last.fm lookup; returns None if the name could not be fetched."""
+        if not self.api_key:
+            return None
+        try:
+            response = self.session.get(
+                self.api_url,
+                params={
+                    "method": "artist.getInfo",
+                    "artist": artist_id,
+                    "api_key": self.api_key,
+                    "format": "json",
+                },
+                timeout=self.timeout,
+            )
+            if response.status_code == 200:
+                data = response.json()
+                if "artist" in data and "name" in data["artist"]:
+                    return data["artist"]["name"]
+        except Exception as e:
+            print(f"Error fetching artist {artist_id}: {e}")
+        return None
+
+    async def _fetch_and_store(self, artist_id: str) -> str:
+        async with self._semaphore:
+            await self._rate_limiter.wait()
+            start = time.perf_counter()
+            name = await asyncio.to_thread(self._fetch_name, artist_id)
+            lastfm_request_seconds.observe(time.perf_counter() - start, "ok" if name else "error")
+
+        if name is None:
+            lastfm_errors.inc()
+            name = unknown_artist_name(artist_id)
+            self.cache.set(artist_id, name, ttl=UNKNOWN_ARTIST_TTL)
+            return name
+
+        self.cache.set(artist_id, name)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.put_many, {artist_id: name})
+        return name
+
+    def _fetch_coalesced(self, artist_id: str) -> asyncio.Future:
+        future = self._inflight.get(artist_id)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch_and_store(artist_id))
+            self._inflight[artist_id] = future
+            future.add_done_callback(lambda _: self._inflight.pop(artist_id, None))
+        return future
+
+    async def resolve_many(self, artist_ids: Iterable) -> List[Dict[str, str]]:
+        """Return [{"id", "name"}] for the given artist IDs, in order."""
+        artist_ids = list(artist_ids)
+        names = {}
+        for artist_id in artist_ids:
+            cached_name = self.cache.get(str(artist_id))
+            if cached_name is not None:
+                names[artist_id] = cached_name
+
+        misses = [aid for aid in dict.fromkeys(artist_ids) if aid not in names]
+        if misses and self.store is not None:
+            stored = await asyncio.to_thread(self.store.get_many, [str(aid) for aid in misses])
+            for artist_id in misses:
+                if str(artist_id) in stored:
+                    names[artist_id] = stored[str(artist_id)]
+                    self.cache.set(str(artist_id), names[artist_id])
+            misses = [aid for aid in misses if aid not in names]
+
+        if misses:
+            # Shielded: the fetch is shared with other requests, so cancelling
+            # this one (e.g. a client disconnect) must not cancel it for them
+            fetched = await asyncio.gather(
+                *(asyncio.shield(self._fetch_coalesced(str(aid))) for aid in misses)
+            )
+            names.update(zip(misses, fetched))
+
+        return [{"id": artist_id, "name": names[artist_id]} for artist_id in artist_ids]
+
+
+artist_resolver = ArtistResolver()
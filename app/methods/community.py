@@ -0,0 +1,192 @@
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.db.graph_version import current_graph_version
+from app.db.neo4j_connection import driver
+from app.methods.graph_snapshot import GraphSnapshot
+
+# Louvain runs in mutate mode so GDS reports the modularity of the very
+# partition that is then streamed; the temporary property is dropped after
+LOUVAIN_MUTATE = """
+CALL gds.louvain.mutate($graph_name, {mutateProperty: $property})
+YIELD modularity
+RETURN modularity
+"""
+LOUVAIN_ASSIGNMENTS = """
+CALL gds.graph.nodeProperty.stream($graph_name, $property)
+YIELD nodeId, propertyValue
+RETURN gds.util.asNode(nodeId).id AS id, propertyValue AS communityId
+"""
+DROP_PROPERTY = "CALL gds.graph.nodeProperties.drop($graph_name, [$property], {failIfMissing: false})"
+
+COMMUNITY_STREAMS = {
+    "labelProp": """
+    CALL gds.labelPropagation.stream($graph_name, {maxIterations: 10})
+    YIELD nodeId, communityId
+    RETURN gds.util.asNode(nodeId).id AS id, communityId
+    """,
+}
+
+
+class CommunitySummary:
+    """
+    Everything the community endpoints need from one algorithm run.
+
+    `membership` maps each snapshot node index to a compact community index
+    (-1 if the node was not assigned); `labels` maps compact indices back to
+    the algorithm's community IDs. Community sizes and the sparse
+    community-to-community edge counts are computed once with bincount/unique,
+    after which top edges, sizes and single-community drill-downs are answered
+    from memory.
+    """
+
+    def __init__(
+        self,
+        algorithm: str,
+        snapshot: GraphSnapshot,
+        user_ids: np.ndarray,
+        community_ids: np.ndarray,
+        metrics: Dict[str, Any],
+        graph_version: Optional[int] = None,
+    ):
+        self.algorithm = algorithm
+        self.snapshot = snapshot
+        self.metrics = metrics
+        self.graph_version = current_graph_version() if graph_version is None else graph_version
+        self.projection: Optional[str] = None
+        self.created_at = time.time()
+
+        n = snapshot.node_count
+        self.labels, compact = np.unique(np.asarray(community_ids, dtype=np.int64), return_inverse=True)
+        positions = np.searchsorted(snapshot.ids, np.asarray(user_ids, dtype=np.int64))
+        positions = np.minimum(positions, n - 1)
+        known = snapshot.ids[positions] == user_ids
+        self.membership = np.full(n, -1, dtype=np.int32)
+        self.membership[positions[known]] = compact[known]
+
+        c = len(self.labels)
+        assigned = self.membership[self.membership >= 0]
+        self.sizes = np.bincount(assigned, minlength=c)
+
+        cs, ct = self.membership[snapshot.src], self.membership[snapshot.dst]
+        valid = (cs >= 0) & (ct >= 0)
+        cs, ct = cs[valid].astype(np.int64), ct[valid].astype(np.int64)
+        pairs, counts = np.unique(cs * c + ct, return_counts=True)
+        order = np.argsort(-counts, kind="stable")
+        self.edge_source = (pairs[order] // c).astype(np.int32)
+        self.edge_target = (pairs[order] % c).astype(np.int32)
+        self.edge_count = counts[order]
+
+    @property
+    def community_count(self) -> int:
+        return len(self.labels)
+
+    def _compact_index(self, community_id: int) -> Optional[int]:
+        idx = int(np.searchsorted(self.labels, community_id))
+        if idx < len(self.labels) and self.labels[idx] == community_id:
+            return idx
+        return None
+
+    def _edge_rows(self, mask: np.ndarray, top_k: int) -> List[Dict[str, int]]:
+        idx = np.flatnonzero(mask)[:top_k]
+        return [
+            {
+                "source": int(self.labels[self.edge_source[i]]),
+                "target": int(self.labels[self.edge_target[i]]),
+                "count": int(self.edge_count[i]),
+                "sourceSize": int(self.sizes[self.edge_source[i]]),
+                "targetSize": int(self.sizes[self.edge_target[i]]),
+            }
+            for i in idx
+        ]
+
+    def top_edges(self, top_k: int = 10) -> List[Dict[str, int]]:
+        """Inter-community edge counts, largest first."""
+        return self._edge_rows(self.edge_source != self.edge_target, top_k)
+
+    def largest_communities(self, top_k: int = 10) -> List[Dict[str, int]]:
+        order = np.argsort(-self.sizes, kind="stable")[:top_k]
+        return [
+            {"community": int(self.labels[i]), "size": int(self.sizes[i])}
+            for i in order
+        ]
+
+    def community(
+        self, community_id: int, top_k: int = 10, limit: int = 100, after: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        One page of members (by ID, after `after`) and the strongest
+        outgoing/incoming links of one community.
+        """
+        idx = self._compact_index(community_id)
+        if idx is None:
+            return None
+        internal = (self.edge_source == idx) & (self.edge_target == idx)
+        page, has_more = self.snapshot._page(np.flatnonzero(self.membership == idx), after, limit)
+        return {
+            "community": community_id,
+            "size": int(self.sizes[idx]),
+            "internalEdges": int(self.edge_count[internal].sum()),
+            "members": page,
+            "members_more": has_more,
+            "outgoing": self._edge_rows((self.edge_source == idx) & ~internal, top_k),
+            "incoming": self._edge_rows((self.edge_target == idx) & ~internal, top_k),
+        }
+
+
+async def _stream_louvain(session, graph_name: str) -> Tuple[List[tuple], float]:
+    property_name = f"louvain_{uuid.uuid4().hex}"
+    try:
+        result = await session.run(LOUVAIN_MUTATE, graph_name=graph_name, property=property_name)
+        modularity = (await result.single())["modularity"]
+        result = await session.run(LOUVAIN_ASSIGNMENTS, graph_name=graph_name, property=property_name)
+        rows = [(record["id"], record["communityId"]) async for record in result]
+    finally:
+        result = await session.run(DROP_PROPERTY, graph_name=graph_name, property=property_name)
+        await result.consume()
+    return rows, modularity
+
+
+async def stream_community_summary(
+    algorithm: str, graph_name: str, snapshot: GraphSnapshot
+) -> CommunitySummary:
+    """Stream one algorithm's assignments once and build its summary."""
+    graph_version = current_graph_version()
+    start = time.perf_counter()
+    async with driver.session() as session:
+        if algorithm == "louvain":
+            rows, modularity = await _stream_louvain(session, graph_name)
+        else:
+            result = await session.run(COMMUNITY_STREAMS[algorithm], graph_name=graph_name)
+            rows = [(record["id"], record["communityId"]) async for record in result]
+    elapsed_ms = round((time.perf_counter() - start) * 1000)
+
+    assignments = np.asarray(rows, dtype=np.int64).reshape(-1, 2)
+    summary = CommunitySummary(
+        algorithm, snapshot, assignments[:, 0], assignments[:, 1], metrics={},
+        graph_version=graph_version,
+    )
+    summary.projection = graph_name
+    summary.metrics = {"timeMs": elapsed_ms, "communities": summary.community_count}
+    if algorithm == "louvain":
+        summary.metrics["modularity"] = modularity
+    else:
+        # The stream procedure does not report how many iterations ran
+        summary.metrics["iterations"] = None
+    remember_summary(summary)
+    return summary
+
+
+# Latest summary per (algorithm, graph version, projection), for drill-down requests
+latest_summaries: Dict[tuple, CommunitySummary] = {}
+
+
+def remember_summary(summary: CommunitySummary) -> None:
+    """Keep `summary` as the latest for its algorithm, forgetting older graph versions."""
+    for key in [k for k in latest_summaries if k[0] == summary.algorithm]:
+        if latest_summaries[key].graph_version <= summary.graph_version:
+            del latest_summaries[key]
+    latest_summaries[(summary.algorithm, summary.graph_version, summary.projection)] = summary
@@ -0,0 +1,214 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.db.cache import notify_graph_write
+from app.db.graph_version import BUMP_GRAPH_VERSION_QUERY
+from app.db.neo4j_connection import driver
+
+# Edges per write transaction, and how many parsed batches may wait for a writer
+BULK_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", "10000"))
+BULK_WRITERS = int(os.getenv("BULK_IMPORT_WRITERS", "2"))
+BULK_QUEUE_DEPTH = int(os.getenv("BULK_IMPORT_QUEUE_DEPTH", "4"))
+
+WRITE_EDGES_QUERY = """
+UNWIND $rows AS row
+MATCH (source:User {id: row[0]}), (target:User {id: row[1]})
+OPTIONAL MATCH (source)-[existing:FOLLOWS]->(target)
+WITH source, target, existing IS NULL AS new
+MERGE (source)-[:FOLLOWS]->(target)
+RETURN source.id AS source, target.id AS target, new
+"""
+
+# Bulk batches only need counts, so no rows come back to the client
+WRITE_EDGE_BATCH_QUERY = """
+UNWIND $rows AS row
+MATCH (source:User {id: row[0]}), (target:User {id: row[1]})
+MERGE (source)-[:FOLLOWS]->(target)
+RETURN count(*) AS written
+"""
+
+
+async def _write_edges_tx(tx, rows: List[List[int]]) -> Tuple[List[tuple], List[tuple]]:
+    result = await tx.run(WRITE_EDGES_QUERY, rows=rows)
+    records = [record async for record in result]
+    summary = await result.consume()
+    written = [(record["source"], record["target"]) for record in records]
+    # A pair repeated in one request is seen as new on every row; keep it once
+    new_edges = list(dict.fromkeys(edge for edge, record in zip(written, records) if record["new"]))
+    if summary.counters.relationships_created:
+        await tx.run(BUMP_GRAPH_VERSION_QUERY)
+    return written, new_edges
+
+
+async def _write_edge_batch_tx(tx, rows: List[List[int]]) -> Tuple[int, int]:
+    result = await tx.run(WRITE_EDGE_BATCH_QUERY, rows=rows)
+    record = await result.single()
+    summary = await result.consume()
+    return record["written"], summary.counters.relationships_created
+
+
+async def write_edges(edges: List[tuple]) -> Dict[str, Any]:
+    """
+    MERGE (source)-[:FOLLOWS]->(target) for every pair in one transaction.
+
+    Returns the edges whose endpoints exist (written), the ones among them
+    that did not exist before (created_edges) and their count (created), and
+    how many pairs referenced unknown users (missing). The
+    stored graph version is bumped in the same transaction only if anything
+    was created. Graph write hooks are NOT run; callers notify once they are
+    done writing.
+    """
+    rows = [[int(source), int(target)] for source, target in edges]
+    async with driver.session() as session:
+        written, created_edges = await session.execute_write(_write_edges_tx, rows)
+    created = len(created_edges)
+    return {
+        "written": written,
+        "created_edges": created_edges,
+        "created": created,
+        "existing": len(written) - created,
+        "missing": len(rows) - len(written),
+    }
+
+
+async def write_edge_batch(edges: List[tuple]) -> Dict[str, int]:
+    """
+    Like write_edges, but returns counts only and leaves the graph version
+    alone, so concurrent bulk writers do not contend for the GraphMeta node.
+    """
+    rows = [[int(source), int(target)] for source, target in edges]
+    async with driver.session() as session:
+        written, created = await session.execute_write(_write_edge_batch_tx, rows)
+    return {"created": created, "existing": written - created, "missing": len(rows) - written}
+
+
+async def bump_stored_graph_version() -> None:
+    async with driver.session() as session:
+        result = await session.run(BUMP_GRAPH_VERSION_QUERY)
+        await result.consume()
+
+
+def _parse_line(line: str, fmt: str) -> Optional[Tuple[int, int]]:
+    """Parse one NDJSON or CSV line into (source, target); None for blank/header lines."""
+    line = line.strip()
+    if not line:
+        return None
+    if fmt == "ndjson":
+        value = json.loads(line)
+        if isinstance(value, dict):
+            return int(value["source"]), int(value["target"])
+        return int(value[0]), int(value[1])
+    source, target = line.split(",")[:2]
+    if not source.strip().lstrip("-").isdigit():
+        return None  # CSV header such as "node_1,node_2"
+    return int(source), int(target)
+
+
+async def _parse_stream(
+    chunks: AsyncIterator[bytes], fmt: str, queue: asyncio.Queue, stats: Dict[str, int]
+) -> None:
+    batch: List[Tuple[int, int]] = []
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            try:
+                edge = _parse_line(line.decode(), fmt)
+            except (ValueError, KeyError, IndexError, TypeError):
+                stats["invalid"] += 1
+                continue
+            if edge is None:
+                continue
+            batch.append(edge)
+            if len(batch) >= BULK_BATCH_SIZE:
+                stats["received"] += len(batch)
+                # Blocks while writers are behind, which stops reading the body
+                await queue.put(batch)
+                batch = []
+
+    try:
+        edge = _parse_line(buffer.decode(), fmt)
+        if edge is not None:
+            batch.append(edge)
+    except (ValueError, KeyError, IndexError, TypeError):
+        stats["invalid"] += 1
+    if batch:
+        stats["received"] += len(batch)
+        await queue.put(batch)
+
+
+async def _write_batches(queue: asyncio.Queue, stats: Dict[str, Any]) -> None:
+    while True:
+        batch = await queue.get()
+        if batch is None:
+            return
+        try:
+            result = await write_edge_batch(batch)
+        except Exception as e:
+            # Keep draining the queue so the parser never blocks on a dead writer
+            stats["failed"] += len(batch)
+            stats["errors"].append(str(e))
+            continue
+        stats["created"] += result["created"]
+        stats["existing"] += result["existing"]
+        stats["missing"] += result["missing"]
+        stats["batches"] += 1
+
+
+async def import_edge_stream(chunks: AsyncIterator[bytes], fmt: str) -> Dict[str, Any]:
+    """
+    Write a streamed NDJSON or CSV edge list to Neo4j in pipelined batches.
+
+    Parsing and writing overlap: batches go through a bounded queue to
+    BULK_WRITERS concurrent writer transactions, and parsing pauses whenever
+    the queue is full, so the body is only read as fast as it can be written.
+    A batch that fails is counted and reported; the batches around it still
+    commit. The written edges are not kept: once the stream ends, the stored
+    graph version is bumped once and the write hooks are told about a bulk
+    write (the snapshot reloads on next use).
+    """
+    stats = {
+        "received": 0, "created": 0, "existing": 0, "missing": 0,
+        "invalid": 0, "failed": 0, "batches": 0, "errors": [],
+    }
+    queue: asyncio.Queue = asyncio.Queue(maxsize=BULK_QUEUE_DEPTH)
+    writers = [
+        asyncio.create_task(_write_batches(queue, stats))
+        for _ in range(BULK_WRITERS)
+    ]
+    start = time.perf_counter()
+    try:
+        await _parse_stream(chunks, fmt, queue, stats)
+        for _ in writers:
+            await queue.put(None)
+        await asyncio.gather(*writers)
+    except BaseException:
+        for writer in writers:
+            writer.cancel()
+        raise
+    finally:
+        # Whatever was committed is in the graph, even if the import failed
+        if stats["created"]:
+            try:
+                await bump_stored_graph_version()
+            except Exception as e:
+                stats["errors"].append(f"Could not bump the graph version: {e}")
+            notify_graph_write(None)
+
+    elapsed = time.perf_counter() - start
+    return {
+        "edges_received": stats["received"],
+        "edges_written": stats["created"],
+        "edges_existing": stats["existing"],
+        "edges_missing_users": stats["missing"],
+        "invalid_lines": stats["invalid"],
+        "edges_failed": stats["failed"],
+        "errors": stats["errors"][:10],
+        "batches": stats["batches"],
+        "seconds": round(elapsed, 3),
+        "edges_per_second": round(stats["received"] / elapsed, 1) if elapsed else None,
+    }
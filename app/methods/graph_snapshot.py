@@ -0,0 +1,278 @@
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.db.cache import on_graph_write
+from app.db.graph_version import on_remote_graph_write, refresh_graph_version
+from app.db.neo4j_connection import driver
+
+EDGES_FILE = "./lasftm_asia/lastfm_asia_edges.csv"
+TARGET_FILE = "./lasftm_asia/lastfm_asia_target.csv"
+
+
+def _build_csr(src: np.ndarray, dst: np.ndarray, n: int):
+    """Build (offsets, neighbors) CSR arrays with each row sorted and deduplicated."""
+    if len(src):
+        codes = np.unique(src.astype(np.int64) * n + dst.astype(np.int64))
+        src = (codes // n).astype(np.int32)
+        dst = (codes % n).astype(np.int32)
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=offsets[1:])
+    return offsets, dst.astype(np.int32)
+
+
+def gather_neighbors(offsets: np.ndarray, neighbors: np.ndarray, rows: np.ndarray):
+    """
+    Concatenate the CSR neighbor rows of `rows` without a Python loop.
+
+    Returns (owner, values): values[i] is a neighbor of rows[owner[i]].
+    """
+    rows = np.asarray(rows)
+    starts = offsets[rows]
+    lengths = offsets[rows + 1] - starts
+    total = int(lengths.sum())
+    owner = np.repeat(np.arange(len(rows)), lengths)
+    # position within each row = global position - start of the row's block
+    within = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return owner, neighbors[np.repeat(starts, lengths) + within]
+
+
+class GraphSnapshot:
+    """
+    Immutable in-memory copy of the FOLLOWS graph in CSR form.
+
+    Nodes are addressed by their position in the sorted `ids` array. Three
+    adjacencies are kept: outgoing (following), incoming (followers) and
+    undirected (either direction). Every neighbor row is sorted, so
+    intersections are plain sorted-array merges.
+    """
+
+    def __init__(self, ids: np.ndarray, src: np.ndarray, dst: np.ndarray, source: str):
+        self.ids = np.unique(np.asarray(ids, dtype=np.int64))
+        n = len(self.ids)
+        src_idx = np.searchsorted(self.ids, np.asarray(src, dtype=np.int64)).astype(np.int32)
+        dst_idx = np.searchsorted(self.ids, np.asarray(dst, dtype=np.int64)).astype(np.int32)
+        keep = src_idx != dst_idx
+        self.src, self.dst = src_idx[keep], dst_idx[keep]
+
+        self.out_offsets, self.out_neighbors = _build_csr(self.src, self.dst, n)
+        self.in_offsets, self.in_neighbors = _build_csr(self.dst, self.src, n)
+        self.und_offsets, self.und_neighbors = _build_csr(
+            np.concatenate([self.src, self.dst]), np.concatenate([self.dst, self.src]), n
+        )
+        self.source = source
+        self.loaded_at = time.time()
+
+    @property
+    def node_count(self) -> int:
+        return len(self.ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.out_neighbors)
+
+    def index_of(self, user_id: int) -> Optional[int]:
+        """Return the internal index of a user ID, or None if it is not in the snapshot."""
+        idx = int(np.searchsorted(self.ids, user_id))
+        if idx < len(self.ids) and self.ids[idx] == user_id:
+            return idx
+        return None
+
+    def has_user(self, user_id: int) -> bool:
+        return self.index_of(user_id) is not None
+
+    def _row(self, offsets: np.ndarray, neighbors: np.ndarray, idx: int) -> np.ndarray:
+        return neighbors[offsets[idx]:offsets[idx + 1]]
+
+    def following(self, user_id: int) -> List[int]:
+        idx = self.index_of(user_id)
+        if idx is None:
+            return []
+        return self.ids[self._row(self.out_offsets, self.out_neighbors, idx)].tolist()
+
+    def followers(self, user_id: int) -> List[int]:
+        idx = self.index_of(user_id)
+        if idx is None:
+            return []
+        return self.ids[self._row(self.in_offsets, self.in_neighbors, idx)].tolist()
+
+    def neighbors(self, user_id: int) -> List[int]:
+        idx = self.index_of(user_id)
+        if idx is None:
+            return []
+        return self.ids[self._row(self.und_offsets, self.und_neighbors, idx)].tolist()
+
+    def common_neighbors(self, user1_id: int, user2_id: int) -> List[int]:
+        """Users adjacent (in either direction) to both users, sorted by ID."""
+        i, j = self.index_of(user1_id), self.index_of(user2_id)
+        if i is None or j is None or i == j:
+            return []
+        common = np.intersect1d(
+            self._row(self.und_offsets, self.und_neighbors, i),
+            self._row(self.und_offsets, self.und_neighbors, j),
+            assume_unique=True,
+        )
+        return self.ids[common].tolist()
+
+    def _page(self, row: np.ndarray, after: Optional[int], limit: int) -> Tuple[List[int], bool]:
+        """Keyset page of a sorted index row: up to `limit` IDs greater than `after`."""
+        start = 0
+        if after is not None:
+            # Rows are sorted by index, and index order is ID order
+            start = int(np.searchsorted(row, np.searchsorted(self.ids, after, side="right")))
+        page = row[start:start + limit]
+        return self.ids[page].tolist(), start + limit < len(row)
+
+    def neighbor_page(
+        self, kind: str, user_id: int, after: Optional[int] = None, limit: int = 100
+    ) -> Tuple[List[int], int, bool]:
+        """
+        One page of a user's 'following', 'followers' or 'neighbors' IDs.
+
+        Returns (ids, total, has_more); the total is the degree, so nothing
+        beyond the page is materialised.
+        """
+        offsets, neighbors = {
+            "following": (self.out_offsets, self.out_neighbors),
+            "followers": (self.in_offsets, self.in_neighbors),
+            "neighbors": (self.und_offsets, self.und_neighbors),
+        }[kind]
+        idx = self.index_of(user_id)
+        if idx is None:
+            return [], 0, False
+        row = self._row(offsets, neighbors, idx)
+        page, has_more = self._page(row, after, limit)
+        return page, len(row), has_more
+
+    def common_neighbor_page(
+        self, user1_id: int, user2_id: int, after: Optional[int] = None, limit: int = 100
+    ) -> Tuple[List[int], int, bool]:
+        """One page of common_neighbors(user1_id, user2_id), as (ids, total, has_more)."""
+        i, j = self.index_of(user1_id), self.index_of(user2_id)
+        if i is None or j is None or i == j:
+            return [], 0, False
+        common = np.intersect1d(
+            self._row(self.und_offsets, self.und_neighbors, i),
+            self._row(self.und_offsets, self.und_neighbors, j),
+            assume_unique=True,
+        )
+        page, has_more = self._page(common, after, limit)
+        return page, len(common), has_more
+
+    def with_edges(self, edges: List[tuple]) -> "GraphSnapshot":
+        """Return a new snapshot with the given (source_id, target_id) edges added."""
+        if not edges:
+            return self
+        new = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        ids = np.union1d(self.ids, new.ravel())
+        return GraphSnapshot(
+            ids,
+            np.concatenate([self.ids[self.src], new[:, 0]]),
+            np.concatenate([self.ids[self.dst], new[:, 1]]),
+            source=self.source,
+        )
+
+    def stats(self) -> Dict[str, object]:
+        nbytes = sum(
+            a.nbytes
+            for a in (
+                self.ids, self.src, self.dst,
+                self.out_offsets, self.out_neighbors,
+                self.in_offsets, self.in_neighbors,
+                self.und_offsets, self.und_neighbors,
+            )
+        )
+        return {
+            "source": self.source,
+            "nodes": self.node_count,
+            "edges": self.edge_count,
+            "bytes": int(nbytes),
+            "loaded_at": self.loaded_at,
+        }
+
+
+async def load_snapshot_from_neo4j() -> GraphSnapshot:
+    """Read every User ID and FOLLOWS edge from Neo4j into a snapshot."""
+    async with driver.session() as session:
+        result = await session.run("MATCH (u:User) RETURN collect(u.id) AS ids")
+        ids = (await result.single())["ids"]
+        result = await session.run(
+            "MATCH (a:User)-[:FOLLOWS]->(b:User) RETURN a.id AS source, b.id AS target"
+        )
+        edges = [(record["source"], record["target"]) async for record in result]
+    edge_array = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    return GraphSnapshot(ids, edge_array[:, 0], edge_array[:, 1], source="neo4j")
+
+
+def load_snapshot_from_csv(
+    edges_file: str = EDGES_FILE, target_file: Optional[str] = TARGET_FILE
+) -> GraphSnapshot:
+    """Read the LastFM Asia edge list (and node list, if available) from disk."""
+    edges = np.loadtxt(edges_file, delimiter=",", skiprows=1, dtype=np.int64, ndmin=2)
+    ids = edges.ravel()
+    if target_file and os.path.exists(target_file):
+        target_ids = np.loadtxt(
+            target_file, delimiter=",", skiprows=1, usecols=0, dtype=np.int64, ndmin=1
+        )
+        ids = np.union1d(ids, target_ids)
+    return GraphSnapshot(ids, edges[:, 0], edges[:, 1], source="csv")
+
+
+_snapshot: Optional[GraphSnapshot] = None
+_snapshot_lock = asyncio.Lock()
+
+
+async def get_snapshot() -> Optional[GraphSnapshot]:
+    """
+    Return the process-wide snapshot, loading it on first use.
+
+    Neo4j is tried first so the snapshot reflects any edges added through the
+    API; the bundled CSV is used when the database is unreachable. Returns None
+    if neither source is available, in which case callers query Neo4j directly.
+    Writes made by other workers are picked up through the stored graph
+    version, which drops the snapshot so it reloads.
+    """
+    global _snapshot
+    await refresh_graph_version()
+    if _snapshot is not None:
+        return _snapshot
+    async with _snapshot_lock:
+        if _snapshot is not None:
+            return _snapshot
+        start = time.perf_counter()
+        try:
+            _snapshot = await load_snapshot_from_neo4j()
+        except Exception as e:
+            print(f"Could not load graph snapshot from Neo4j: {e}")
+            try:
+                _snapshot = load_snapshot_from_csv()
+            except Exception as e:
+                print(f"Could not load graph snapshot from CSV: {e}")
+                return None
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        stats = _snapshot.stats()
+        print(
+            f"Loaded graph snapshot from {stats['source']}: {stats['nodes']} nodes, "
+            f"{stats['edges']} edges, {stats['bytes'] / 1024:.0f} KB in {elapsed_ms:.0f} ms"
+        )
+        return _snapshot
+
+
+@on_graph_write
+def add_edges_to_snapshot(edges: Optional[List[tuple]]) -> None:
+    """Apply edges written to Neo4j to the loaded snapshot, or reload it after a bulk write."""
+    global _snapshot
+    if edges is None:
+        _snapshot = None
+    elif _snapshot is not None:
+        _snapshot = _snapshot.with_edges(edges)
+
+
+@on_remote_graph_write
+def reset_snapshot() -> None:
+    """Drop the loaded snapshot so the next access reloads it."""
+    global _snapshot
+    _snapshot = None
@@ -0,0 +1,162 @@
+import asyncio
+import inspect
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from app.db.graph_version import current_graph_version
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+JOB_MAX_RETAINED = int(os.getenv("JOB_MAX_RETAINED", "100"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class Job:
+    def __init__(self, kind: str, params: Dict[str, Any], key: Tuple[str, str, int]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.key = key
+        self.graph_version = current_graph_version()
+        self.status = QUEUED
+        self.progress = 0.0
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def report_progress(self, fraction: float) -> None:
+        self.progress = max(self.progress, min(1.0, fraction))
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "progress": round(self.progress, 3),
+            "graph_version": self.graph_version,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "runtime_seconds": (
+                round(self.finished_at - self.started_at, 3)
+                if self.finished_at and self.started_at else None
+            ),
+        }
+
+
+class JobManager:
+    """
+    Runs registered analytics in the background on a bounded number of workers.
+
+    Submitting returns a job straight away. An identical job (same kind,
+    parameters and graph version) that is still queued or running is returned
+    instead of starting a second run. Finished jobs are kept for
+    `retention_seconds`, and at most `max_retained` of them at a time.
+    """
+
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        retention_seconds: float = JOB_RETENTION_SECONDS,
+        max_retained: int = JOB_MAX_RETAINED,
+    ):
+        self.retention_seconds = retention_seconds
+        self.max_retained = max_retained
+        self._semaphore = asyncio.Semaphore(workers)
+        self._kinds: Dict[str, Tuple[Callable[..., Awaitable[Any]], Type[BaseModel]]] = {}
+        self._jobs: Dict[str, Job] = {}
+        self._active: Dict[tuple, Job] = {}
+
+    def register(
+        self, kind: str, fn: Callable[..., Awaitable[Any]], params: Type[BaseModel]
+    ) -> None:
+        """
+        Make `fn(**params)` submittable as `kind`, with parameters validated by
+        the `params` model. `fn` may accept a `progress` callback.
+        """
+        self._kinds[kind] = (fn, params)
+
+    @property
+    def kinds(self) -> List[str]:
+        return sorted(self._kinds)
+
+    def submit(self, kind: str, params: Optional[Dict[str, Any]] = None) -> Job:
+        """
+        Queue a job; raises KeyError for unknown kinds and
+        pydantic.ValidationError for bad params.
+        """
+        fn, model = self._kinds[kind]
+        validated = model.model_validate(params or {})
+        params = validated.model_dump()
+
+        # Defaults are filled in, so {} and the explicit defaults share a job
+        key = (kind, validated.model_dump_json(), current_graph_version())
+        active = self._active.get(key)
+        if active is not None:
+            return active
+
+        self._prune()
+        job = Job(kind, params, key)
+        self._jobs[job.id] = job
+        self._active[key] = job
+        job.task = asyncio.ensure_future(self._run(job, fn))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._prune()
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        self._prune()
+        return sorted(self._jobs.values(), key=lambda job: job.submitted_at, reverse=True)
+
+    async def _run(self, job: Job, fn: Callable[..., Awaitable[Any]]) -> None:
+        kwargs = dict(job.params)
+        if "progress" in inspect.signature(fn).parameters:
+            kwargs["progress"] = job.report_progress
+        try:
+            async with self._semaphore:
+                job.status = RUNNING
+                job.started_at = time.time()
+                job.result = await fn(**kwargs)
+                job.status = DONE
+                job.progress = 1.0
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            self._active.pop(job.key, None)
+
+    def _prune(self) -> None:
+        now = time.time()
+        finished = sorted(
+            (job for job in self._jobs.values() if job.finished),
+            key=lambda job: job.finished_at,
+        )
+        excess = len(finished) - self.max_retained
+        for i, job in enumerate(finished):
+            if i < excess or now - job.finished_at > self.retention_seconds:
+                del self._jobs[job.id]
+
+    async def close(self) -> None:
+        for job in self._jobs.values():
+            if job.task is not None and not job.task.done():
+                job.task.cancel()
+
+
+job_manager = JobManager()
@@ -0,0 +1,320 @@
+import asyncio
+import hashlib
+import heapq
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.db.graph_version import current_graph_version
+from app.methods.graph_snapshot import GraphSnapshot, gather_neighbors, get_snapshot
+
+LANDMARK_COUNT = int(os.getenv("LANDMARK_COUNT", "16"))
+# "farthest" spreads landmarks by farthest-point sampling; "degree" takes the hubs
+LANDMARK_STRATEGY = os.getenv("LANDMARK_STRATEGY", "farthest")
+LANDMARK_INDEX_PATH = os.getenv("LANDMARK_INDEX_PATH", "./landmarks.npz")
+
+# Distances are stored as uint8; this value means "unreachable"
+UNREACHABLE = 255
+
+
+def bfs_distances(offsets: np.ndarray, neighbors: np.ndarray, source: int) -> np.ndarray:
+    """Hop distance from `source` to every node (UNREACHABLE if none) as uint8."""
+    dist = np.full(len(offsets) - 1, UNREACHABLE, dtype=np.uint8)
+    dist[source] = 0
+    frontier = np.array([source], dtype=np.int64)
+    level = 0
+    while len(frontier) and level < UNREACHABLE - 1:
+        level += 1
+        _, reached = gather_neighbors(offsets, neighbors, frontier)
+        reached = np.unique(reached[dist[reached] == UNREACHABLE])
+        dist[reached] = level
+        frontier = reached
+    return dist
+
+
+def save_npz_atomic(path: str, **arrays) -> None:
+    """
+    Write arrays to `path` via a uniquely named temporary file in the same
+    directory, so concurrent writers never interleave and readers never see
+    a partial file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(dir=directory, suffix=".tmp.npz", delete=False) as f:
+        tmp = f.name
+        try:
+            np.savez(f, **arrays)
+        except BaseException:
+            f.close()
+            os.remove(tmp)
+            raise
+    os.replace(tmp, path)
+
+
+def snapshot_fingerprint(snapshot: GraphSnapshot) -> str:
+    """Digest of the node IDs and canonical (sorted CSR) FOLLOWS edges."""
+    digest = hashlib.sha1()
+    for array in (snapshot.ids, snapshot.out_offsets, snapshot.out_neighbors):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+def choose_landmarks(snapshot: GraphSnapshot, k: int, strategy: str) -> np.ndarray:
+    degree = np.diff(snapshot.und_offsets)
+    k = min(k, snapshot.node_count)
+    if strategy == "degree":
+        return np.argsort(-degree, kind="stable")[:k]
+
+    # Farthest-point: start at the biggest hub, then repeatedly take the node
+    # farthest (undirected) from every landmark chosen so far
+    landmarks = [int(np.argmax(degree))]
+    nearest = bfs_distances(snapshot.und_offsets, snapshot.und_neighbors, landmarks[0]).astype(np.int16)
+    while len(landmarks) < k:
+        # Unreached components count as farthest, so each one gets a landmark
+        candidate = int(np.argmax(np.where(np.isin(np.arange(len(nearest)), landmarks), -1, nearest)))
+        landmarks.append(candidate)
+        dist = bfs_distances(snapshot.und_offsets, snapshot.und_neighbors, candidate)
+        nearest = np.minimum(nearest, dist)
+    return np.asarray(landmarks, dtype=np.int64)
+
+
+class LandmarkIndex:
+    """
+    Directed hop distances between k landmarks and every node, as uint8.
+
+    `from_landmark[i, v]` is d(L_i, v) and `to_landmark[i, v]` is d(v, L_i).
+    By the triangle inequality these bound any d(s, t) in O(k):
+    max(d(L, t) - d(L, s), d(s, L) - d(t, L)) <= d(s, t) <= d(s, L) + d(L, t),
+    and the lower bound is the A* (ALT) heuristic for exact searches.
+    """
+
+    def __init__(
+        self,
+        landmarks: np.ndarray,
+        from_landmark: np.ndarray,
+        to_landmark: np.ndarray,
+        fingerprint: str,
+        graph_version: int,
+        build_ms: float = 0.0,
+    ):
+        self.landmarks = landmarks
+        self.from_landmark = from_landmark
+        self.to_landmark = to_landmark
+        self.fingerprint = fingerprint
+        self.graph_version = graph_version
+        self.build_ms = build_ms
+
+    @classmethod
+    def build(cls, snapshot: GraphSnapshot, k: int = LANDMARK_COUNT, strategy: str = LANDMARK_STRATEGY):
+        start = time.perf_counter()
+        landmarks = choose_landmarks(snapshot, k, strategy)
+        from_landmark = np.stack([
+            bfs_distances(snapshot.out_offsets, snapshot.out_neighbors, int(l)) for l in landmarks
+        ])
+        to_landmark = np.stack([
+            bfs_distances(snapshot.in_offsets, snapshot.in_neighbors, int(l)) for l in landmarks
+        ])
+        return cls(
+            landmarks, from_landmark, to_landmark,
+            snapshot_fingerprint(snapshot), current_graph_version(),
+            build_ms=round((time.perf_counter() - start) * 1000, 1),
+        )
+
+    def save(self, path: str = LANDMARK_INDEX_PATH) -> None:
+        save_npz_atomic(
+            path,
+            landmarks=self.landmarks,
+            from_landmark=self.from_landmark,
+            to_landmark=self.to_landmark,
+            fingerprint=np.array(self.fingerprint),
+            graph_version=np.array(self.graph_version),
+        )
+
+    @classmethod
+    def load(cls, path: str = LANDMARK_INDEX_PATH) -> Optional["LandmarkIndex"]:
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return cls(
+                data["landmarks"], data["from_landmark"], data["to_landmark"],
+                str(data["fingerprint"]), int(data["graph_version"]),
+            )
+
+    @property
+    def nbytes(self) -> int:
+        return self.from_landmark.nbytes + self.to_landmark.nbytes
+
+    def _columns(self, nodes) -> Tuple[np.ndarray, np.ndarray]:
+        return (
+            self.from_landmark[:, nodes].astype(np.int16),
+            self.to_landmark[:, nodes].astype(np.int16),
+        )
+
+    def bounds(self, s: int, t: int) -> Dict[str, Any]:
+        """Lower/upper bounds on d(s, t); reachable is False when a landmark proves there is no path."""
+        if s == t:
+            return {"reachable": True, "lower_bound": 0, "upper_bound": 0}
+        fs, ts = self._columns(s)
+        ft, tt = self._columns(t)
+        # L reaches s but not t, or t reaches L but s does not: s cannot reach t
+        if np.any((fs < UNREACHABLE) & (ft == UNREACHABLE)) or np.any((tt < UNREACHABLE) & (ts == UNREACHABLE)):
+            return {"reachable": False, "lower_bound": None, "upper_bound": None}
+
+        lower = 1
+        known = (fs < UNREACHABLE) & (ft < UNREACHABLE)
+        if known.any():
+            lower = max(lower, int((ft - fs)[known].max()))
+        known = (ts < UNREACHABLE) & (tt < UNREACHABLE)
+        if known.any():
+            lower = max(lower, int((ts - tt)[known].max()))
+
+        via = (ts < UNREACHABLE) & (ft < UNREACHABLE)
+        upper = int((ts + ft)[via].min()) if via.any() else None
+        return {"reachable": None if upper is None else True, "lower_bound": lower, "upper_bound": upper}
+
+    def heuristic(self, nodes: np.ndarray, t: int) -> np.ndarray:
+        """
+        ALT lower bound on d(v, t) for every v in `nodes`; -1 where a landmark
+        proves v cannot reach t.
+        """
+        fv, tv = self._columns(nodes)
+        ft, tt = self._columns(t)
+        ft, tt = ft[:, None], tt[:, None]
+        dead = np.any((fv < UNREACHABLE) & (ft == UNREACHABLE), axis=0) | np.any(
+            (tt < UNREACHABLE) & (tv == UNREACHABLE), axis=0
+        )
+        forward = np.where((fv < UNREACHABLE) & (ft < UNREACHABLE), ft - fv, 0)
+        backward = np.where((tv < UNREACHABLE) & (tt < UNREACHABLE), tv - tt, 0)
+        h = np.maximum(np.maximum(forward, backward).max(axis=0), 0)
+        return np.where(dead, -1, h)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "landmarks": len(self.landmarks),
+            "bytes": int(self.nbytes),
+            "graph_version": self.graph_version,
+            "fingerprint": self.fingerprint,
+            "build_ms": self.build_ms,
+        }
+
+
+def alt_path(
+    index: LandmarkIndex, snapshot: GraphSnapshot, s: int, t: int
+) -> Tuple[Optional[List[int]], int]:
+    """
+    Exact shortest directed path from s to t with A* guided by the landmark
+    lower bounds (ALT). Returns (path as indices or None, nodes expanded).
+    """
+    if s == t:
+        return [s], 0
+    if index.bounds(s, t)["reachable"] is False:
+        return None, 0
+
+    n = snapshot.node_count
+    g = np.full(n, -1, dtype=np.int32)
+    parent = np.full(n, -1, dtype=np.int64)
+    closed = np.zeros(n, dtype=bool)
+    g[s], parent[s] = 0, s
+    heap = [(int(index.heuristic(np.array([s]), t)[0]), 0, s)]
+    expanded = 0
+
+    while heap:
+        _, dist, u = heapq.heappop(heap)
+        if closed[u]:
+            continue
+        if u == t:
+            path = [t]
+            while path[-1] != s:
+                path.append(int(parent[path[-1]]))
+            return path[::-1], expanded
+        closed[u] = True
+        expanded += 1
+
+        row = snapshot.out_neighbors[snapshot.out_offsets[u]:snapshot.out_offsets[u + 1]]
+        better = row[(~closed[row]) & ((g[row] < 0) | (g[row] > dist + 1))]
+        if not len(better):
+            continue
+        h = index.heuristic(better, t)
+        keep = h >= 0
+        better, h = better[keep], h[keep]
+        g[better] = dist + 1
+        parent[better] = u
+        for v, hv in zip(better.tolist(), h.tolist()):
+            heapq.heappush(heap, (dist + 1 + hv, dist + 1, v))
+    return None, expanded
+
+
+_index: Optional[LandmarkIndex] = None
+_index_snapshot: Optional[GraphSnapshot] = None
+_index_lock = asyncio.Lock()
+_build_task: Optional[asyncio.Task] = None
+
+
+def landmark_index_for(snapshot: GraphSnapshot) -> Optional[LandmarkIndex]:
+    """
+    The index already built for `snapshot`, or None. Never builds on the
+    caller's time: when there is no index for this snapshot (e.g. right after
+    a write) a build is started in the background and None is returned.
+    """
+    if _index is not None and _index_snapshot is snapshot:
+        return _index
+    schedule_landmark_index_build()
+    return None
+
+
+def schedule_landmark_index_build() -> None:
+    """Bring the index up to date with the current snapshot in a background task."""
+    global _build_task
+    if _build_task is None or _build_task.done():
+        _build_task = asyncio.ensure_future(_build_in_background())
+
+
+async def _build_in_background() -> None:
+    try:
+        await get_landmark_index()
+    except Exception as e:
+        print(f"Could not prepare landmark index: {e}")
+
+
+async def get_landmark_index() -> Optional[Tuple[LandmarkIndex, GraphSnapshot]]:
+    """
+    Return the landmark index together with the snapshot it was built for.
+
+    The index holds node positions of that snapshot, so callers must use the
+    returned snapshot rather than fetching the current one separately. The
+    index follows the snapshot: after a graph write replaces the snapshot, the
+    next call rebuilds it. A saved index is reused when its fingerprint
+    matches the snapshot, so restarts do not pay for the BFS runs.
+    """
+    global _index, _index_snapshot
+    snapshot = await get_snapshot()
+    if snapshot is None:
+        return None
+    index = _index
+    if index is not None and _index_snapshot is snapshot:
+        return index, snapshot
+
+    async with _index_lock:
+        if _index is not None and _index_snapshot is snapshot:
+            return _index, snapshot
+        fingerprint = await asyncio.to_thread(snapshot_fingerprint, snapshot)
+        if _index is None or _index.fingerprint != fingerprint:
+            try:
+                loaded = await asyncio.to_thread(LandmarkIndex.load, LANDMARK_INDEX_PATH)
+            except Exception as e:
+                print(f"Could not load landmark index: {e}")
+                loaded = None
+            if loaded is not None and loaded.fingerprint == fingerprint:
+                print(f"Loaded landmark index from {LANDMARK_INDEX_PATH}")
+                _index = loaded
+            else:
+                _index = await asyncio.to_thread(LandmarkIndex.build, snapshot)
+                print(f"Built landmark index ({len(_index.landmarks)} landmarks) in {_index.build_ms} ms")
+                try:
+                    await asyncio.to_thread(_index.save, LANDMARK_INDEX_PATH)
+                except Exception as e:
+                    print(f"Could not save landmark index: {e}")
+        _index_snapshot = snapshot
+        return _index, snapshot
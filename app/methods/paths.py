@@ -0,0 +1,118 @@
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.methods.graph_snapshot import GraphSnapshot, gather_neighbors
+
+# A source with at least this many targets in a batch gets one full BFS
+# instead of a bidirectional search per target
+SINGLE_SOURCE_MIN_TARGETS = 8
+
+
+def _expand(
+    offsets: np.ndarray,
+    neighbors: np.ndarray,
+    frontier: np.ndarray,
+    parent: np.ndarray,
+    dist: np.ndarray,
+) -> np.ndarray:
+    """Advance one BFS level from `frontier`, recording parents; returns the new frontier."""
+    owner, reached = gather_neighbors(offsets, neighbors, frontier)
+    fresh = parent[reached] < 0
+    reached, first = np.unique(reached[fresh], return_index=True)
+    parent[reached] = frontier[owner[fresh][first]]
+    dist[reached] = dist[frontier[0]] + 1
+    return reached
+
+
+def _walk(parent: np.ndarray, node: int) -> List[int]:
+    """Follow parents from `node` back to the BFS root (whose parent is itself)."""
+    path = [node]
+    while parent[node] != node:
+        node = int(parent[node])
+        path.append(node)
+    return path
+
+
+def bidirectional_path(snapshot: GraphSnapshot, source: int, target: int) -> Optional[List[int]]:
+    """
+    Shortest directed FOLLOWS path between two snapshot indices, as indices.
+
+    Searches forward from the source along outgoing edges and backward from
+    the target along incoming edges, always growing the side with the smaller
+    frontier by one full level. At the first level where the searches meet,
+    the meeting node closest to the target gives a shortest path. Returns
+    None if the target is unreachable.
+    """
+    if source == target:
+        return [source]
+    n = snapshot.node_count
+    parent_f = np.full(n, -1, dtype=np.int64)
+    parent_b = np.full(n, -1, dtype=np.int64)
+    dist_f = np.full(n, -1, dtype=np.int32)
+    dist_b = np.full(n, -1, dtype=np.int32)
+    parent_f[source], dist_f[source] = source, 0
+    parent_b[target], dist_b[target] = target, 0
+    frontier_f = np.array([source], dtype=np.int64)
+    frontier_b = np.array([target], dtype=np.int64)
+
+    while len(frontier_f) and len(frontier_b):
+        if len(frontier_f) <= len(frontier_b):
+            frontier_f = _expand(snapshot.out_offsets, snapshot.out_neighbors, frontier_f, parent_f, dist_f)
+            met = frontier_f[dist_b[frontier_f] >= 0]
+        else:
+            frontier_b = _expand(snapshot.in_offsets, snapshot.in_neighbors, frontier_b, parent_b, dist_b)
+            met = frontier_b[dist_f[frontier_b] >= 0]
+        if len(met):
+            meet = int(met[np.argmin(dist_f[met] + dist_b[met])])
+            return _walk(parent_f, meet)[::-1] + _walk(parent_b, meet)[1:]
+    return None
+
+
+def single_source_paths(
+    snapshot: GraphSnapshot, source: int, targets: List[int]
+) -> Dict[int, Optional[List[int]]]:
+    """Shortest directed paths from one source to many targets with a single BFS."""
+    n = snapshot.node_count
+    parent = np.full(n, -1, dtype=np.int64)
+    dist = np.full(n, -1, dtype=np.int32)
+    parent[source], dist[source] = source, 0
+    remaining = set(targets) - {source}
+    frontier = np.array([source], dtype=np.int64)
+    while remaining and len(frontier):
+        frontier = _expand(snapshot.out_offsets, snapshot.out_neighbors, frontier, parent, dist)
+        remaining.difference_update(frontier.tolist())
+    return {
+        target: _walk(parent, target)[::-1] if parent[target] >= 0 else None
+        for target in targets
+    }
+
+
+def batch_paths(
+    snapshot: GraphSnapshot, pairs: List[Tuple[int, int]]
+) -> List[Optional[List[int]]]:
+    """
+    Shortest paths for many (source_id, target_id) pairs, as user ID lists.
+
+    Pairs are grouped by source: a source with many targets is answered by
+    one BFS, the others by bidirectional search. Pairs with an unknown user or
+    no path get None.
+    """
+    by_source: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+    results: List[Optional[List[int]]] = [None] * len(pairs)
+    for position, (source_id, target_id) in enumerate(pairs):
+        source, target = snapshot.index_of(source_id), snapshot.index_of(target_id)
+        if source is not None and target is not None:
+            by_source[source].append((position, target))
+
+    for source, wanted in by_source.items():
+        if len(wanted) >= SINGLE_SOURCE_MIN_TARGETS:
+            found = single_source_paths(snapshot, source, [target for _, target in wanted])
+            paths = [found[target] for _, target in wanted]
+        else:
+            paths = [bidirectional_path(snapshot, source, target) for _, target in wanted]
+        for (position, _), path in zip(wanted, paths):
+            if path is not None:
+                results[position] = snapshot.ids[path].tolist()
+    return results
@@ -0,0 +1,275 @@
+import asyncio
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from app.db.cache import on_graph_write
+from app.db.neo4j_connection import driver
+
+PROJECTION_BASE_NAME = "lastfm"
+
+# Rebuild once this many edges are pending, or this many seconds after the last write
+REBUILD_AFTER_WRITES = int(os.getenv("PROJECTION_REBUILD_AFTER_WRITES", "500"))
+REBUILD_DEBOUNCE_SECONDS = float(os.getenv("PROJECTION_REBUILD_DEBOUNCE", "10"))
+
+# Readers that picked up the old name just before a swap get this long to finish
+DROP_GRACE_SECONDS = float(os.getenv("PROJECTION_DROP_GRACE", "120"))
+
+# How long a worker reuses the projection name it last read from GraphMeta
+PROJECTION_NAME_TTL = float(os.getenv("PROJECTION_NAME_TTL", "2"))
+
+PROJECT_QUERY = """
+CALL gds.graph.project(
+    $graph_name,
+    'User',
+    {
+        FOLLOWS: {
+            orientation: 'NATURAL'
+        }
+    }
+)
+YIELD graphName, nodeCount, relationshipCount, projectMillis
+RETURN graphName, nodeCount, relationshipCount, projectMillis
+"""
+
+# The projection readers use is stored on GraphMeta so every worker agrees on it
+READ_PROJECTION_QUERY = """
+MATCH (m:GraphMeta {name: 'lastfm'})
+RETURN m.projection AS name, m.projection_generation AS generation
+"""
+
+# Generations are handed out by Neo4j, so concurrent rebuilds in different
+# workers never project (or clean up) the same name
+CLAIM_GENERATION_QUERY = """
+MERGE (m:GraphMeta {name: 'lastfm'})
+SET m.projection_next_generation = coalesce(
+    m.projection_next_generation, coalesce(m.projection_generation, 1)
+) + 1
+RETURN m.projection_next_generation AS generation
+"""
+
+# Publish only if newer than what is stored, so a slow rebuild never wins over a later one
+PUBLISH_PROJECTION_QUERY = """
+MERGE (m:GraphMeta {name: 'lastfm'})
+WITH m, coalesce(m.projection_generation, 0) < $generation AS newer, m.projection AS previous
+SET m.projection = CASE WHEN newer THEN $graph_name ELSE m.projection END,
+    m.projection_generation = CASE WHEN newer THEN $generation ELSE m.projection_generation END
+RETURN newer, previous
+"""
+
+
+class ProjectionManager:
+    """
+    Keeps the in-memory GDS projection in step with FOLLOWS writes.
+
+    Writes are counted as they happen; a rebuild starts once enough are pending
+    or the writes have gone quiet for the debounce interval, so a burst of
+    writes costs one projection. The new projection is built under a fresh
+    versioned name ('lastfm_v2', 'lastfm_v3', ...) and is published on the
+    GraphMeta node only once it is complete, so readers always see a full
+    graph. Readers resolve the published name through `current_name()`, which
+    every worker re-reads at most PROJECTION_NAME_TTL seconds apart. Replaced
+    projections are dropped after a grace period, never immediately.
+    """
+
+    def __init__(
+        self,
+        base_name: str = PROJECTION_BASE_NAME,
+        rebuild_after_writes: int = REBUILD_AFTER_WRITES,
+        debounce_seconds: float = REBUILD_DEBOUNCE_SECONDS,
+        drop_grace_seconds: float = DROP_GRACE_SECONDS,
+    ):
+        self.base_name = base_name
+        self.rebuild_after_writes = rebuild_after_writes
+        self.debounce_seconds = debounce_seconds
+        self.drop_grace_seconds = drop_grace_seconds
+        self.name = base_name
+        self.generation = 1
+        self.pending_writes = 0
+        self.rebuilds = 0
+        self.last_rebuild: Optional[Dict[str, Any]] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._rebuild_task: Optional[asyncio.Task] = None
+        self._background: set = set()
+        self._checked_at = 0.0
+
+    def _generation_of(self, graph_name: str) -> Optional[int]:
+        if graph_name == self.base_name:
+            return 1
+        match = re.fullmatch(re.escape(self.base_name) + r"_v(\d+)", graph_name)
+        return int(match.group(1)) if match else None
+
+    async def _read_published(self) -> Optional[tuple]:
+        async with driver.session() as session:
+            result = await session.run(READ_PROJECTION_QUERY)
+            record = await result.single()
+        if record is None or record["name"] is None:
+            return None
+        return record["name"], record["generation"] or 1
+
+    async def current_name(self) -> str:
+        """The published projection name, re-read from GraphMeta once the TTL has passed."""
+        now = time.monotonic()
+        if now - self._checked_at < PROJECTION_NAME_TTL:
+            return self.name
+        self._checked_at = now
+        try:
+            published = await self._read_published()
+        except Exception as e:
+            print(f"Could not read the published projection: {e}")
+            return self.name
+        if published is not None and published[1] >= self.generation:
+            self.name, self.generation = published
+        return self.name
+
+    async def discover(self) -> str:
+        """
+        Adopt the published projection, e.g. after a restart, or publish the
+        newest existing one if none is published yet. Projections older than
+        the published one are dropped after the grace period, since workers
+        that have not re-read the name yet may still be using them.
+        """
+        async with driver.session() as session:
+            result = await session.run("CALL gds.graph.list() YIELD graphName RETURN graphName")
+            names = [record["graphName"] async for record in result]
+
+        generations = {
+            name: gen for name in names
+            if (gen := self._generation_of(name)) is not None
+        }
+        published = await self._read_published()
+        if published is not None and published[0] in generations:
+            self.name, self.generation = published
+        elif generations:
+            newest = max(generations, key=generations.get)
+            self.name, self.generation = newest, generations[newest]
+            await self._publish(self.name, self.generation)
+        self._checked_at = time.monotonic()
+
+        for stale, generation in generations.items():
+            if generation < self.generation:
+                self._spawn(self._drop(stale, delay=self.drop_grace_seconds))
+        return self.name
+
+    async def _publish(self, graph_name: str, generation: int) -> tuple:
+        async with driver.session() as session:
+            result = await session.run(
+                PUBLISH_PROJECTION_QUERY, graph_name=graph_name, generation=generation
+            )
+            record = await result.single()
+        return record["newer"], record["previous"]
+
+    def note_writes(self, count: int) -> None:
+        """Record `count` new edges and schedule a rebuild accordingly."""
+        self.pending_writes += count
+        if self.pending_writes >= self.rebuild_after_writes:
+            self._schedule(0)
+        else:
+            self._schedule(self.debounce_seconds)
+
+    def _schedule(self, delay: float) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Not inside the API; the next startup re-projects if needed
+
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = loop.call_later(delay, self._start_rebuild)
+
+    def _start_rebuild(self) -> None:
+        self._timer = None
+        if self._rebuild_task is not None and not self._rebuild_task.done():
+            return  # Writes that arrive meanwhile are rescheduled when it finishes
+        self._rebuild_task = self._spawn(self.rebuild())
+
+    async def rebuild(self) -> str:
+        """Project the current store under a new name and publish it to readers."""
+        included = self.pending_writes
+        start = time.perf_counter()
+        new_name = None
+        try:
+            async with driver.session() as session:
+                result = await session.run(CLAIM_GENERATION_QUERY)
+                new_generation = (await result.single())["generation"]
+                new_name = f"{self.base_name}_v{new_generation}"
+                # Leftover from a rebuild that failed after projecting; the name is ours alone
+                await session.run("CALL gds.graph.drop($graph_name, false)", graph_name=new_name)
+                result = await session.run(PROJECT_QUERY, graph_name=new_name)
+                record = await result.single()
+            newer, previous = await self._publish(new_name, new_generation)
+        except Exception as e:
+            print(f"Rebuilding projection {new_name or self.base_name} failed: {e}")
+            if self._timer is None:
+                self._schedule(self.debounce_seconds)
+            return self.name
+
+        self.pending_writes = max(0, self.pending_writes - included)
+        if not newer:
+            # Another worker published a later rebuild meanwhile; nobody reads ours
+            self._spawn(self._drop(new_name, delay=0))
+            self._checked_at = 0.0
+            return await self.current_name()
+
+        old_name = previous or self.name
+        self.name, self.generation = new_name, new_generation
+        self._checked_at = time.monotonic()
+        self.rebuilds += 1
+        self.last_rebuild = {
+            "name": new_name,
+            "nodes": record["nodeCount"],
+            "relationships": record["relationshipCount"],
+            "project_ms": record["projectMillis"],
+            "total_ms": round((time.perf_counter() - start) * 1000, 1),
+            "finished_at": time.time(),
+        }
+        print(f"Swapped GDS projection {old_name} -> {new_name}")
+        self._spawn(self._drop(old_name, delay=self.drop_grace_seconds))
+
+        if self.pending_writes and self._timer is None:
+            self.note_writes(0)  # Writes that landed while projecting
+        return new_name
+
+    async def _drop(self, graph_name: str, delay: float) -> None:
+        if delay:
+            await asyncio.sleep(delay)
+        try:
+            async with driver.session() as session:
+                await session.run("CALL gds.graph.drop($graph_name, false)", graph_name=graph_name)
+        except Exception as e:
+            print(f"Dropping projection {graph_name} failed: {e}")
+
+    def _spawn(self, coro) -> asyncio.Task:
+        # Keep a reference so background tasks are not garbage collected
+        task = asyncio.ensure_future(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+    async def close(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        for task in list(self._background):
+            task.cancel()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "pending_writes": self.pending_writes,
+            "rebuilding": self._rebuild_task is not None and not self._rebuild_task.done(),
+            "rebuilds": self.rebuilds,
+            "last_rebuild": self.last_rebuild,
+            "rebuild_after_writes": self.rebuild_after_writes,
+            "debounce_seconds": self.debounce_seconds,
+        }
+
+
+projection_manager = ProjectionManager()
+
+
+@on_graph_write
+def schedule_projection_rebuild(edges: Optional[List[tuple]]) -> None:
+    # A bulk write is large by definition, so rebuild without waiting
+    count = projection_manager.rebuild_after_writes if edges is None else len(edges)
+    projection_manager.note_writes(count)
@@ -1,23 +1,38 @@
-from app.db.neo4j_connection import get_db
-from typing import Optional, List, Dict, Any
+from app.db.neo4j_connection import driver
+from typing import Optional, List, Dict, Any, AsyncIterator, Callable
 import os
-import requests
 from fastapi.exceptions import HTTPException
 from datetime import datetime
 from collections import defaultdict
+import asyncio
+import heapq
+import random
+import time
+import numpy as np
+from app.db.cache import get_cache, on_graph_write
+from app.db.graph_version import current_graph_version, memoize_on_graph_version, on_remote_graph_write
+from app.db.metrics import observe_query_summary
+from app.methods.apsp import all_pairs_statistics
+from app.methods.artist_resolver import artist_resolver
+from app.methods.community import CommunitySummary, latest_summaries, stream_community_summary
+from app.methods.graph_snapshot import get_snapshot
+from app.methods.landmarks import alt_path, get_landmark_index, landmark_index_for
+from app.methods.link_prediction import recommend_for_all, recommend_for_user
+from app.methods.paths import batch_paths, bidirectional_path
+from app.methods.hyperanf import approximate_path_statistics
+from app.methods.projection import projection_manager
+from app.methods.taste_index import get_taste_index
+from app.methods.triangles import country_triangle_analysis, load_country_codes
 
-driver = get_db()
+user_cache = get_cache("users", max_entries=20_000, max_bytes=32 * 1024**2, ttl=3600)
+artist_cache = artist_resolver.cache
 
-user_cache = {}
-artist_cache = {}
 
-LASTFM_API_KEY = os.getenv("LASTFM_API_KEY", "fecd9e604929382f5f4f7a92e2b58c08")
-
-
-def get_user_data(user_id):
+async def get_user_data(user_id):
     # Check if user data is in cache
-    if user_id in user_cache:
-        return user_cache[user_id]
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return cached
 
     # If not in cache, query Neo4j
     query = """
@@ -25,9 +40,9 @@ def get_user_data(user_id):
     RETURN u.country_code AS country_code, u.country_name AS country_name, u.top_artists AS top_artists
     """
 
-    with driver.session() as session:
-        result = session.run(query, user_id=user_id)
-        record = result.single()
+    async with driver.session() as session:
+        result = await session.run(query, user_id=user_id)
+        record = await result.single()
         if record:
             # Store in cache
             user_data = {
@@ -36,77 +51,116 @@ def get_user_data(user_id):
                 "country_name": record["country_name"],
                 "top_artists": record["top_artists"],
             }
-            user_cache[user_id] = user_data
+            user_cache.set(user_id, user_data)
             return user_data
     return None
 
 
-def get_artist_name_from_lastfm(artist_id: str) -> str:
-    """Fetch artist name from Last.fm API using artist ID."""
-    if not LASTFM_API_KEY:
-        return f"Unknown Artist ({artist_id})"
+async def get_users_data(user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Get user data for many users at once.
 
-    url = f"http://ws.audioscrobbler.com/2.0/?method=artist.getInfo&artist={artist_id}&api_key={LASTFM_API_KEY}&format=json"
-    try:
-        response = requests.get(url, timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            print(f"Fetched artist data: {data}")
-            if "artist" in data and "name" in data["artist"]:
-                return data["artist"]["name"]
-    except Exception as e:
-        print(f"Error fetching artist {artist_id}: {e}")
+    Cached users are served from memory and the rest are fetched with a single
+    UNWIND query. Users that do not exist are left out of the returned mapping.
+    """
+    users = {}
+    for uid in set(user_ids):
+        cached = user_cache.get(uid)
+        if cached is not None:
+            users[uid] = cached
+    missing = [uid for uid in set(user_ids) if uid not in users]
+    if not missing:
+        return users
 
-    return f"Unknown Artist ({artist_id})"
+    query = """
+    UNWIND $user_ids AS user_id
+    MATCH (u:User {id: user_id})
+    RETURN u.id AS id, u.country_code AS country_code, u.country_name AS country_name, u.top_artists AS top_artists
+    """
 
+    async with driver.session() as session:
+        result = await session.run(query, user_ids=missing)
+        async for record in result:
+            user_data = {
+                "id": record["id"],
+                "country_code": record["country_code"],
+                "country_name": record["country_name"],
+                "top_artists": record["top_artists"],
+            }
+            user_cache.set(record["id"], user_data)
+            users[record["id"]] = user_data
+    return users
 
-def get_artist_names(artist_ids: List[str]) -> List[Dict[str, str]]:
-    """Get artist names from cache or Last.fm API."""
-    artists_with_names = []
 
-    for artist_id in artist_ids:
-        # Check if artist is in cache
-        if artist_id in artist_cache:
-            artists_with_names.append(
-                {"id": artist_id, "name": artist_cache[artist_id]}
-            )
-        else:
-            # Fetch from Last.fm API
-            artist_name = get_artist_name_from_lastfm(artist_id)
-            print(f"Fetched artist name: {artist_name}")
+@on_graph_write
+def invalidate_written_users(edges: Optional[List[tuple]]) -> None:
+    """Drop cached profiles of users touched by a graph write (all of them after a bulk write)."""
+    if edges is None:
+        user_cache.clear()
+        return
+    for user_id in {user_id for edge in edges for user_id in edge}:
+        user_cache.invalidate(user_id)
 
-            # Add to cache
-            artist_cache[artist_id] = artist_name
 
-            artists_with_names.append({"id": artist_id, "name": artist_name})
+@on_remote_graph_write
+def clear_user_cache() -> None:
+    """Another worker wrote the graph; its touched users are unknown here."""
+    user_cache.clear()
 
-    return artists_with_names
+
+async def get_artist_names(artist_ids: List[str]) -> List[Dict[str, str]]:
+    """Get artist names from cache, the local name store or Last.fm API."""
+    return await artist_resolver.resolve_many(artist_ids)
 
 def get_artist_name(artist_ids: List[str]) -> List[Dict[str, str]]:
-    """Get artist names from cache or Last.fm API."""
+    """Get artist names from cache, without calling Last.fm API."""
     artists_with_names = []
 
     for artist_id in artist_ids:
         # Check if artist is in cache
-        if artist_id in artist_cache:
-            artists_with_names.append(
-                {"id": artist_id, "name": artist_cache[artist_id]}
-            )
+        cached_name = artist_cache.get(str(artist_id))
+        if cached_name is not None:
+            artists_with_names.append({"id": artist_id, "name": cached_name})
         else:
+            # Placeholders are not cached so they never shadow real names
             artist_name = str(artist_id)
-            artist_cache[artist_id] = artist_name
 
             artists_with_names.append({"id": artist_id, "name": artist_name})
 
     return artists_with_names
 
 
-def get_shortest_path(source: int, target: int) -> Dict[str, Any]:
-    """Fetch the shortest path between two nodes using Dijkstra in Neo4j"""
+async def get_shortest_path(source: int, target: int) -> Dict[str, Any]:
+    """
+    Fetch the shortest path between two nodes, using bidirectional BFS over the
+    graph snapshot when both users are in it and Dijkstra in Neo4j otherwise.
+    """
+    snapshot = await get_snapshot()
+    if snapshot is not None:
+        # Only an index already built for this snapshot; otherwise one is
+        # built in the background and this request does without the bound
+        index = landmark_index_for(snapshot)
+        i, j = snapshot.index_of(source), snapshot.index_of(target)
+        if i is not None and j is not None:
+            if index is not None and index.bounds(i, j)["reachable"] is False:
+                return {"error": "No path found"}
+            path = bidirectional_path(snapshot, i, j)
+            if path is None:
+                return {"error": "No path found"}
+            ids = snapshot.ids[path].tolist()
+            users = await get_users_data(ids)
+            return {
+                "path": [
+                    users.get(uid, {"id": uid, "country_code": None, "country_name": None, "top_artists": None})
+                    for uid in ids
+                ],
+                "pathLength": float(len(ids) - 1),
+            }
+
     query = """
     PROFILE
     MATCH (source:User {id: $source}), (target:User {id: $target})
-    CALL gds.shortestPath.dijkstra.stream('lastfm', {
+    CALL gds.shortestPath.dijkstra.stream($graph_name, {
         sourceNode: source,
         targetNode: target
     })
@@ -120,10 +174,11 @@ def get_shortest_path(source: int, target: int) -> Dict[str, Any]:
         }] AS nodes,
         totalCost AS pathLength
     """
-    with driver.session() as session:
-        result = session.run(query, source=source, target=target)
-        record = result.single()
-        summary = result.consume()
+    graph_name = await projection_manager.current_name()
+    async with driver.session() as session:
+        result = await session.run(query, source=source, target=target, graph_name=graph_name)
+        record = await result.single()
+        summary = await result.consume()
 
         if record:
             return {
@@ -135,7 +190,105 @@ def get_shortest_path(source: int, target: int) -> Dict[str, Any]:
         }
 
 
-def get_connected_nodes_data(user_id: int) -> Dict[str, List[int]]:
+async def get_distance(source: int, target: int, exact: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Hop distance bounds from the landmark index in O(landmarks), and with
+    `exact` the true distance from an ALT (landmark A*) search. Returns None
+    if either user is not in the graph snapshot.
+    """
+    landmarks = await get_landmark_index()
+    if landmarks is None:
+        raise RuntimeError("Graph snapshot is not available")
+    index, snapshot = landmarks
+    i, j = snapshot.index_of(source), snapshot.index_of(target)
+    if i is None or j is None:
+        return None
+
+    start = time.perf_counter()
+    response = {"source": source, "target": target, **index.bounds(i, j)}
+    if exact:
+        path, expanded = alt_path(index, snapshot, i, j)
+        response["reachable"] = path is not None
+        response["distance"] = len(path) - 1 if path is not None else None
+        response["path"] = snapshot.ids[path].tolist() if path is not None else None
+        response["expanded"] = expanded
+    response["landmarks"] = len(index.landmarks)
+    response["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return response
+
+
+async def get_recommendations(
+    user_id: int, method: str = "adamic_adar", top_k: int = 10
+) -> Optional[List[Dict[str, Any]]]:
+    """Candidate follows for one user by link prediction; None if the user is not in the snapshot."""
+    snapshot = await get_snapshot()
+    if snapshot is None:
+        raise RuntimeError("Graph snapshot is not available")
+    if not snapshot.has_user(user_id):
+        return None
+    return await asyncio.to_thread(recommend_for_user, snapshot, user_id, method, top_k)
+
+
+@memoize_on_graph_version("link-prediction")
+async def get_link_predictions(method: str = "adamic_adar", top_k: int = 10) -> Dict[str, Any]:
+    """Top-k candidate follows for every user, cached until the graph changes."""
+    snapshot = await get_snapshot()
+    if snapshot is None:
+        raise RuntimeError("Graph snapshot is not available")
+    return await asyncio.to_thread(recommend_for_all, snapshot, method, top_k)
+
+
+async def get_similar_users(
+    user_id: int, top_k: int = 10, bands: Optional[int] = None
+) -> Optional[Dict[str, Any]]:
+    """Users with the most similar top artists via the LSH taste index; None if the user is unknown."""
+    index = await get_taste_index()
+    return await asyncio.to_thread(index.similar, user_id, top_k, bands)
+
+
+async def get_all_similar_users(top_k: int = 10) -> Dict[str, Any]:
+    """The top-k most similar users by taste for everyone, cached on the taste index."""
+    index = await get_taste_index()
+    return await asyncio.to_thread(index.all_similar, top_k)
+
+
+async def get_shortest_paths_batch(
+    pairs: List[tuple], include_users: bool = False
+) -> Dict[str, Any]:
+    """
+    Shortest paths for many (source, target) pairs from the graph snapshot.
+
+    Each result holds the path as user IDs (None when there is no path or a
+    user is unknown). With include_users, the profiles of every user on any
+    path are returned once in `users`.
+    """
+    snapshot = await get_snapshot()
+    if snapshot is None:
+        raise RuntimeError("Graph snapshot is not available")
+
+    start = time.perf_counter()
+    paths = await asyncio.to_thread(batch_paths, snapshot, pairs)
+    results = [
+        {
+            "source": source,
+            "target": target,
+            "path": path,
+            "pathLength": len(path) - 1 if path is not None else None,
+        }
+        for (source, target), path in zip(pairs, paths)
+    ]
+    response = {
+        "results": results,
+        "found": sum(path is not None for path in paths),
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+    if include_users:
+        on_paths = {uid for path in paths if path for uid in path}
+        response["users"] = await get_users_data(list(on_paths))
+    return response
+
+
+async def get_connected_nodes_data(user_id: int) -> Dict[str, List[int]]:
     """
     Get users connected to the specified user through FOLLOWS relationships,
     separated into two categories: followers and following.
@@ -147,33 +300,40 @@ def get_connected_nodes_data(user_id: int) -> Dict[str, List[int]]:
     Returns:
         Dictionary with two lists: 'following' and 'followers'
     """
-    with driver.session() as session:
+    snapshot = await get_snapshot()
+    if snapshot is not None and snapshot.has_user(user_id):
+        return {
+            "following": snapshot.following(user_id),
+            "followers": snapshot.followers(user_id),
+        }
+
+    async with driver.session() as session:
         # Get users that the specified user follows
-        following_result = session.run(
+        following_result = await session.run(
             """
             MATCH (u:User {id: $user_id})-[:FOLLOWS]->(following:User)
             RETURN collect(following.id) AS following
             """,
             user_id=user_id,
         )
-        following_record = following_result.single()
+        following_record = await following_result.single()
         following = following_record["following"] if following_record else []
 
         # Get users that follow the specified user
-        followers_result = session.run(
+        followers_result = await session.run(
             """
             MATCH (follower:User)-[:FOLLOWS]->(u:User {id: $user_id})
             RETURN collect(follower.id) AS followers
             """,
             user_id=user_id,
         )
-        followers_record = followers_result.single()
+        followers_record = await followers_result.single()
         followers = followers_record["followers"] if followers_record else []
 
         return {"following": following, "followers": followers}
 
 
-def get_common_neighbors_with_data(
+async def get_common_neighbors_with_data(
     user1_id: int, user2_id: int
 ) -> List[Dict[str, Any]]:
     """
@@ -184,9 +344,21 @@ def get_common_neighbors_with_data(
         List of dictionaries containing user ID, country code, country name,
         and top artists (IDs and names).
     """
-    with driver.session() as session:
+    snapshot = await get_snapshot()
+    # A user paired with itself falls through to Cypher, whose `u1 <> u2` finds nothing
+    if (
+        snapshot is not None
+        and user1_id != user2_id
+        and snapshot.has_user(user1_id)
+        and snapshot.has_user(user2_id)
+    ):
+        common_ids = snapshot.common_neighbors(user1_id, user2_id)
+        users = await get_users_data(common_ids)
+        return [_format_common_neighbor(users[uid]) for uid in common_ids if uid in users]
+
+    async with driver.session() as session:
         # Query for common neighbors with their data
-        result = session.run(
+        result = await session.run(
             """
             MATCH (u1:User {id: $user1_id})-[:FOLLOWS]-(common:User)-[:FOLLOWS]-(u2:User {id: $user2_id})
             WHERE u1 <> u2
@@ -197,31 +369,311 @@ def get_common_neighbors_with_data(
             user2_id=user2_id,
         )
 
-        common_neighbors = []
-        for record in result:
-            # Get artist names for this common neighbor
-            top_artists = []
-            if record["top_artists"]:
-                top_artists = get_artist_name(record["top_artists"][:10])
+        return [_format_common_neighbor(record) async for record in result]
 
-            common_neighbors.append(
-                {
-                    "id": record["id"],
-                    "country_code": record["country_code"],
-                    "country_name": record["country_name"],
-                    "top_artists": top_artists,
-                }
+
+async def get_connected_nodes_page(
+    user_id: int,
+    limit: int,
+    after_following: Optional[int] = None,
+    after_followers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    One keyset page of a user's following and follower IDs, sorted by ID.
+
+    Each list holds up to `limit` IDs greater than its `after_*` key. Totals
+    are the user's degrees, so hub users cost no more than anyone else.
+    """
+    snapshot = await get_snapshot()
+    if snapshot is not None and snapshot.has_user(user_id):
+        following, following_total, following_more = snapshot.neighbor_page(
+            "following", user_id, after_following, limit
+        )
+        followers, followers_total, followers_more = snapshot.neighbor_page(
+            "followers", user_id, after_followers, limit
+        )
+        return {
+            "following": following,
+            "followers": followers,
+            "following_total": following_total,
+            "followers_total": followers_total,
+            "following_more": following_more,
+            "followers_more": followers_more,
+        }
+
+    async with driver.session() as session:
+        result = await session.run(
+            """
+            MATCH (u:User {id: $user_id})
+            RETURN COUNT { (u)-[:FOLLOWS]->(:User) } AS following_total,
+                   COUNT { (:User)-[:FOLLOWS]->(u) } AS followers_total,
+                   COLLECT {
+                       MATCH (u)-[:FOLLOWS]->(f:User)
+                       WHERE $after_following IS NULL OR f.id > $after_following
+                       RETURN f.id ORDER BY f.id LIMIT $fetch
+                   } AS following,
+                   COLLECT {
+                       MATCH (f:User)-[:FOLLOWS]->(u)
+                       WHERE $after_followers IS NULL OR f.id > $after_followers
+                       RETURN f.id ORDER BY f.id LIMIT $fetch
+                   } AS followers
+            """,
+            user_id=user_id,
+            after_following=after_following,
+            after_followers=after_followers,
+            fetch=limit + 1,  # one extra row tells whether another page exists
+        )
+        record = await result.single()
+
+    if record is None:
+        return {
+            "following": [], "followers": [], "following_total": 0, "followers_total": 0,
+            "following_more": False, "followers_more": False,
+        }
+    return {
+        "following": record["following"][:limit],
+        "followers": record["followers"][:limit],
+        "following_total": record["following_total"],
+        "followers_total": record["followers_total"],
+        "following_more": len(record["following"]) > limit,
+        "followers_more": len(record["followers"]) > limit,
+    }
+
+
+async def get_common_neighbors_page(
+    user1_id: int, user2_id: int, limit: int, after: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    One keyset page of common neighbors, sorted by ID.
+
+    Only the page is hydrated with country and artist data; `total` counts
+    every common neighbor.
+    """
+    snapshot = await get_snapshot()
+    # A user paired with itself falls through to Cypher, whose `u1 <> u2` finds nothing
+    if (
+        snapshot is not None
+        and user1_id != user2_id
+        and snapshot.has_user(user1_id)
+        and snapshot.has_user(user2_id)
+    ):
+        page, total, has_more = snapshot.common_neighbor_page(user1_id, user2_id, after, limit)
+    else:
+        async with driver.session() as session:
+            result = await session.run(
+                """
+                MATCH (u1:User {id: $user1_id}), (u2:User {id: $user2_id})
+                WHERE u1 <> u2
+                RETURN COUNT {
+                           MATCH (u1)-[:FOLLOWS]-(common:User)-[:FOLLOWS]-(u2)
+                           RETURN DISTINCT common
+                       } AS total,
+                       COLLECT {
+                           MATCH (u1)-[:FOLLOWS]-(common:User)-[:FOLLOWS]-(u2)
+                           WHERE $after IS NULL OR common.id > $after
+                           RETURN DISTINCT common.id AS id ORDER BY id LIMIT $fetch
+                       } AS page
+                """,
+                user1_id=user1_id,
+                user2_id=user2_id,
+                after=after,
+                fetch=limit + 1,  # one extra row tells whether another page exists
             )
+            record = await result.single()
+        ids = record["page"] if record else []
+        page, total, has_more = ids[:limit], record["total"] if record else 0, len(ids) > limit
+
+    users = await get_users_data(page)
+    return {
+        "common_neighbors": [_format_common_neighbor(users[uid]) for uid in page if uid in users],
+        "total": total,
+        "has_more": has_more,
+        "last_id": page[-1] if page else None,
+    }
+
+
+def _format_common_neighbor(record) -> Dict[str, Any]:
+    # Get artist names for this common neighbor
+    top_artists = []
+    if record["top_artists"]:
+        top_artists = get_artist_name(record["top_artists"][:10])
+
+    return {
+        "id": record["id"],
+        "country_code": record["country_code"],
+        "country_name": record["country_name"],
+        "top_artists": top_artists,
+    }
+
+
+def _to_columns(rows: List[Optional[Dict[str, Any]]], fields: List[str]) -> Dict[str, List[Any]]:
+    """Turn row dicts (None for missing rows) into one list per field, in row order."""
+    return {field: [row.get(field) if row else None for row in rows] for field in fields}
+
+
+async def get_users_batch(user_ids: List[int], artist_names: bool = False) -> Dict[str, List[Any]]:
+    """
+    Profiles of many users as columns aligned with `user_ids`.
+
+    `found` is False for unknown users, whose other columns are None. Top
+    artists are IDs, or cached {id, name} entries with `artist_names`.
+    """
+    users = await get_users_data(user_ids)
+    rows = [users.get(uid) for uid in user_ids]
+    columns = _to_columns(rows, ["country_code", "country_name", "top_artists"])
+    if artist_names:
+        columns["top_artists"] = [
+            get_artist_name(artists[:10]) if artists else [] for artists in columns["top_artists"]
+        ]
+    return {"id": list(user_ids), "found": [row is not None for row in rows], **columns}
+
+
+async def get_connected_nodes_batch(user_ids: List[int]) -> Dict[str, List[Any]]:
+    """
+    Following and follower IDs of many users as columns aligned with `user_ids`.
+
+    Users in the graph snapshot are answered from memory; the rest with a
+    single UNWIND query.
+    """
+    snapshot = await get_snapshot()
+    rows: Dict[int, Dict[str, List[int]]] = {}
+    if snapshot is not None:
+        for uid in set(user_ids):
+            if snapshot.has_user(uid):
+                rows[uid] = {"following": snapshot.following(uid), "followers": snapshot.followers(uid)}
+
+    missing = [uid for uid in set(user_ids) if uid not in rows]
+    if missing:
+        async with driver.session() as session:
+            result = await session.run(
+                """
+                UNWIND $user_ids AS user_id
+                MATCH (u:User {id: user_id})
+                RETURN u.id AS id,
+                       [(u)-[:FOLLOWS]->(following:User) | following.id] AS following,
+                       [(follower:User)-[:FOLLOWS]->(u) | follower.id] AS followers
+                """,
+                user_ids=missing,
+            )
+            async for record in result:
+                rows[record["id"]] = {"following": record["following"], "followers": record["followers"]}
+
+    ordered = [rows.get(uid) for uid in user_ids]
+    columns = _to_columns(ordered, ["following", "followers"])
+    return {
+        "id": list(user_ids),
+        "found": [row is not None for row in ordered],
+        **columns,
+        "following_count": [len(row["following"]) if row else None for row in ordered],
+        "followers_count": [len(row["followers"]) if row else None for row in ordered],
+    }
+
+
+async def get_common_neighbors_batch(
+    pairs: List[tuple], include_users: bool = False
+) -> Dict[str, Any]:
+    """
+    Common neighbor IDs of many user pairs as columns aligned with `pairs`.
+
+    Pairs whose users are both in the graph snapshot are intersected in
+    memory; the rest are resolved with a single UNWIND query. A user paired
+    with itself is not found, as in the single-pair query. With
+    `include_users`, the profiles of all distinct neighbors are returned once,
+    also as columns.
+    """
+    snapshot = await get_snapshot()
+    distinct_pairs = {(user1_id, user2_id) for user1_id, user2_id in pairs if user1_id != user2_id}
+    neighbors: Dict[tuple, List[int]] = {}
+    for user1_id, user2_id in distinct_pairs:
+        if snapshot is not None and snapshot.has_user(user1_id) and snapshot.has_user(user2_id):
+            neighbors[(user1_id, user2_id)] = snapshot.common_neighbors(user1_id, user2_id)
+
+    missing = [list(pair) for pair in distinct_pairs if pair not in neighbors]
+    if missing:
+        async with driver.session() as session:
+            result = await session.run(
+                """
+                UNWIND $pairs AS pair
+                MATCH (u1:User {id: pair[0]}), (u2:User {id: pair[1]})
+                WHERE u1 <> u2
+                OPTIONAL MATCH (u1)-[:FOLLOWS]-(common:User)-[:FOLLOWS]-(u2)
+                WITH pair, collect(DISTINCT common.id) AS common
+                RETURN pair[0] AS user1_id, pair[1] AS user2_id, common
+                """,
+                pairs=missing,
+            )
+            async for record in result:
+                neighbors[(record["user1_id"], record["user2_id"])] = sorted(record["common"])
+
+    common = [neighbors.get(tuple(pair)) for pair in pairs]
+    response = {
+        "user1_id": [pair[0] for pair in pairs],
+        "user2_id": [pair[1] for pair in pairs],
+        "found": [ids is not None for ids in common],
+        "common_neighbors": common,
+        "count": [len(ids) if ids is not None else None for ids in common],
+    }
+    if include_users:
+        distinct = sorted({uid for ids in common if ids for uid in ids})
+        response["users"] = await get_users_batch(distinct)
+    return response
+
+
+@memoize_on_graph_version("community-detection", scope=projection_manager.current_name)
+async def get_community_data(write: bool = False, top_k: int = 10) -> Dict[str, Any]:
+    """
+    Run Louvain and label propagation and summarise inter-community edges.
+
+    By default the assignments are streamed once per algorithm into a
+    CommunitySummary over the graph snapshot, which also serves sizes and
+    drill-downs (see get_community_summary). With `write=True`, or when no
+    snapshot is available, the communities are written to the
+    `louvain_community` / `labelprop_community` properties and aggregated in
+    Cypher instead.
+    """
+    snapshot = await get_snapshot()
+    if write or snapshot is None:
+        return await _write_community_data(top_k)
+
+    graph_name = await projection_manager.current_name()
+    try:
+        louvain, label_prop = await asyncio.gather(
+            stream_community_summary("louvain", graph_name, snapshot),
+            stream_community_summary("labelProp", graph_name, snapshot),
+        )
+    except Exception as e:
+        raise RuntimeError(f"Database query failed: {str(e)}")
+
+    return {
+        "louvain": {"metrics": louvain.metrics, "edges": louvain.top_edges(top_k)},
+        "labelProp": {"metrics": label_prop.metrics, "edges": label_prop.top_edges(top_k)},
+    }
 
-        return common_neighbors
 
+async def get_community_summary(algorithm: str) -> Optional[CommunitySummary]:
+    """
+    The summary of `algorithm` for the current graph version and projection,
+    streaming it if no run for them is remembered. None without a snapshot.
+    """
+    snapshot = await get_snapshot()
+    if snapshot is None:
+        return None
+    graph_name = await projection_manager.current_name()
+    summary = latest_summaries.get((algorithm, current_graph_version(), graph_name))
+    if summary is None:
+        try:
+            summary = await stream_community_summary(algorithm, graph_name, snapshot)
+        except Exception as e:
+            raise RuntimeError(f"Database query failed: {str(e)}")
+    return summary
 
-def get_community_data() -> Dict[str, Any]:
+
+async def _write_community_data(top_k: int) -> Dict[str, Any]:
     """Execute community detection query and return formatted results"""
     query = """
     CALL {
     // Louvain metrics and edges with community sizes
-    CALL gds.louvain.write('lastfm', { writeProperty: 'louvain_community' })
+    CALL gds.louvain.write($graph_name, { writeProperty: 'louvain_community' })
     YIELD computeMillis AS louvainTime, communityCount AS louvainCommunities, modularity
     WITH louvainTime, louvainCommunities, modularity
     CALL {
@@ -232,7 +684,7 @@ def get_community_data() -> Dict[str, Any]:
         u2.louvain_community AS target,
         count(r) AS edgeCount
         ORDER BY edgeCount DESC
-        LIMIT 10
+        LIMIT $top_k
         // Get community sizes
         MATCH (src:User {louvain_community: source})
         WITH source, target, edgeCount, count(src) AS sourceSize
@@ -256,7 +708,7 @@ def get_community_data() -> Dict[str, Any]:
     }
     CALL {
     // Label Propagation metrics and edges with community sizes
-    CALL gds.labelPropagation.write('lastfm', { 
+    CALL gds.labelPropagation.write($graph_name, { 
         writeProperty: 'labelprop_community',
         maxIterations: 10 
     })
@@ -270,7 +722,7 @@ def get_community_data() -> Dict[str, Any]:
         u2.labelprop_community AS target,
         count(r) AS edgeCount
         ORDER BY edgeCount DESC
-        LIMIT 10
+        LIMIT $top_k
         // Get community sizes
         MATCH (src:User {labelprop_community: source})
         WITH source, target, edgeCount, count(src) AS sourceSize
@@ -305,26 +757,29 @@ def get_community_data() -> Dict[str, Any]:
     """
 
     try:
-        with driver.session() as session:
-            result = session.run(query)
-            record = result.single()
+        async with driver.session() as session:
+            result = await session.run(
+                query, graph_name=await projection_manager.current_name(), top_k=top_k
+            )
+            record = await result.single()
             return record["result"] if record else {"error": "No data found"}
     except Exception as e:
         raise RuntimeError(f"Database query failed: {str(e)}")
 
 
-def get_pagerank_with_full_metrics() -> Dict[str, Any]:
+@memoize_on_graph_version("top_pagerank_full", scope=projection_manager.current_name)
+async def get_pagerank_with_full_metrics() -> Dict[str, Any]:
     """Fetch top 30 users with scores, profile data, and performance metrics."""
     # Memory estimation query
     estimate_query = """
-    CALL gds.pageRank.stream.estimate('lastfm', {})
+    CALL gds.pageRank.stream.estimate($graph_name, {})
     YIELD bytesMin, bytesMax, requiredMemory
     """
     
     # Main results query with PROFILE
     main_query = """
     PROFILE
-    CALL gds.pageRank.stream('lastfm')
+    CALL gds.pageRank.stream($graph_name)
     YIELD nodeId, score
     WITH gds.util.asNode(nodeId) AS user, score
     RETURN 
@@ -337,17 +792,18 @@ def get_pagerank_with_full_metrics() -> Dict[str, Any]:
     LIMIT 30
     """
     
-    with driver.session() as session:
+    graph_name = await projection_manager.current_name()
+    async with driver.session() as session:
         # Get memory estimates
-        mem_result = session.run(estimate_query)
-        mem_data = mem_result.single() if mem_result else {}
+        mem_result = await session.run(estimate_query, graph_name=graph_name)
+        mem_data = await mem_result.single() if mem_result else {}
         
         # Get main results with profiling
-        main_result = session.run(main_query)
+        main_result = await session.run(main_query, graph_name=graph_name, query_name="pagerank")
         users = []
         
         # Process user records
-        for record in main_result:
+        async for record in main_result:
             top_artists = []
             if record["top_artist_ids"]:
                 artist_names = get_artist_name(record["top_artist_ids"][:10])
@@ -365,7 +821,8 @@ def get_pagerank_with_full_metrics() -> Dict[str, Any]:
             })
         
         # Get performance metrics from PROFILE
-        summary = main_result.consume()
+        summary = await main_result.consume()
+        observe_query_summary("pagerank", summary)
         profile = summary.profile if summary else None
         
         metrics = {
@@ -386,17 +843,27 @@ def get_pagerank_with_full_metrics() -> Dict[str, Any]:
         
         return {"users": users, "metrics": metrics}
 
-def get_centrality_analysis() -> Dict[str, Any]:
-    """Execute centrality analysis query and return formatted results"""
+@memoize_on_graph_version("centrality-analysis", scope=projection_manager.current_name)
+async def get_centrality_analysis(write: bool = False, top_k: int = 10) -> Dict[str, Any]:
+    """
+    Run degree, betweenness and closeness centrality and return formatted results.
+
+    By default scores are streamed and reduced in memory (see
+    stream_centrality); with `write=True` they are also written back to every
+    node as the `degree`, `betweenness` and `closeness` properties.
+    """
+    if not write:
+        return await stream_centrality(top_k)
+
     query = """
     CALL {
       // 1. Degree Centrality (with estimate)
-      CALL gds.degree.write.estimate('lastfm', { 
+      CALL gds.degree.write.estimate($graph_name, { 
         writeProperty: 'degree',
         orientation: 'REVERSE'
       }) YIELD requiredMemory AS degreeMemory
       
-      CALL gds.degree.write('lastfm', {
+      CALL gds.degree.write($graph_name, {
         writeProperty: 'degree',
         orientation: 'REVERSE',
         concurrency: 4,
@@ -421,7 +888,7 @@ def get_centrality_analysis() -> Dict[str, Any]:
              u.country_name AS countryName,
              u.top_artists AS topArtists
         ORDER BY score DESC
-        LIMIT 10
+        LIMIT $top_k
         RETURN collect({
           id: id, 
           score: score,
@@ -436,12 +903,12 @@ def get_centrality_analysis() -> Dict[str, Any]:
     }
     CALL {
       // 2. Betweenness Centrality (with estimate)
-      CALL gds.betweenness.write.estimate('lastfm', {
+      CALL gds.betweenness.write.estimate($graph_name, {
         writeProperty: 'betweenness',
         samplingSize: 1000
       }) YIELD requiredMemory AS betweennessMemory
       
-      CALL gds.betweenness.write('lastfm', {
+      CALL gds.betweenness.write($graph_name, {
         writeProperty: 'betweenness',
         samplingSize: 1000,
         concurrency: 4,
@@ -466,7 +933,7 @@ def get_centrality_analysis() -> Dict[str, Any]:
              u.country_name AS countryName,
              u.top_artists AS topArtists
         ORDER BY score DESC
-        LIMIT 10
+        LIMIT $top_k
         RETURN collect({
           id: id, 
           score: score,
@@ -482,12 +949,12 @@ def get_centrality_analysis() -> Dict[str, Any]:
     }
     CALL {
       // 3. Closeness Centrality (manual memory calculation)
-      CALL gds.graph.list('lastfm') 
+      CALL gds.graph.list($graph_name) 
       YIELD nodeCount, relationshipCount
       WITH 
         (24 * nodeCount) + (8 * relationshipCount) AS closenessMemory
       
-      CALL gds.closeness.write('lastfm', {
+      CALL gds.closeness.write($graph_name, {
         writeProperty: 'closeness',
         useWassermanFaust: true,
         concurrency: 4,
@@ -512,7 +979,7 @@ def get_centrality_analysis() -> Dict[str, Any]:
              u.country_name AS countryName,
              u.top_artists AS topArtists
         ORDER BY score DESC
-        LIMIT 10
+        LIMIT $top_k
         RETURN collect({
           id: id, 
           score: score,
@@ -570,19 +1037,184 @@ def get_centrality_analysis() -> Dict[str, Any]:
     """
 
     try:
-        with driver.session() as session:
-            result = session.run(query)
-            record = result.single()
+        async with driver.session() as session:
+            result = await session.run(
+                query, graph_name=await projection_manager.current_name(), top_k=top_k
+            )
+            record = await result.single()
             return record["result"] if record else {"error": "No data found"}
     except Exception as e:
         raise RuntimeError(f"Database query failed: {str(e)}")
 
 
+CENTRALITY_STREAMS = {
+    "degree": {
+        "estimate": """
+        CALL gds.degree.stream.estimate($graph_name, {orientation: 'REVERSE'})
+        YIELD requiredMemory RETURN requiredMemory
+        """,
+        "stream": """
+        CALL gds.degree.stream($graph_name, {orientation: 'REVERSE', concurrency: 4})
+        YIELD nodeId, score RETURN nodeId, score
+        """,
+    },
+    "betweenness": {
+        "estimate": """
+        CALL gds.betweenness.stream.estimate($graph_name, {samplingSize: 1000})
+        YIELD requiredMemory RETURN requiredMemory
+        """,
+        "stream": """
+        CALL gds.betweenness.stream($graph_name, {samplingSize: 1000, concurrency: 4})
+        YIELD nodeId, score RETURN nodeId, score
+        """,
+    },
+    "closeness": {
+        # Closeness has no estimate procedure; same manual calculation as write mode
+        "estimate": """
+        CALL gds.graph.list($graph_name) YIELD nodeCount, relationshipCount
+        RETURN (24 * nodeCount) + (8 * relationshipCount) AS requiredMemory
+        """,
+        "stream": """
+        CALL gds.closeness.stream($graph_name, {useWassermanFaust: true, concurrency: 4})
+        YIELD nodeId, score RETURN nodeId, score
+        """,
+    },
+}
+
+
+# Scores sampled per algorithm for percentiles; exact below this many nodes
+CENTRALITY_RESERVOIR_SIZE = int(os.getenv("CENTRALITY_RESERVOIR_SIZE", "4096"))
+
+
+class ScoreDistribution:
+    """
+    Exact min/max/mean and reservoir-sampled percentiles of a score stream,
+    in memory bounded by the reservoir size.
+    """
+
+    def __init__(self, size: int = CENTRALITY_RESERVOIR_SIZE, seed: int = 0):
+        self.size = size
+        self.sample: List[float] = []
+        self.count = 0
+        self.total = 0.0
+        self.min_score, self.max_score = float("inf"), float("-inf")
+        self._rng = random.Random(seed)
+
+    def add(self, score: float) -> None:
+        self.count += 1
+        self.total += score
+        self.min_score = min(self.min_score, score)
+        self.max_score = max(self.max_score, score)
+        if len(self.sample) < self.size:
+            self.sample.append(score)
+        else:
+            slot = self._rng.randrange(self.count)
+            if slot < self.size:
+                self.sample[slot] = score
+
+    def as_dict(self) -> Dict[str, Any]:
+        if not self.count:
+            return dict.fromkeys(["min", "max", "mean", "p50", "p75", "p90"])
+        p50, p75, p90 = np.percentile(self.sample, [50, 75, 90]).tolist()
+        return {
+            "min": float(self.min_score),
+            "max": float(self.max_score),
+            "mean": self.total / self.count,
+            "p50": p50,
+            "p75": p75,
+            "p90": p90,
+        }
+
+
+async def _stream_centrality_scores(algorithm: str, graph_name: str, top_k: int):
+    """Consume one centrality stream, keeping a top-k heap and a bounded score sample."""
+    queries = CENTRALITY_STREAMS[algorithm]
+    async with driver.session() as session:
+        result = await session.run(queries["estimate"], graph_name=graph_name)
+        memory = (await result.single())["requiredMemory"]
+
+        start = time.perf_counter()
+        result = await session.run(queries["stream"], graph_name=graph_name)
+        distribution = ScoreDistribution()
+        heap = []  # min-heap of (score, nodeId) holding the top k seen so far
+        async for record in result:
+            score = record["score"]
+            distribution.add(score)
+            if len(heap) < top_k:
+                heapq.heappush(heap, (score, record["nodeId"]))
+            elif score > heap[0][0]:
+                heapq.heapreplace(heap, (score, record["nodeId"]))
+        elapsed_ms = round((time.perf_counter() - start) * 1000)
+
+    return {
+        "memory": memory,
+        "timeMs": elapsed_ms,
+        "distribution": distribution.as_dict(),
+        "top": sorted(heap, reverse=True),
+    }
+
+
+async def stream_centrality(top_k: int = 10) -> Dict[str, Any]:
+    """
+    Stream-mode centrality: nothing is written to the database.
+
+    Each algorithm's scores are streamed once; a bounded heap keeps the top k
+    and the distribution is computed from the same pass. The top nodes of all
+    three algorithms are then hydrated with one batched lookup. The response has
+    the same shape as write mode.
+    """
+    graph_name = await projection_manager.current_name()
+    try:
+        streamed = await asyncio.gather(
+            *(
+                _stream_centrality_scores(algorithm, graph_name, top_k)
+                for algorithm in CENTRALITY_STREAMS
+            )
+        )
+        node_ids = list({node_id for run in streamed for _, node_id in run["top"]})
+        async with driver.session() as session:
+            result = await session.run(
+                """
+                UNWIND $node_ids AS nodeId
+                WITH nodeId, gds.util.asNode(nodeId) AS u
+                RETURN nodeId, u.id AS id, u.country_code AS countryCode,
+                       u.country_name AS countryName, u.top_artists AS topArtists
+                """,
+                node_ids=node_ids,
+            )
+            nodes = {record["nodeId"]: record async for record in result}
+    except Exception as e:
+        raise RuntimeError(f"Database query failed: {str(e)}")
+
+    response = {}
+    for algorithm, run in zip(CENTRALITY_STREAMS, streamed):
+        response[algorithm] = {
+            "memory": run["memory"],
+            "timeMs": run["timeMs"],
+            "distribution": run["distribution"],
+            "topNodes": [
+                {
+                    "id": nodes[node_id]["id"],
+                    "score": score,
+                    "countryCode": nodes[node_id]["countryCode"],
+                    "countryName": nodes[node_id]["countryName"],
+                    "topArtists": nodes[node_id]["topArtists"],
+                }
+                for score, node_id in run["top"]
+            ],
+        }
+    return response
+
+
+# The patterns match relationships, so a reciprocal FOLLOWS pair would count a
+# triangle once per direction; WITH DISTINCT counts node triples, like the
+# snapshot engine does.
 QUERIES = {
     "pairwise_analysis": """
     PROFILE
     MATCH (a)-[:FOLLOWS]-(b)-[:FOLLOWS]-(c)-[:FOLLOWS]-(a)
     WHERE id(a) < id(b) < id(c)
+    WITH DISTINCT a, b, c
     WITH [a.country_code, b.country_code, c.country_code] AS countries
     UNWIND apoc.coll.combinations(countries, 2) AS pair
     WITH apoc.coll.sort(pair) AS sortedPair
@@ -595,6 +1227,7 @@ QUERIES = {
     PROFILE
     MATCH (a)-[:FOLLOWS]-(b)-[:FOLLOWS]-(c)-[:FOLLOWS]-(a)
     WHERE id(a) < id(b) < id(c)
+    WITH DISTINCT a, b, c
     WITH [a.country_code, b.country_code, c.country_code] AS rawCountries
     WITH rawCountries,
       CASE
@@ -610,30 +1243,31 @@ QUERIES = {
     """
 }
 
-def get_memory_estimate(session) -> Dict[str, Any]:
+async def get_memory_estimate(session) -> Dict[str, Any]:
     """Get memory estimate for graph projection"""
-    result = session.run("""
+    result = await session.run("""
         CALL gds.graph.project.estimate('lastfm', {FOLLOWS: {orientation: 'NATURAL'}})
         YIELD requiredMemory, bytesMin, bytesMax
         RETURN requiredMemory, bytesMin, bytesMax
-    """)
-    record = result.single()
+    """, query_name="projection_memory_estimate")
+    record = await result.single()
     return {
         "human_readable": record["requiredMemory"],
         "bytes_min": record["bytesMin"],
         "bytes_max": record["bytesMax"]
     }
 
-def execute_query_with_metrics(query: str) -> Dict[str, Any]:
-    """Execute query and return results with metrics"""
-    with driver.session() as session:
+async def execute_query_with_metrics(query: str, name: str = "query") -> Dict[str, Any]:
+    """Execute query and return results with metrics, recorded under `name`"""
+    async with driver.session() as session:
         # Run main query
-        result = session.run(f"PROFILE {query}")
-        data = [dict(record) for record in result]
-        summary = result.consume()
+        result = await session.run(f"PROFILE {query}", query_name=name)
+        data = [dict(record) async for record in result]
+        summary = await result.consume()
+        observe_query_summary(name, summary)
         
         # Get memory estimation
-        memory_estimate = get_memory_estimate(session)
+        memory_estimate = await get_memory_estimate(session)
         
         return {
             "data": data,
@@ -643,69 +1277,104 @@ def execute_query_with_metrics(query: str) -> Dict[str, Any]:
             }
         }
 
-def get_combined_analysis() -> Dict[str, Any]:
-    """Execute both queries and return combined results"""
-    return {
-        analysis_type: execute_query_with_metrics(query)
-        for analysis_type, query in QUERIES.items()
-    }
+@memoize_on_graph_version("full_triangle_analysis")
+async def get_combined_analysis(engine: str = "snapshot") -> Dict[str, Any]:
+    """
+    Both triangle analyses. The default engine enumerates triangles once over
+    the in-memory snapshot and derives both results from that pass;
+    engine="cypher" (or a missing snapshot) runs the two PROFILE queries.
+    """
+    if engine == "snapshot":
+        snapshot = await get_snapshot()
+        if snapshot is not None:
+            country_codes = await load_country_codes(snapshot)
+            return await asyncio.to_thread(country_triangle_analysis, snapshot, country_codes)
+
+    try:
+        return {
+            analysis_type: await execute_query_with_metrics(query, analysis_type)
+            for analysis_type, query in QUERIES.items()
+        }
+    except Exception as e:
+        raise RuntimeError(f"Database query failed: {str(e)}")
+
+
+
+class PathLengthStats:
+    """Running min/max/average and distribution of path lengths."""
+
+    def __init__(self):
+        self.distribution = defaultdict(int)
+        self.total = self.sum_dist = 0
+        self.min_dist, self.max_dist = float('inf'), 0
+
+    def add(self, distance) -> None:
+        self.distribution[distance] += 1
+        self.total += 1
+        self.sum_dist += distance
+        self.min_dist = min(self.min_dist, distance)
+        self.max_dist = max(self.max_dist, distance)
 
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "min": self.min_dist,
+            "max": self.max_dist,
+            "average": round(self.sum_dist / self.total, 2) if self.total else 0,
+            "distribution": dict(sorted(self.distribution.items()))
+        }
 
 
-def get_path_analysis(query: Optional[str] = None) -> Dict[str, Any]:
+async def stream_path_analysis(
+    query: Optional[str] = None, name: str = "path_analysis"
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield {source, target, distance} records straight from the result cursor,
+    then one {"summary": {...}} record with the metrics and statistics. The
+    query's metrics are recorded under `name`.
+    """
     # Use default query if none provided
     final_query = query.strip() if query else DEFAULT_QUERY
-    
-    results = []
-    distribution = defaultdict(int)
-    total = sum_dist = 0
-    min_dist, max_dist = float('inf'), 0
+    stats = PathLengthStats()
 
-    with driver.session() as session:
-        result = session.run(final_query)
-        records = list(result)  # Materialize results first
-        
-        summary = result.consume()
-        profile = summary.profile or {}  # Handle missing profile
-
-        for record in records:
+    async with driver.session() as session:
+        result = await session.run(final_query, query_name=name)
+        async for record in result:
             source = record.get("source")
             target = record.get("target")
             distance = record.get("distance")
-            
+
             if None in (source, target, distance):
                 continue  # Skip invalid records
-                
-            results.append({
-                "source": source,
-                "target": target,
-                "distance": distance
-            })
-            
-            # Update statistics
-            distribution[distance] += 1
-            total += 1
-            sum_dist += distance
-            min_dist = min(min_dist, distance)
-            max_dist = max(max_dist, distance)
 
-    return {
-        "paths": results,
-        "performance_metrics": {
-            "estimated_memory_bytes": profile.get("memory", 0),
-            "execution_time_ms": summary.result_available_after + summary.result_consumed_after,
-        },
-        "statistics": {
-            "path_lengths": {
-                "min": min_dist,
-                "max": max_dist,
-                "average": round(sum_dist / total, 2) if total else 0,
-                "distribution": dict(sorted(distribution.items()))
-            }
+            stats.add(distance)
+            yield {"source": source, "target": target, "distance": distance}
+
+        summary = await result.consume()
+        observe_query_summary(name, summary)
+        profile = summary.profile or {}  # Handle missing profile
+
+    yield {
+        "summary": {
+            "performance_metrics": {
+                "estimated_memory_bytes": profile.get("memory", 0),
+                "execution_time_ms": summary.result_available_after + summary.result_consumed_after,
+            },
+            "statistics": {"path_lengths": stats.as_dict()},
         }
     }
 
 
+async def get_path_analysis(query: Optional[str] = None, name: str = "path_analysis") -> Dict[str, Any]:
+    results = []
+    summary = {}
+    async for record in stream_path_analysis(query, name):
+        if "summary" in record:
+            summary = record["summary"]
+        else:
+            results.append(record)
+    return {"paths": results, **summary}
+
+
 gds_query = """
 PROFILE
 CALL gds.allShortestPaths.stream('sl_users_graph', {
@@ -738,11 +1407,61 @@ ORDER BY distance DESC
 LIMIT 1000;
 """
 
+@memoize_on_graph_version("all-pairs-shortest-paths-exact")
+async def get_exact_path_statistics(
+    directed: bool = True, progress: Optional[Callable[[float], None]] = None
+) -> Dict[str, Any]:
+    """Shortest path statistics for every user pair, computed in process from the snapshot."""
+    snapshot = await get_snapshot()
+    if snapshot is None:
+        raise RuntimeError("Graph snapshot is not available")
+    return await all_pairs_statistics(snapshot, directed=directed, progress=progress)
+
+
+@memoize_on_graph_version("all-pairs-shortest-paths-approximate")
+async def get_approximate_path_statistics(directed: bool = True) -> Dict[str, Any]:
+    """HyperANF estimates of the distance distribution, average path length and effective diameter."""
+    snapshot = await get_snapshot()
+    if snapshot is None:
+        raise RuntimeError("Graph snapshot is not available")
+    return await approximate_path_statistics(snapshot, directed=directed)
+
+
+async def stream_path_approaches(
+    mode: str = "compare", directed: bool = True
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    compare_approaches as a record stream: every path tagged with its approach,
+    each approach followed by its summary record. In compare mode the records
+    come straight from the Neo4j cursors.
+    """
+    if mode == "compare":
+        for approach, query in (("cypher", cypher_query), ("gds", gds_query)):
+            async for record in stream_path_analysis(query, f"path_analysis_{approach}"):
+                yield {"approach": approach, **record}
+        return
+
+    result = await compare_approaches(mode=mode, directed=directed)
+    for path in result.get("paths", []):
+        yield {"approach": mode, **path}
+    yield {"approach": mode, "summary": {k: v for k, v in result.items() if k != "paths"}}
+
+
 # Execute both queries through the API
-def compare_approaches():
-   
-    cypher_response = get_path_analysis(cypher_query)
-    gds_response = get_path_analysis(gds_query)
+async def compare_approaches(
+    mode: str = "compare",
+    directed: bool = True,
+    progress: Optional[Callable[[float], None]] = None,
+):
+    if mode == "exact":
+        return await get_exact_path_statistics(directed=directed, progress=progress)
+    if mode == "approximate":
+        return await get_approximate_path_statistics(directed=directed)
+
+    cypher_response = await get_path_analysis(cypher_query, "path_analysis_cypher")
+    if progress:
+        progress(0.5)
+    gds_response = await get_path_analysis(gds_query, "path_analysis_gds")
 
     
     return {
@@ -0,0 +1,393 @@
+import asyncio
+import json
+import os
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.db.neo4j_connection import driver
+from app.methods.landmarks import save_npz_atomic
+
+MINHASH_PERMUTATIONS = int(os.getenv("MINHASH_PERMUTATIONS", "128"))
+# More bands of fewer rows raise recall (and candidate counts); bands * rows <= permutations
+LSH_BANDS = int(os.getenv("LSH_BANDS", "32"))
+LSH_ROWS = int(os.getenv("LSH_ROWS", "4"))
+# Buckets larger than this are skipped in bulk mode; they hold no useful signal
+LSH_MAX_BUCKET = int(os.getenv("LSH_MAX_BUCKET", "500"))
+TASTE_INDEX_PATH = os.getenv("TASTE_INDEX_PATH", "./taste_index.npz")
+
+MERSENNE_PRIME = (1 << 31) - 1
+EMPTY = np.uint32(0xFFFFFFFF)
+
+
+def _artist_key(artist_id: Any) -> int:
+    try:
+        return int(artist_id) & 0xFFFFFFFF
+    except (TypeError, ValueError):
+        return zlib.crc32(str(artist_id).encode())
+
+
+async def current_source_hash() -> Optional[str]:
+    """Source hash of the bootstrapped graph, from GraphMeta or the source files."""
+    try:
+        async with driver.session() as session:
+            result = await session.run(
+                "MATCH (m:GraphMeta {name: 'lastfm'}) RETURN m.source_hash AS source_hash"
+            )
+            record = await result.single()
+        return record["source_hash"] if record else None
+    except Exception as e:
+        print(f"Could not read the graph source hash from Neo4j: {e}")
+
+    from app.initial_conn import source_hash
+
+    try:
+        return await asyncio.to_thread(source_hash)
+    except OSError:
+        return None
+
+
+async def load_top_artists() -> Dict[int, List[Any]]:
+    """
+    Every user's top_artists, read from Neo4j and falling back to the
+    features file the bootstrap uses (truncated to the same top 10).
+    """
+    try:
+        async with driver.session() as session:
+            result = await session.run(
+                "MATCH (u:User) WHERE u.top_artists IS NOT NULL RETURN u.id AS id, u.top_artists AS top_artists"
+            )
+            return {record["id"]: record["top_artists"] async for record in result}
+    except Exception as e:
+        print(f"Could not load top artists from Neo4j: {e}")
+
+    from app.initial_conn import FEATURES_FILE
+
+    with open(FEATURES_FILE) as f:
+        features = json.load(f)
+    return {int(user_id): artist_ids[:10] for user_id, artist_ids in features.items()}
+
+
+class TasteIndex:
+    """
+    MinHash signatures of every user's top artists, bucketed with LSH bands.
+
+    `signatures` is an (n, permutations) uint32 matrix; two users agree in
+    each column with probability equal to the Jaccard similarity of their
+    artist sets. Each band hashes `rows` consecutive columns, and users
+    sharing a band hash are candidates, so a lookup only touches the users in
+    the query's buckets. The artist sets themselves are kept in CSR form to
+    re-rank candidates by exact Jaccard.
+    """
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        artist_offsets: np.ndarray,
+        artists: np.ndarray,
+        signatures: np.ndarray,
+        bands: int,
+        rows: int,
+        source_hash: Optional[str] = None,
+        build_ms: float = 0.0,
+    ):
+        self.ids = ids
+        self.artist_offsets = artist_offsets
+        self.artists = artists
+        self.signatures = signatures
+        self.bands = bands
+        self.rows = rows
+        self.source_hash = source_hash
+        self.build_ms = build_ms
+        self._bucket()
+        self._bulk: Dict[int, Dict[str, Any]] = {}
+
+    @classmethod
+    def build(
+        cls,
+        top_artists: Dict[int, List[Any]],
+        permutations: int = MINHASH_PERMUTATIONS,
+        bands: int = LSH_BANDS,
+        rows: int = LSH_ROWS,
+        source_hash: Optional[str] = None,
+        seed: int = 0,
+    ) -> "TasteIndex":
+        if bands * rows > permutations:
+            raise ValueError("LSH bands * rows must not exceed the MinHash permutations")
+        start = time.perf_counter()
+        ids = np.array(sorted(top_artists), dtype=np.int64)
+        sets = [np.unique([_artist_key(a) for a in top_artists[uid] or []]).astype(np.int64) for uid in ids]
+        lengths = np.array([len(s) for s in sets], dtype=np.int64)
+        artist_offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=artist_offsets[1:])
+        artists = np.concatenate(sets) if sets else np.empty(0, dtype=np.int64)
+
+        rng = np.random.default_rng(seed)
+        a = rng.integers(1, MERSENNE_PRIME, permutations, dtype=np.int64)
+        b = rng.integers(0, MERSENNE_PRIME, permutations, dtype=np.int64)
+        signatures = np.full((len(ids), permutations), EMPTY, dtype=np.uint32)
+        nonempty = np.flatnonzero(lengths)
+        # Hash a few thousand users' artists at a time to bound the (artists, permutations) block
+        for chunk in np.array_split(nonempty, max(1, len(artists) // 20_000)):
+            if not len(chunk):
+                continue
+            lo, hi = artist_offsets[chunk[0]], artist_offsets[chunk[-1] + 1]
+            hashed = ((artists[lo:hi, None] % MERSENNE_PRIME) * a[None, :] + b[None, :]) % MERSENNE_PRIME
+            starts = artist_offsets[chunk] - lo
+            signatures[chunk] = np.minimum.reduceat(hashed, starts, axis=0).astype(np.uint32)
+
+        return cls(
+            ids, artist_offsets, artists.astype(np.uint32), signatures, bands, rows, source_hash,
+            build_ms=round((time.perf_counter() - start) * 1000, 1),
+        )
+
+    def _band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        """(users, bands) uint64 hash of each band's columns."""
+        keys = np.zeros((len(signatures), self.bands), dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            for r in range(self.rows):
+                column = signatures[:, r::self.rows][:, : self.bands].astype(np.uint64)
+                keys = keys * np.uint64(0x100000001B3) ^ column
+        return keys
+
+    def _bucket(self) -> None:
+        self.band_keys = self._band_keys(self.signatures)
+        has_artists = self.signatures[:, 0] != EMPTY
+        # Per band: users sorted by band key, skipping users without artists
+        self.band_order = []
+        self.band_sorted = []
+        for band in range(self.bands):
+            users = np.flatnonzero(has_artists)
+            order = users[np.argsort(self.band_keys[users, band], kind="stable")]
+            self.band_order.append(order)
+            self.band_sorted.append(self.band_keys[order, band])
+
+    def save(self, path: str = TASTE_INDEX_PATH) -> None:
+        save_npz_atomic(
+            path,
+            ids=self.ids,
+            artist_offsets=self.artist_offsets,
+            artists=self.artists,
+            signatures=self.signatures,
+            params=np.array([self.bands, self.rows]),
+            source_hash=np.array(self.source_hash or ""),
+        )
+
+    @classmethod
+    def load(cls, path: str = TASTE_INDEX_PATH) -> Optional["TasteIndex"]:
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            bands, rows = (int(v) for v in data["params"])
+            return cls(
+                data["ids"], data["artist_offsets"], data["artists"], data["signatures"],
+                bands, rows, str(data["source_hash"]) or None,
+            )
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.signatures.nbytes + self.artists.nbytes + self.artist_offsets.nbytes
+                   + self.band_keys.nbytes + sum(o.nbytes for o in self.band_order))
+
+    def index_of(self, user_id: int) -> Optional[int]:
+        idx = int(np.searchsorted(self.ids, user_id))
+        if idx < len(self.ids) and self.ids[idx] == user_id:
+            return idx
+        return None
+
+    def _artist_set(self, idx: int) -> np.ndarray:
+        return self.artists[self.artist_offsets[idx]:self.artist_offsets[idx + 1]]
+
+    def candidates(self, idx: int, bands: Optional[int] = None) -> np.ndarray:
+        """Users sharing at least one of the first `bands` LSH buckets with user `idx`."""
+        found = []
+        for band in range(min(bands or self.bands, self.bands)):
+            key = self.band_keys[idx, band]
+            lo = np.searchsorted(self.band_sorted[band], key, side="left")
+            hi = np.searchsorted(self.band_sorted[band], key, side="right")
+            found.append(self.band_order[band][lo:hi])
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        candidates = np.unique(np.concatenate(found))
+        return candidates[candidates != idx]
+
+    def similar(self, user_id: int, top_k: int = 10, bands: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Users with the most similar top artists, ranked by exact Jaccard over
+        the LSH candidates. Probing fewer `bands` trades recall for speed.
+        """
+        idx = self.index_of(user_id)
+        if idx is None:
+            return None
+        candidates = self.candidates(idx, bands)
+        mine = self._artist_set(idx)
+        estimated = (self.signatures[candidates] == self.signatures[idx]).mean(axis=1)
+        results = []
+        for candidate, estimate in zip(candidates, estimated):
+            theirs = self._artist_set(candidate)
+            shared = len(np.intersect1d(mine, theirs, assume_unique=True))
+            union = len(mine) + len(theirs) - shared
+            results.append((shared / union if union else 0.0, float(estimate), int(candidate), shared))
+        results.sort(key=lambda r: (-r[0], -r[1], r[2]))
+        return {
+            "user_id": user_id,
+            "candidates_examined": int(len(candidates)),
+            "similar": [
+                {
+                    "id": int(self.ids[candidate]),
+                    "jaccard": round(jaccard, 4),
+                    "estimated_jaccard": round(estimate, 4),
+                    "shared_artists": shared,
+                }
+                for jaccard, estimate, candidate, shared in results[:top_k]
+            ],
+        }
+
+    def all_similar(self, top_k: int = 10) -> Dict[str, Any]:
+        """
+        The `top_k` most similar users for everyone, by MinHash estimate.
+
+        Candidate pairs are every pair sharing a bucket in any band (buckets
+        over LSH_MAX_BUCKET are skipped); their estimates are computed in
+        vectorised chunks and the best k kept per user.
+        """
+        if top_k in self._bulk:
+            return self._bulk[top_k]
+        start = time.perf_counter()
+        pairs = []
+        for band in range(self.bands):
+            keys, order = self.band_sorted[band], self.band_order[band]
+            boundaries = np.flatnonzero(np.diff(keys)) + 1
+            for members in np.split(order, boundaries):
+                if 1 < len(members) <= LSH_MAX_BUCKET:
+                    left, right = np.triu_indices(len(members), k=1)
+                    pairs.append(np.stack([members[left], members[right]], axis=1))
+        n = len(self.ids)
+        if pairs:
+            codes = np.unique(np.concatenate(pairs).astype(np.int64) @ np.array([n, 1]))
+            first, second = codes // n, codes % n
+        else:
+            first = second = np.empty(0, dtype=np.int64)
+
+        estimates = np.empty(len(first))
+        for lo in range(0, len(first), 100_000):
+            hi = lo + 100_000
+            estimates[lo:hi] = (self.signatures[first[lo:hi]] == self.signatures[second[lo:hi]]).mean(axis=1)
+
+        # Both directions, then best-first per user
+        users = np.concatenate([first, second])
+        others = np.concatenate([second, first])
+        scores = np.concatenate([estimates, estimates])
+        order = np.lexsort((others, -scores, users))
+        users, others, scores = users[order], others[order], scores[order]
+        starts = np.searchsorted(users, np.arange(n))
+        ends = np.searchsorted(users, np.arange(n), side="right")
+        result = {
+            "top_k": top_k,
+            "users": [
+                {
+                    "user": int(self.ids[u]),
+                    "similar": self.ids[others[starts[u]:min(ends[u], starts[u] + top_k)]].tolist(),
+                    "estimated_jaccard": [
+                        round(float(s), 4) for s in scores[starts[u]:min(ends[u], starts[u] + top_k)]
+                    ],
+                }
+                for u in range(n)
+            ],
+            "metrics": {
+                "candidate_pairs": int(len(first)),
+                "execution_time_ms": round((time.perf_counter() - start) * 1000, 2),
+            },
+        }
+        self._bulk[top_k] = result
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "users": int(len(self.ids)),
+            "permutations": int(self.signatures.shape[1]),
+            "bands": self.bands,
+            "rows": self.rows,
+            # Similarity at which a pair becomes a candidate with probability 1/2
+            "threshold": round((1 / self.bands) ** (1 / self.rows), 3),
+            "bytes": self.nbytes,
+            "build_ms": self.build_ms,
+            "source_hash": self.source_hash,
+        }
+
+
+_index: Optional[TasteIndex] = None
+_index_lock = asyncio.Lock()
+_build_task: Optional[asyncio.Task] = None
+
+
+async def _load_saved(source: Optional[str]) -> Optional[TasteIndex]:
+    """The saved index if it was built with the current settings from `source`."""
+    try:
+        loaded = await asyncio.to_thread(TasteIndex.load, TASTE_INDEX_PATH)
+    except Exception as e:
+        print(f"Could not load taste index: {e}")
+        return None
+    if (
+        loaded is not None
+        and loaded.source_hash == source
+        and (loaded.bands, loaded.rows) == (LSH_BANDS, LSH_ROWS)
+        and loaded.signatures.shape[1] == MINHASH_PERMUTATIONS
+    ):
+        print(f"Loaded taste index from {TASTE_INDEX_PATH}")
+        return loaded
+    return None
+
+
+async def load_saved_taste_index() -> Optional[TasteIndex]:
+    """Adopt the saved index if it is still valid, without ever building one."""
+    global _index
+    async with _index_lock:
+        if _index is None:
+            _index = await _load_saved(await current_source_hash())
+        return _index
+
+
+def schedule_taste_index_build() -> None:
+    """Load or build the index in a background task."""
+    global _build_task
+    if _build_task is None or _build_task.done():
+        _build_task = asyncio.ensure_future(_build_in_background())
+
+
+async def _build_in_background() -> None:
+    try:
+        await get_taste_index()
+    except Exception as e:
+        print(f"Could not prepare taste index: {e}")
+
+
+async def get_taste_index(rebuild: bool = False) -> TasteIndex:
+    """
+    Return the taste index: the loaded one, the saved one if it was built with
+    the same settings from the same bootstrap source, or a freshly built (and
+    saved) one. `rebuild` forces a rebuild from the current top_artists, e.g.
+    after a re-bootstrap.
+    """
+    global _index
+    if _index is not None and not rebuild:
+        return _index
+    async with _index_lock:
+        if _index is not None and not rebuild:
+            return _index
+        source = await current_source_hash()
+        if not rebuild:
+            _index = await _load_saved(source)
+            if _index is not None:
+                return _index
+
+        top_artists = await load_top_artists()
+        _index = await asyncio.to_thread(TasteIndex.build, top_artists, source_hash=source)
+        print(f"Built taste index for {len(_index.ids)} users in {_index.build_ms} ms")
+        try:
+            await asyncio.to_thread(_index.save, TASTE_INDEX_PATH)
+        except Exception as e:
+            print(f"Could not save taste index: {e}")
+        return _index
@@ -0,0 +1,166 @@
+import os
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.db.neo4j_connection import driver
+from app.methods.graph_snapshot import TARGET_FILE, GraphSnapshot, gather_neighbors
+
+# Upper bound on wedges (2-paths) materialised at once while enumerating
+WEDGE_CHUNK = 2_000_000
+
+GROUP_NAMES = {
+    1: "All Same Country",
+    2: "Two Same Countries",
+    3: "All Different Countries",
+}
+
+
+def enumerate_triangles(snapshot: GraphSnapshot) -> np.ndarray:
+    """
+    Every triangle of the undirected FOLLOWS graph exactly once, as (T, 3) node indices.
+
+    Each edge is oriented from the endpoint of lower (degree, index) rank to
+    the higher one, which bounds every node's out-degree by O(sqrt(m)). A
+    triangle is then a wedge u->v->w whose closing edge u->w exists, and each
+    triangle has exactly one such wedge. Wedges are generated and checked in
+    vectorised chunks against the sorted oriented edge codes.
+    """
+    n = snapshot.node_count
+    degree = np.diff(snapshot.und_offsets)
+    rank = np.empty(n, dtype=np.int64)
+    rank[np.lexsort((np.arange(n), degree))] = np.arange(n)
+
+    src = np.repeat(np.arange(n, dtype=np.int64), degree)
+    dst = snapshot.und_neighbors.astype(np.int64)
+    keep = rank[src] < rank[dst]
+    u, v = src[keep], dst[keep]
+    # src is non-decreasing and rows are sorted, so the codes are already sorted
+    codes = u * n + v
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(u, minlength=n), out=offsets[1:])
+
+    wedges_per_edge = offsets[v + 1] - offsets[v]
+    boundaries = np.searchsorted(
+        np.cumsum(wedges_per_edge), np.arange(WEDGE_CHUNK, wedges_per_edge.sum() + WEDGE_CHUNK, WEDGE_CHUNK)
+    )
+    triangles = []
+    start = 0
+    for stop in np.unique(np.append(boundaries, len(u))):
+        if stop <= start:
+            continue
+        owner, w = gather_neighbors(offsets, v, v[start:stop])
+        a = u[start:stop][owner]
+        b = v[start:stop][owner]
+        closing = a * n + w
+        pos = np.minimum(np.searchsorted(codes, closing), len(codes) - 1)
+        found = codes[pos] == closing
+        triangles.append(np.stack([a[found], b[found], w[found]], axis=1))
+        start = stop
+
+    if not triangles:
+        return np.empty((0, 3), dtype=np.int64)
+    return np.concatenate(triangles)
+
+
+async def load_country_codes(snapshot: GraphSnapshot) -> np.ndarray:
+    """Country code of every snapshot node (None where unknown), from Neo4j or the target CSV."""
+    codes = np.full(snapshot.node_count, None, dtype=object)
+    try:
+        async with driver.session() as session:
+            result = await session.run(
+                "MATCH (u:User) RETURN u.id AS id, u.country_code AS country_code"
+            )
+            rows = [(record["id"], record["country_code"]) async for record in result]
+    except Exception as e:
+        print(f"Could not load country codes from Neo4j: {e}")
+        rows = _country_codes_from_csv()
+
+    for user_id, country_code in rows:
+        idx = snapshot.index_of(user_id)
+        if idx is not None:
+            codes[idx] = country_code
+    return codes
+
+
+def _country_codes_from_csv(target_file: str = TARGET_FILE) -> List[tuple]:
+    from app.initial_conn import COUNTRY_CODES
+
+    if not os.path.exists(target_file):
+        return []
+    target = np.loadtxt(target_file, delimiter=",", skiprows=1, dtype=np.int64, ndmin=2)
+    return [(int(uid), COUNTRY_CODES.get(int(t), "Unknown")) for uid, t in target]
+
+
+def country_triangle_analysis(
+    snapshot: GraphSnapshot, country_codes: np.ndarray
+) -> Dict[str, Any]:
+    """
+    Enumerate triangles once and derive both triangle analyses from that pass.
+
+    Returns the same rows as the Cypher `pairwise_analysis` (country pair
+    frequencies over the three pairs of each triangle, ignoring unknown
+    countries) and `grouped_analysis` (triangles by sorted country triple and by
+    how many distinct countries they span) queries.
+    """
+    start = time.perf_counter()
+    triangles = enumerate_triangles(snapshot)
+
+    # Dictionary-encode countries; index 0 stands for a missing country code
+    countries = sorted({c for c in country_codes if c is not None})
+    encoded = np.zeros(snapshot.node_count, dtype=np.int64)
+    lookup = {c: i + 1 for i, c in enumerate(countries)}
+    for idx, code in enumerate(country_codes):
+        if code is not None:
+            encoded[idx] = lookup[code]
+    names = [None] + countries
+    k = len(names)
+
+    tri = np.sort(encoded[triangles], axis=1)  # (T, 3) sorted country codes
+
+    # Pairwise: the three pairs of each sorted triple are already ordered
+    pairs = np.concatenate([tri[:, [0, 1]], tri[:, [0, 2]], tri[:, [1, 2]]])
+    pairs = pairs[(pairs[:, 0] > 0) & (pairs[:, 1] > 0)]
+    pair_codes, pair_counts = np.unique(pairs[:, 0] * k + pairs[:, 1], return_counts=True)
+    order = np.argsort(-pair_counts, kind="stable")
+    pairwise = [
+        {
+            "countryA": names[pair_codes[i] // k],
+            "countryB": names[pair_codes[i] % k],
+            "frequency": int(pair_counts[i]),
+        }
+        for i in order
+    ]
+
+    # Grouped: distinct countries per triangle and the sorted triple itself
+    distinct = 1 + (tri[:, 1] != tri[:, 0]) + (tri[:, 2] != tri[:, 1])
+    triple_codes, first, triple_counts = np.unique(
+        (tri[:, 0] * k + tri[:, 1]) * k + tri[:, 2], return_index=True, return_counts=True
+    )
+    order = np.argsort(-triple_counts, kind="stable")
+    grouped = [
+        {
+            "countryGroup": GROUP_NAMES[int(distinct[first[i]])],
+            "countriesInvolved": [names[c] for c in tri[first[i]]],
+            "triangleCount": int(triple_counts[i]),
+        }
+        for i in order
+    ]
+
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+    memory = triangles.nbytes + tri.nbytes + pairs.nbytes
+    metrics = {
+        "execution_time_ms": elapsed_ms,
+        "triangle_count": int(len(triangles)),
+        "memory_estimate": {
+            "human_readable": f"{memory / 1024**2:.2f} MiB",
+            "bytes_min": int(memory),
+            "bytes_max": int(memory),
+        },
+        "engine": "in-memory",
+    }
+    return {
+        "pairwise_analysis": {"data": pairwise, "metrics": metrics},
+        "grouped_analysis": {"data": grouped, "metrics": metrics},
+    }
@@ -0,0 +1,95 @@
+"""
+Payload size and encode time of the analytics response formats.
+
+Builds a centrality-shaped payload (three algorithms, `--rows` top nodes each,
+with the ten top artist IDs per node drawn from a shared pool, as stored in
+`u.top_artists`, and real country codes from the target CSV) and encodes it the way FastAPI does by default and in each opt-in
+format, reporting raw and gzipped sizes and median encode time, e.g.
+
+    python benchmarks/format_benchmark.py --rows 1000
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from app.api.responses import dumps_json, dumps_msgpack, msgpack, orjson, to_columnar  # noqa: E402
+from app.initial_conn import COUNTRY_CODES, COUNTRY_NAMES  # noqa: E402
+from app.methods.graph_snapshot import TARGET_FILE  # noqa: E402
+
+
+def build_payload(rows, artist_pool, seed):
+    rng = random.Random(seed)
+    with open(TARGET_FILE) as f:
+        next(f)
+        targets = [int(line.split(",")[1]) for line in f if line.strip()]
+    # Centrality rows carry the raw artist ID list; names are not resolved
+    artists = range(artist_pool)
+
+    def node(i):
+        code = COUNTRY_CODES.get(rng.choice(targets), "Unknown")
+        return {
+            "id": i,
+            "score": rng.random(),
+            "countryCode": code,
+            "countryName": COUNTRY_NAMES.get(code, "Unknown"),
+            "topArtists": rng.sample(artists, 10),
+        }
+
+    return {
+        algorithm: {
+            "memory": "12 MiB",
+            "timeMs": 42,
+            "distribution": {"min": 0.0, "p50": 0.1, "p99": 0.9, "max": 1.0},
+            "topNodes": [node(i) for i in range(rows)],
+        }
+        for algorithm in ("degree", "betweenness", "closeness")
+    }
+
+
+def measure(encode, payload, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = encode(payload)
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "bytes": len(body),
+        "gzip_bytes": len(gzip.compress(body, compresslevel=6)),
+        "median_encode_ms": round(statistics.median(samples), 3),
+    }
+
+
+def run(rows, artist_pool, repeat, seed):
+    payload = build_payload(rows, artist_pool, seed)
+    encoders = {
+        # What FastAPI does for a plain dict response
+        "json_rows (default)": lambda p: json.dumps(jsonable_encoder(p)).encode(),
+        "columnar_json": lambda p: dumps_json(to_columnar(p)),
+    }
+    if orjson is not None:
+        encoders["orjson_rows"] = lambda p: orjson.dumps(p)
+    if msgpack is not None:
+        encoders["columnar_msgpack"] = lambda p: dumps_msgpack(to_columnar(p))
+    return {name: measure(encode, payload, repeat) for name, encode in encoders.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000, help="top nodes per algorithm")
+    parser.add_argument("--artist-pool", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    report = run(args.rows, args.artist_pool, args.repeat, args.seed)
+    print(json.dumps({"rows": args.rows, "orjson": orjson is not None, "results": report}, indent=2))
@@ -0,0 +1,108 @@
+"""
+Mixed-traffic load test for the API.
+
+Runs cheap lookups (/connected_nodes, /common_neighbors) from many client
+threads while a few clients keep a heavy analytics endpoint busy, then prints
+p50/p99 latency of the successful (2xx) requests per endpoint; anything else
+counts as an error. To compare the sync and async handlers, start the
+server from each revision in turn and run this script against it with the same
+settings, e.g.
+
+    uvicorn app.main:app --port 8000
+    python benchmarks/load_test.py --label async --duration 60
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+NODE_COUNT = 7624
+
+
+def cheap_request(base_url: str, rng: random.Random) -> str:
+    if rng.random() < 0.5:
+        return f"{base_url}/connected_nodes/{rng.randrange(NODE_COUNT)}"
+    return (
+        f"{base_url}/common_neighbors/"
+        f"{rng.randrange(NODE_COUNT)}/{rng.randrange(NODE_COUNT)}"
+    )
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    idx = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def run(base_url, duration, cheap_clients, heavy_clients, heavy_path, seed):
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(kind, client_seed):
+        rng = random.Random(client_seed)
+        session = requests.Session()
+        while time.perf_counter() < deadline:
+            url = cheap_request(base_url, rng) if kind == "cheap" else base_url + heavy_path
+            label = url[len(base_url):].split("/")[1]
+            start = time.perf_counter()
+            try:
+                response = session.get(url, timeout=300)
+                ok = 200 <= response.status_code < 300
+            except requests.RequestException:
+                ok = False
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with lock:
+                if ok:
+                    latencies[label].append(elapsed_ms)
+                else:
+                    errors[label] += 1
+
+    with ThreadPoolExecutor(max_workers=cheap_clients + heavy_clients) as pool:
+        for i in range(cheap_clients):
+            pool.submit(client, "cheap", seed + i)
+        for i in range(heavy_clients):
+            pool.submit(client, "heavy", seed + cheap_clients + i)
+
+    report = {}
+    # Labels whose every request failed only show up in `errors`
+    for label in sorted(set(latencies) | set(errors)):
+        values = sorted(latencies[label])
+        report[label] = {
+            "requests": len(values),
+            "errors": errors[label],
+            "throughput_rps": round(len(values) / duration, 1),
+            "p50_ms": round(percentile(values, 50), 2) if values else None,
+            "p99_ms": round(percentile(values, 99), 2) if values else None,
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--label", default="run", help="name printed with the results")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--cheap-clients", type=int, default=64)
+    parser.add_argument("--heavy-clients", type=int, default=4)
+    parser.add_argument("--heavy-path", default="/centrality-analysis")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = run(
+        args.base_url,
+        args.duration,
+        args.cheap_clients,
+        args.heavy_clients,
+        args.heavy_path,
+        args.seed,
+    )
+    print(json.dumps({"label": args.label, "results": results}, indent=2))
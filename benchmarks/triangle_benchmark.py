@@ -0,0 +1,87 @@
+"""
+Triangle analysis benchmark: in-memory enumeration vs. the Cypher queries.
+
+Loads the graph snapshot (from Neo4j if reachable, otherwise the CSV files),
+times the single-pass triangle enumeration plus both country aggregations, and
+optionally times the two PROFILE Cypher queries for comparison, e.g.
+
+    python benchmarks/triangle_benchmark.py --repeat 5
+    python benchmarks/triangle_benchmark.py --repeat 5 --cypher
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.methods.graph_snapshot import get_snapshot  # noqa: E402
+from app.methods.shortest_path import QUERIES, execute_query_with_metrics  # noqa: E402
+from app.methods.triangles import (  # noqa: E402
+    country_triangle_analysis,
+    enumerate_triangles,
+    load_country_codes,
+)
+
+
+def summarize(samples_ms):
+    return {
+        "runs": len(samples_ms),
+        "min_ms": round(min(samples_ms), 2),
+        "median_ms": round(statistics.median(samples_ms), 2),
+        "max_ms": round(max(samples_ms), 2),
+    }
+
+
+async def run(repeat, cypher):
+    snapshot = await get_snapshot()
+    if snapshot is None:
+        raise SystemExit("No graph snapshot available (Neo4j unreachable and no CSV files)")
+    country_codes = await load_country_codes(snapshot)
+
+    enumerate_ms, analysis_ms = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        triangles = enumerate_triangles(snapshot)
+        enumerate_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        result = country_triangle_analysis(snapshot, country_codes)
+        analysis_ms.append((time.perf_counter() - start) * 1000)
+
+    report = {
+        "nodes": snapshot.node_count,
+        "edges": snapshot.edge_count,
+        "snapshot_source": snapshot.source,
+        "triangles": int(len(triangles)),
+        "pairwise_rows": len(result["pairwise_analysis"]["data"]),
+        "grouped_rows": len(result["grouped_analysis"]["data"]),
+        "enumerate_only": summarize(enumerate_ms),
+        "both_analyses": summarize(analysis_ms),
+    }
+
+    if cypher:
+        for analysis_type, query in QUERIES.items():
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                cypher_result = await execute_query_with_metrics(query)
+                samples.append((time.perf_counter() - start) * 1000)
+            report[f"cypher_{analysis_type}"] = {
+                **summarize(samples),
+                "rows": len(cypher_result["data"]),
+            }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--cypher", action="store_true", help="also time the Cypher queries")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.repeat, args.cypher)), indent=2))
@@ -0,0 +1,123 @@
+"""
+Bit-parallel all-pairs BFS against plain BFS, in a thread and in the process pool.
+
+Run with `python -m pytest tests` or `python -m unittest discover tests`.
+"""
+
+import asyncio
+import unittest
+from collections import Counter, deque
+
+import numpy as np
+
+from app.methods import apsp
+from app.methods.apsp import _source_mask, all_pairs_statistics, bfs_batch
+from app.methods.graph_snapshot import GraphSnapshot
+
+
+def random_snapshot(n, m, seed):
+    rng = np.random.default_rng(seed)
+    edges = rng.integers(0, n, size=(m, 2))
+    # Isolated nodes at the end leave unreachable pairs
+    return GraphSnapshot(np.arange(n), edges[:, 0], edges[:, 1] % (n - 5), source="test")
+
+
+def plain_bfs(offsets, neighbors, source):
+    """Distances from `source` over the forward rows (offsets, neighbors)."""
+    distance = {source: 0}
+    queue = deque([source])
+    while queue:
+        u = queue.popleft()
+        for v in neighbors[offsets[u]:offsets[u + 1]]:
+            if v not in distance:
+                distance[v] = distance[u] + 1
+                queue.append(v)
+    return distance
+
+
+def brute_force_histogram(snapshot, directed):
+    if directed:
+        offsets, neighbors = snapshot.out_offsets, snapshot.out_neighbors
+    else:
+        offsets, neighbors = snapshot.und_offsets, snapshot.und_neighbors
+    histogram = Counter()
+    deepest = []
+    for s in range(snapshot.node_count):
+        for t, d in plain_bfs(offsets, neighbors, s).items():
+            if s < t:
+                histogram[d] += 1
+                deepest.append((d, s, t))
+    return histogram, deepest
+
+
+class SourceMaskTest(unittest.TestCase):
+    def test_bits_below_each_target(self):
+        n, words = 300, 2
+        for first in (0, 64, 128, 256):
+            mask = _source_mask(n, first, words)
+            for t in (0, first, first + 1, first + 63, first + 64, first + 65, first + 127, first + 128, n - 1):
+                if t >= n:
+                    continue
+                for w in range(words):
+                    for bit in range(64):
+                        expected = first + 64 * w + bit < t
+                        self.assertEqual(bool(int(mask[t, w]) >> bit & 1), expected, (first, t, w, bit))
+
+
+class BfsBatchTest(unittest.TestCase):
+    def test_batches_match_plain_bfs(self):
+        snapshot = random_snapshot(150, 400, 1)
+        histogram, _ = brute_force_histogram(snapshot, directed=True)
+        for words in (1, 2, 3):
+            total = Counter()
+            for first in range(0, snapshot.node_count, 64 * words):
+                batch, _ = bfs_batch(snapshot.in_offsets, snapshot.in_neighbors, first, words, 0)
+                for d, count in enumerate(batch):
+                    total[d] += int(count)
+            del total[0]
+            self.assertEqual(+total, histogram, words)
+
+    def test_longest_rows(self):
+        snapshot = random_snapshot(150, 300, 2)
+        _, deepest = brute_force_histogram(snapshot, directed=False)
+        expected = {row for row in deepest if row[0] == max(deepest)[0]}
+        found = set()
+        for first in range(0, snapshot.node_count, 64):
+            _, longest = bfs_batch(snapshot.und_offsets, snapshot.und_neighbors, first, 1, 10_000)
+            found |= {tuple(row) for row in longest.tolist() if row[0] == max(deepest)[0]}
+        self.assertEqual(found, expected)
+
+
+class AllPairsStatisticsTest(unittest.TestCase):
+    def tearDown(self):
+        apsp.shutdown_pool()
+
+    def check(self, workers, directed):
+        snapshot = random_snapshot(200, 500, 3)
+        histogram, deepest = brute_force_histogram(snapshot, directed)
+        result = asyncio.run(
+            all_pairs_statistics(snapshot, directed=directed, top=5, words=1, workers=workers)
+        )
+        statistics = result["statistics"]
+        self.assertEqual(statistics["path_lengths"]["distribution"], dict(histogram))
+        self.assertEqual(statistics["reachable_pairs"], sum(histogram.values()))
+        self.assertEqual(statistics["diameter"], max(histogram))
+        # Ties at the cut are kept in any order, so compare distances and membership
+        paths = [(p["distance"], p["source"], p["target"]) for p in result["paths"]]
+        self.assertEqual([d for d, _, _ in paths], sorted((d for d, _, _ in deepest), reverse=True)[:5])
+        self.assertTrue(set(paths) <= set(deepest))
+        return result
+
+    def test_in_a_thread(self):
+        for directed in (True, False):
+            result = self.check(workers=1, directed=directed)
+            self.assertEqual(result["performance_metrics"]["workers"], 1)
+
+    def test_in_the_process_pool(self):
+        for directed in (True, False):
+            result = self.check(workers=2, directed=directed)
+            self.assertEqual(result["performance_metrics"]["workers"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
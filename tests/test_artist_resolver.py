@@ -0,0 +1,129 @@
+"""
+ArtistResolver against a local stub of the Last.fm artist.getInfo API.
+
+Run with `python -m pytest tests` or `python -m unittest discover tests`.
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from app.db.cache import BoundedCache
+from app.methods.artist_resolver import ArtistNameStore, ArtistResolver, unknown_artist_name
+
+
+class StubLastFm:
+    """Serves artist.getInfo; artist "missing" is not found. Counts requests per artist."""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.requests = Counter()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                artist = parse_qs(urlparse(self.path).query).get("artist", [""])[0]
+                stub.requests[artist] += 1
+                time.sleep(stub.delay)
+                if artist == "missing":
+                    body = {"error": 6, "message": "The artist you supplied could not be found"}
+                else:
+                    body = {"artist": {"name": f"Artist {artist}"}}
+                payload = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/2.0/"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class ArtistResolverTest(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubLastFm().__enter__()
+        self.addCleanup(self.stub.__exit__, None, None, None)
+        handle, self.db_path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(handle)
+        self.addCleanup(os.remove, self.db_path)
+
+    def resolver(self, **options) -> ArtistResolver:
+        resolver = ArtistResolver(
+            store=ArtistNameStore(self.db_path),
+            cache=BoundedCache("test-artists"),
+            api_url=self.stub.url,
+            api_key="test",
+            rate_limit=0,
+            **options,
+        )
+        self.addCleanup(resolver.close)
+        return resolver
+
+    def test_resolves_names_in_order(self):
+        resolver = self.resolver()
+        result = asyncio.run(resolver.resolve_many(["2", "1", "2"]))
+        self.assertEqual(
+            result,
+            [{"id": "2", "name": "Artist 2"}, {"id": "1", "name": "Artist 1"}, {"id": "2", "name": "Artist 2"}],
+        )
+        self.assertEqual(self.stub.requests, Counter({"1": 1, "2": 1}))
+
+    def test_concurrent_requests_fetch_each_artist_once(self):
+        resolver = self.resolver()
+
+        async def run():
+            return await asyncio.gather(*(resolver.resolve_many(["7", "8"]) for _ in range(10)))
+
+        results = asyncio.run(run())
+        self.assertTrue(all(r == results[0] for r in results))
+        self.assertEqual(self.stub.requests, Counter({"7": 1, "8": 1}))
+
+    def test_names_survive_restart(self):
+        asyncio.run(self.resolver().resolve_many(["3"]))
+        restarted = self.resolver()
+        self.assertEqual(restarted.load(), 1)
+        self.assertEqual(asyncio.run(restarted.resolve_many(["3"]))[0]["name"], "Artist 3")
+        self.assertEqual(self.stub.requests["3"], 1)
+
+    def test_unknown_artist_is_not_stored(self):
+        resolver = self.resolver()
+        result = asyncio.run(resolver.resolve_many(["missing"]))
+        self.assertEqual(result[0]["name"], unknown_artist_name("missing"))
+        self.assertEqual(resolver.store.get_many(["missing"]), {})
+
+    def test_cancelled_caller_does_not_cancel_shared_fetch(self):
+        resolver = self.resolver()
+
+        async def run():
+            first = asyncio.ensure_future(resolver.resolve_many(["9"]))
+            second = asyncio.ensure_future(resolver.resolve_many(["9"]))
+            await asyncio.sleep(self.stub.delay / 2)
+            first.cancel()
+            return await second
+
+        self.assertEqual(asyncio.run(run()), [{"id": "9", "name": "Artist 9"}])
+        self.assertEqual(self.stub.requests["9"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+"""
+BoundedCache eviction (entry count, bytes, TTL) and its stats counters.
+
+Run with `python -m pytest tests` or `python -m unittest discover tests`.
+"""
+
+import unittest
+from unittest import mock
+
+from app.db import cache
+from app.db.cache import BoundedCache, _sizeof
+
+
+class BoundedCacheTest(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        c = BoundedCache("test", max_entries=2)
+        c.set("a", 1)
+        c.set("b", 2)
+        self.assertEqual(c.get("a"), 1)  # "b" is now the oldest
+        c.set("c", 3)
+        self.assertIsNone(c.get("b"))
+        self.assertEqual(c.get("a"), 1)
+        self.assertEqual(c.get("c"), 3)
+        self.assertEqual(c.evictions, 1)
+        self.assertEqual(len(c), 2)
+
+    def test_overwrite_does_not_evict(self):
+        c = BoundedCache("test", max_entries=2)
+        c.set("a", 1)
+        c.set("b", 2)
+        c.set("a", 10)
+        self.assertEqual(len(c), 2)
+        self.assertEqual(c.evictions, 0)
+        self.assertEqual(c.get("a"), 10)
+
+    def test_byte_bound(self):
+        value = "x" * 1000
+        size = _sizeof(value)
+        c = BoundedCache("test", max_bytes=2 * size + size // 2)
+        for key in ("a", "b", "c"):
+            c.set(key, value)
+        self.assertEqual(len(c), 2)
+        self.assertIsNone(c.get("a"))
+        self.assertEqual(c.stats()["bytes"], 2 * size)
+        self.assertEqual(c.evictions, 1)
+
+        # A value larger than the bound does not stay
+        c.set("huge", "x" * 10_000)
+        self.assertEqual(len(c), 0)
+        self.assertEqual(c.stats()["bytes"], 0)
+
+    def test_sizeof_counts_nested_values(self):
+        flat = _sizeof({"name": "x"})
+        nested = _sizeof({"name": "x", "top_artists": ["y" * 500]})
+        self.assertGreater(nested - flat, 500)
+
+    def test_ttl_expiry(self):
+        now = [100.0]
+        with mock.patch.object(cache.time, "monotonic", lambda: now[0]):
+            c = BoundedCache("test", ttl=10)
+            c.set("default", 1)
+            c.set("short", 2, ttl=1)
+            now[0] = 100.5
+            self.assertEqual(c.get("short"), 2)
+            now[0] = 101.0
+            self.assertIsNone(c.get("short"))
+            self.assertEqual(c.get("default"), 1)
+            now[0] = 110.0
+            self.assertEqual(c.get("default", "gone"), "gone")
+        self.assertEqual(c.expirations, 2)
+        self.assertEqual(len(c), 0)
+
+    def test_counters(self):
+        c = BoundedCache("test", max_entries=10)
+        self.assertIsNone(c.stats()["hit_ratio"])
+        c.set("a", 1)
+        c.set("b", 2)
+        c.get("a")
+        c.get("a")
+        c.get("missing")
+        self.assertTrue(c.invalidate("b"))
+        self.assertFalse(c.invalidate("b"))
+        c.set("c", 3)
+        c.clear()
+        stats = c.stats()
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hit_ratio"], round(2 / 3, 4))
+        self.assertEqual(stats["invalidations"], 3)
+        self.assertEqual(stats["entries"], 0)
+        self.assertEqual(stats["bytes"], 0)
+
+    def test_get_cache_returns_the_named_instance(self):
+        with mock.patch.dict(cache._caches, clear=True):
+            first = cache.get_cache("test", max_entries=5)
+            self.assertIs(cache.get_cache("test", max_entries=99), first)
+            self.assertEqual(first.max_entries, 5)
+            self.assertIn("test", cache.cache_stats())
+
+
+if __name__ == "__main__":
+    unittest.main()
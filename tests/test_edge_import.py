@@ -0,0 +1,76 @@
+"""
+write_edges' transaction reports only the edges it created, and bulk line parsing.
+
+Run with `python -m pytest tests` or `python -m unittest discover tests`.
+"""
+
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from app.methods.edge_import import WRITE_EDGES_QUERY, _parse_line, _write_edges_tx
+
+
+class FakeResult:
+    def __init__(self, records, created):
+        self.records = records
+        self.created = created
+
+    def __aiter__(self):
+        async def records():
+            for record in self.records:
+                yield record
+        return records()
+
+    async def consume(self):
+        return SimpleNamespace(counters=SimpleNamespace(relationships_created=self.created))
+
+
+class FakeTx:
+    def __init__(self, records, created):
+        self.result = FakeResult(records, created)
+        self.queries = []
+
+    async def run(self, query, **params):
+        self.queries.append(query)
+        return self.result
+
+
+class WriteEdgesTxTest(unittest.TestCase):
+    def test_returns_only_new_edges_once(self):
+        # Path 1 -> 2 -> 3 -> 2 -> 3: (1, 2) existed, (2, 3) is repeated
+        tx = FakeTx(
+            [
+                {"source": 1, "target": 2, "new": False},
+                {"source": 2, "target": 3, "new": True},
+                {"source": 3, "target": 2, "new": True},
+                {"source": 2, "target": 3, "new": True},
+            ],
+            created=2,
+        )
+        written, created_edges = asyncio.run(_write_edges_tx(tx, [[1, 2], [2, 3], [3, 2], [2, 3]]))
+        self.assertEqual(len(written), 4)
+        self.assertEqual(created_edges, [(2, 3), (3, 2)])
+        self.assertEqual(tx.queries[0], WRITE_EDGES_QUERY)
+        self.assertEqual(len(tx.queries), 2)  # the graph version bump
+
+    def test_nothing_created_leaves_the_version_alone(self):
+        tx = FakeTx([{"source": 1, "target": 2, "new": False}], created=0)
+        written, created_edges = asyncio.run(_write_edges_tx(tx, [[1, 2]]))
+        self.assertEqual((written, created_edges), ([(1, 2)], []))
+        self.assertEqual(len(tx.queries), 1)
+
+
+class ParseLineTest(unittest.TestCase):
+    def test_formats(self):
+        self.assertEqual(_parse_line('{"source": 1, "target": 2}', "ndjson"), (1, 2))
+        self.assertEqual(_parse_line("[3, 4]", "ndjson"), (3, 4))
+        self.assertEqual(_parse_line("5,6\r", "csv"), (5, 6))
+        self.assertIsNone(_parse_line("node_1,node_2", "csv"))
+        self.assertIsNone(_parse_line("   ", "csv"))
+        with self.assertRaises(ValueError):
+            _parse_line("7,x", "csv")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+"""
+GraphSnapshot built from small edge lists, and get_snapshot's CSV fallback.
+
+Run with `python -m pytest tests` or `python -m unittest discover tests`.
+"""
+
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from app.methods import graph_snapshot
+from app.methods.graph_snapshot import GraphSnapshot, gather_neighbors, load_snapshot_from_csv
+
+
+def snapshot_of(edges, ids=None):
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    if ids is None:
+        ids = edges.ravel()
+    return GraphSnapshot(ids, edges[:, 0], edges[:, 1], source="test")
+
+
+class GraphSnapshotTest(unittest.TestCase):
+    def test_drops_self_loops_and_duplicate_edges(self):
+        snapshot = snapshot_of([(10, 20), (10, 20), (20, 20), (30, 10), (10, 30)])
+        self.assertEqual(snapshot.edge_count, 3)
+        self.assertEqual(snapshot.following(20), [])
+        self.assertEqual(snapshot.following(10), [20, 30])
+        self.assertEqual(snapshot.followers(10), [30])
+        # Either direction counts once in the undirected rows
+        self.assertEqual(snapshot.neighbors(10), [20, 30])
+        self.assertEqual(snapshot.neighbors(20), [10])
+
+    def test_rows_are_sorted_by_id(self):
+        snapshot = snapshot_of([(5, 40), (5, 7), (5, 19), (5, 1), (40, 5)])
+        self.assertEqual(snapshot.following(5), [1, 7, 19, 40])
+        for offsets, neighbors in (
+            (snapshot.out_offsets, snapshot.out_neighbors),
+            (snapshot.in_offsets, snapshot.in_neighbors),
+            (snapshot.und_offsets, snapshot.und_neighbors),
+        ):
+            for i in range(snapshot.node_count):
+                row = neighbors[offsets[i]:offsets[i + 1]]
+                self.assertTrue(np.all(np.diff(row) > 0))
+
+    def test_isolated_nodes_and_unknown_users(self):
+        snapshot = snapshot_of([(1, 2)], ids=[1, 2, 3])
+        self.assertEqual(snapshot.node_count, 3)
+        self.assertTrue(snapshot.has_user(3))
+        self.assertEqual(snapshot.neighbors(3), [])
+        self.assertFalse(snapshot.has_user(4))
+        self.assertIsNone(snapshot.index_of(0))
+        self.assertEqual(snapshot.following(4), [])
+        self.assertEqual(snapshot.neighbor_page("neighbors", 4), ([], 0, False))
+
+    def test_common_neighbors(self):
+        snapshot = snapshot_of([(1, 3), (4, 1), (2, 3), (2, 4), (1, 5), (6, 2)])
+        self.assertEqual(snapshot.common_neighbors(1, 2), [3, 4])
+        self.assertEqual(snapshot.common_neighbors(1, 1), [])
+        self.assertEqual(snapshot.common_neighbors(1, 99), [])
+
+    def test_keyset_pages_cover_the_row_once(self):
+        edges = [(0, v) for v in range(1, 200, 3)] + [(v, 0) for v in range(2, 200, 7)]
+        snapshot = snapshot_of(edges)
+        expected = snapshot.neighbors(0)
+        for limit in (1, 5, 7, len(expected), len(expected) + 3):
+            seen, after, has_more = [], None, True
+            while has_more:
+                page, total, has_more = snapshot.neighbor_page("neighbors", 0, after, limit)
+                self.assertEqual(total, len(expected))
+                self.assertLessEqual(len(page), limit)
+                seen += page
+                after = page[-1] if page else after
+            self.assertEqual(seen, expected)
+
+    def test_page_after_an_id_not_in_the_row(self):
+        snapshot = snapshot_of([(0, 10), (0, 20), (0, 30), (5, 6), (25, 26)])
+        # 5 and 25 are users but not neighbors of 0; 15 is not a user at all
+        self.assertEqual(snapshot.neighbor_page("following", 0, after=5, limit=10)[0], [10, 20, 30])
+        self.assertEqual(snapshot.neighbor_page("following", 0, after=15, limit=10)[0], [20, 30])
+        self.assertEqual(snapshot.neighbor_page("following", 0, after=25, limit=1), ([30], 3, False))
+        self.assertEqual(snapshot.neighbor_page("following", 0, after=30, limit=10), ([], 3, False))
+
+    def test_common_neighbor_page(self):
+        edges = [(1, v) for v in range(10, 30)] + [(2, v) for v in range(20, 40)]
+        snapshot = snapshot_of(edges)
+        page, total, has_more = snapshot.common_neighbor_page(1, 2, after=None, limit=4)
+        self.assertEqual((page, total, has_more), ([20, 21, 22, 23], 10, True))
+        page, total, has_more = snapshot.common_neighbor_page(1, 2, after=27, limit=4)
+        self.assertEqual((page, total, has_more), ([28, 29], 10, False))
+
+    def test_with_edges_adds_users_and_keeps_the_original(self):
+        snapshot = snapshot_of([(1, 2), (2, 3)])
+        updated = snapshot.with_edges([(3, 1), (1, 2), (4, 4), (5, 1)])
+        self.assertIsNot(updated, snapshot)
+        self.assertEqual(snapshot.edge_count, 2)
+        self.assertFalse(snapshot.has_user(5))
+        self.assertEqual(updated.edge_count, 4)
+        self.assertEqual(updated.followers(1), [3, 5])
+        self.assertTrue(updated.has_user(4))
+        self.assertEqual(updated.neighbors(4), [])
+        self.assertIs(snapshot.with_edges([]), snapshot)
+
+    def test_gather_neighbors(self):
+        snapshot = snapshot_of([(1, 2), (1, 3), (3, 2), (4, 1)])
+        rows = np.array([snapshot.index_of(1), snapshot.index_of(2)])
+        owner, values = gather_neighbors(snapshot.out_offsets, snapshot.out_neighbors, rows)
+        self.assertEqual(owner.tolist(), [0, 0])
+        self.assertEqual(snapshot.ids[values].tolist(), [2, 3])
+
+
+class SnapshotLoadingTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.edges_file = os.path.join(self.dir.name, "edges.csv")
+        self.target_file = os.path.join(self.dir.name, "target.csv")
+        with open(self.edges_file, "w") as f:
+            f.write("node_1,node_2\n0,1\n1,2\n2,2\n")
+        with open(self.target_file, "w") as f:
+            f.write("id,target\n0,3\n1,3\n2,5\n3,0\n")
+        graph_snapshot._snapshot = None
+
+    def tearDown(self):
+        graph_snapshot._snapshot = None
+        self.dir.cleanup()
+
+    def test_csv_includes_users_without_edges(self):
+        snapshot = load_snapshot_from_csv(self.edges_file, self.target_file)
+        self.assertEqual(snapshot.ids.tolist(), [0, 1, 2, 3])
+        self.assertEqual(snapshot.edge_count, 2)
+        self.assertEqual(snapshot.source, "csv")
+
+    def test_falls_back_to_csv_when_neo4j_is_down(self):
+        async def unavailable():
+            raise ConnectionError("Neo4j is down")
+
+        async def no_refresh():
+            return None
+
+        with mock.patch.object(graph_snapshot, "load_snapshot_from_neo4j", unavailable), \
+                mock.patch.object(graph_snapshot, "refresh_graph_version", no_refresh), \
+                mock.patch.object(
+                    graph_snapshot,
+                    "load_snapshot_from_csv",
+                    lambda: load_snapshot_from_csv(self.edges_file, self.target_file),
+                ):
+            snapshot = asyncio.run(graph_snapshot.get_snapshot())
+            self.assertEqual(snapshot.source, "csv")
+            self.assertEqual(snapshot.node_count, 4)
+            # Loaded once, then served from memory
+            self.assertIs(asyncio.run(graph_snapshot.get_snapshot()), snapshot)
+
+            graph_snapshot.add_edges_to_snapshot([(3, 0)])
+            self.assertEqual(graph_snapshot._snapshot.followers(0), [3])
+            graph_snapshot.add_edges_to_snapshot(None)
+            self.assertIsNone(graph_snapshot._snapshot)
+
+    def test_returns_none_when_no_source_is_available(self):
+        async def unavailable():
+            raise ConnectionError("Neo4j is down")
+
+        async def no_refresh():
+            return None
+
+        def missing():
+            raise FileNotFoundError("no edges file")
+
+        with mock.patch.object(graph_snapshot, "load_snapshot_from_neo4j", unavailable), \
+                mock.patch.object(graph_snapshot, "refresh_graph_version", no_refresh), \
+                mock.patch.object(graph_snapshot, "load_snapshot_from_csv", missing):
+            self.assertIsNone(asyncio.run(graph_snapshot.get_snapshot()))
+
+
+if __name__ == "__main__":
+    unittest.main()
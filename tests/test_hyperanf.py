@@ -0,0 +1,63 @@
+"""
+HyperANF estimates against the exact all-pairs statistics on small graphs.
+
+The runs are seeded, so the estimates are deterministic.
+
+Run with `python -m pytest tests` or `python -m unittest discover tests`.
+"""
+
+import asyncio
+import unittest
+
+import numpy as np
+
+from app.methods.apsp import all_pairs_statistics
+from app.methods.graph_snapshot import GraphSnapshot
+from app.methods.hyperanf import _estimate, _initial_registers, approximate_path_statistics
+
+
+def random_snapshot(n, m, seed):
+    rng = np.random.default_rng(seed)
+    edges = rng.integers(0, n, size=(m, 2))
+    return GraphSnapshot(np.arange(n), edges[:, 0], edges[:, 1], source="test")
+
+
+class HyperAnfTest(unittest.TestCase):
+    def compare(self, snapshot, directed):
+        exact = asyncio.run(all_pairs_statistics(snapshot, directed=directed, workers=1))["statistics"]
+        approximate = asyncio.run(
+            approximate_path_statistics(snapshot, directed=directed, log2m=7, runs=8)
+        )["statistics"]
+
+        reachable = approximate["reachable_pairs"]
+        self.assertGreater(reachable["margin_95"], 0)
+        self.assertLessEqual(abs(reachable["estimate"] - exact["reachable_pairs"]), reachable["margin_95"])
+
+        average = approximate["path_lengths"]["average"]
+        self.assertLessEqual(
+            abs(average["estimate"] - exact["path_lengths"]["average"]), average["margin_95"]
+        )
+        # Counters stop changing one step after the longest shortest path
+        self.assertGreaterEqual(approximate["diameter_lower_bound"], exact["diameter"])
+        self.assertEqual(approximate["directed"], directed)
+
+    def test_undirected_within_margin(self):
+        self.compare(random_snapshot(400, 600, 1), directed=False)
+
+    def test_directed_within_margin(self):
+        self.compare(random_snapshot(400, 900, 2), directed=True)
+
+    def test_single_counter_estimates(self):
+        # Counters of one node each estimate about one
+        estimates = _estimate(_initial_registers(np.arange(1000), 7, 0))
+        self.assertTrue(np.allclose(estimates, 1.0, atol=0.01))
+
+    def test_empty_graph(self):
+        snapshot = GraphSnapshot(np.arange(5), np.array([], dtype=np.int64), np.array([], dtype=np.int64), source="test")
+        statistics = asyncio.run(approximate_path_statistics(snapshot, directed=False, runs=2))["statistics"]
+        self.assertEqual(statistics["reachable_pairs"]["estimate"], 0)
+        self.assertEqual(statistics["path_lengths"]["distribution"], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+JobManager parameter validation and de-duplication of identical submissions.
+
+Run with `python -m pytest tests` or `python -m unittest discover tests`.
+"""
+
+import asyncio
+import unittest
+
+from pydantic import ValidationError
+
+from app.api.routes import (
+    AllPairsJobParams,
+    CentralityJobParams,
+    LinkPredictionJobParams,
+)
+from app.methods.jobs import DONE, JobManager
+
+
+class JobParamsTest(unittest.TestCase):
+    def test_route_limits_apply(self):
+        for params in ({"top_k": 0}, {"top_k": 101}, {"method": "katz"}, {"top_k": "many"}):
+            with self.assertRaises(ValidationError):
+                LinkPredictionJobParams.model_validate(params)
+        with self.assertRaises(ValidationError):
+            AllPairsJobParams.model_validate({"mode": "exactly"})
+        self.assertEqual(AllPairsJobParams.model_validate({"mode": "exact"}).mode, "exact")
+
+    def test_jobs_never_write(self):
+        with self.assertRaises(ValidationError):
+            CentralityJobParams.model_validate({"write": True})
+        self.assertFalse(CentralityJobParams.model_validate({"write": False}).write)
+
+    def test_unknown_parameters_are_rejected(self):
+        with self.assertRaises(ValidationError):
+            CentralityJobParams.model_validate({"progress": None})
+
+
+class JobManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+    async def predictions(self, method="adamic_adar", top_k=10, progress=None):
+        self.calls.append((method, top_k))
+        progress(0.5)
+        await asyncio.sleep(0)
+        return {"method": method, "top_k": top_k}
+
+    def manager(self):
+        manager = JobManager(workers=1)
+        manager.register("link-prediction", self.predictions, LinkPredictionJobParams)
+        return manager
+
+    def test_identical_submissions_share_a_job(self):
+        async def run():
+            manager = self.manager()
+            first = manager.submit("link-prediction", {})
+            same = manager.submit("link-prediction", {"method": "adamic_adar", "top_k": 10})
+            other = manager.submit("link-prediction", {"top_k": 5})
+            await asyncio.gather(first.task, other.task)
+            return first, same, other
+
+        first, same, other = asyncio.run(run())
+        self.assertIs(same, first)
+        self.assertIsNot(other, first)
+        self.assertEqual(first.status, DONE)
+        self.assertEqual(first.params, {"method": "adamic_adar", "top_k": 10})
+        self.assertEqual(first.result, {"method": "adamic_adar", "top_k": 10})
+        self.assertEqual(sorted(self.calls), [("adamic_adar", 5), ("adamic_adar", 10)])
+
+    def test_bad_params_raise_before_queueing(self):
+        async def run():
+            manager = self.manager()
+            # Unhashable values are a validation error, not a TypeError
+            for params in ({"top_k": [1, 2]}, {"method": {"a": 1}}, {"top_k": 1000}):
+                with self.assertRaises(ValidationError):
+                    manager.submit("link-prediction", params)
+            with self.assertRaises(KeyError):
+                manager.submit("page-rank", {})
+            return manager.list()
+
+        self.assertEqual(asyncio.run(run()), [])
+        self.assertEqual(self.calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+Landmark (ALT) bounds and paths against plain BFS, and the saved index round trip.
+
+Run with `python -m pytest tests` or `python -m unittest discover tests`.
+"""
+
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from app.methods import landmarks
+from app.methods.graph_snapshot import GraphSnapshot
+from app.methods.landmarks import LandmarkIndex, alt_path, bfs_distances, snapshot_fingerprint
+
+
+def random_snapshot(n, m, seed):
+    rng = np.random.default_rng(seed)
+    # Two separate halves, so some pairs are unreachable in both directions
+    half = n // 2
+    edges = rng.integers(0, half, size=(m, 2))
+    edges[m // 3:] += half
+    return GraphSnapshot(np.arange(n), edges[:, 0], edges[:, 1], source="test")
+
+
+def true_distances(snapshot, source):
+    dist = bfs_distances(snapshot.out_offsets, snapshot.out_neighbors, source).astype(np.int64)
+    return np.where(dist == landmarks.UNREACHABLE, -1, dist)
+
+
+class LandmarkBoundsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.snapshot = random_snapshot(160, 330, 4)
+        cls.indexes = [
+            LandmarkIndex.build(cls.snapshot, k=6, strategy=strategy) for strategy in ("farthest", "degree")
+        ]
+        cls.distances = [true_distances(cls.snapshot, s) for s in range(cls.snapshot.node_count)]
+
+    def test_bounds_hold(self):
+        n = self.snapshot.node_count
+        for index in self.indexes:
+            for s in range(0, n, 3):
+                for t in range(n):
+                    d = self.distances[s][t]
+                    bounds = index.bounds(s, t)
+                    if bounds["reachable"] is False:
+                        self.assertEqual(d, -1, (s, t))
+                        continue
+                    if d < 0:
+                        continue
+                    self.assertLessEqual(bounds["lower_bound"], d, (s, t))
+                    if bounds["upper_bound"] is not None:
+                        self.assertGreaterEqual(bounds["upper_bound"], d, (s, t))
+
+    def test_heuristic_is_admissible(self):
+        nodes = np.arange(self.snapshot.node_count)
+        for index in self.indexes:
+            for t in range(0, self.snapshot.node_count, 5):
+                h = index.heuristic(nodes, t)
+                d = np.array([self.distances[v][t] for v in nodes])
+                reachable = d >= 0
+                self.assertTrue(np.all(h[reachable] <= d[reachable]), t)
+                self.assertTrue(np.all(h[reachable] >= 0), t)
+                # -1 only ever marks nodes that cannot reach t
+                self.assertFalse(np.any((h == -1) & reachable), t)
+
+    def test_alt_path_is_exact(self):
+        rng = np.random.default_rng(9)
+        n = self.snapshot.node_count
+        adjacent = lambda u, v: v in self.snapshot.out_neighbors[self.snapshot.out_offsets[u]:self.snapshot.out_offsets[u + 1]]
+        pairs = rng.integers(0, n, size=(300, 2)).tolist() + [(5, 5), (0, n - 1)]
+        for index in self.indexes:
+            for s, t in pairs:
+                path, _ = alt_path(index, self.snapshot, s, t)
+                d = self.distances[s][t]
+                if d < 0:
+                    self.assertIsNone(path, (s, t))
+                    continue
+                self.assertEqual(len(path) - 1, d, (s, t))
+                self.assertEqual((path[0], path[-1]), (s, t))
+                self.assertTrue(all(adjacent(u, v) for u, v in zip(path, path[1:])), (s, t))
+
+
+class SavedLandmarkIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "landmarks.npz")
+        self.patch = mock.patch.object(landmarks, "LANDMARK_INDEX_PATH", self.path)
+        self.patch.start()
+        landmarks._index = landmarks._index_snapshot = None
+
+    def tearDown(self):
+        self.patch.stop()
+        landmarks._index = landmarks._index_snapshot = None
+        self.dir.cleanup()
+
+    def get_index(self, snapshot):
+        async def current():
+            return snapshot
+
+        with mock.patch.object(landmarks, "get_snapshot", current):
+            return asyncio.run(landmarks.get_landmark_index())
+
+    def test_save_load_round_trip(self):
+        snapshot = random_snapshot(60, 120, 1)
+        index = LandmarkIndex.build(snapshot, k=4)
+        index.save(self.path)
+        loaded = LandmarkIndex.load(self.path)
+        self.assertEqual(loaded.fingerprint, snapshot_fingerprint(snapshot))
+        self.assertEqual(loaded.graph_version, index.graph_version)
+        np.testing.assert_array_equal(loaded.landmarks, index.landmarks)
+        np.testing.assert_array_equal(loaded.from_landmark, index.from_landmark)
+        np.testing.assert_array_equal(loaded.to_landmark, index.to_landmark)
+        self.assertIsNone(LandmarkIndex.load(os.path.join(self.dir.name, "missing.npz")))
+
+    def test_reuses_a_matching_saved_index(self):
+        snapshot = random_snapshot(60, 120, 1)
+        LandmarkIndex.build(snapshot, k=4).save(self.path)
+        same_graph = random_snapshot(60, 120, 1)
+        with mock.patch.object(LandmarkIndex, "build", side_effect=AssertionError("rebuilt")):
+            index, used = self.get_index(same_graph)
+        self.assertIs(used, same_graph)
+        self.assertEqual(len(index.landmarks), 4)
+
+    def test_rejects_a_stale_fingerprint(self):
+        LandmarkIndex.build(random_snapshot(60, 120, 1), k=4).save(self.path)
+        changed = random_snapshot(60, 120, 2)
+        index, _ = self.get_index(changed)
+        fingerprint = snapshot_fingerprint(changed)
+        self.assertEqual(index.fingerprint, fingerprint)
+        fresh = LandmarkIndex.build(changed)
+        np.testing.assert_array_equal(index.from_landmark, fresh.from_landmark)
+        # The rebuilt index replaces the stale file
+        self.assertEqual(LandmarkIndex.load(self.path).fingerprint, fingerprint)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+Sparse link prediction blocks and top-k selection against brute force.
+
+Run with `python -m pytest tests` or `python -m unittest discover tests`.
+"""
+
+import math
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from app.methods import link_prediction
+from app.methods.graph_snapshot import GraphSnapshot
+from app.methods.link_prediction import (
+    LINK_PREDICTION_METHODS,
+    _top_k,
+    recommend_for_all,
+    recommend_for_user,
+    score_block,
+    two_hop_walks,
+)
+
+
+def random_snapshot(n, m, seed):
+    rng = np.random.default_rng(seed)
+    edges = rng.integers(0, n - 3, size=(m, 2))
+    # The last three users have no edges, so no candidates
+    return GraphSnapshot(np.arange(n) + 100, edges[:, 0] + 100, edges[:, 1] + 100, source="test")
+
+
+def brute_force_scores(snapshot):
+    """{(u, v): (common, jaccard, adamic_adar)} over every scorable pair, by index."""
+    n = snapshot.node_count
+    und = [set(snapshot.und_neighbors[snapshot.und_offsets[i]:snapshot.und_offsets[i + 1]].tolist()) for i in range(n)]
+    out = [set(snapshot.out_neighbors[snapshot.out_offsets[i]:snapshot.out_offsets[i + 1]].tolist()) for i in range(n)]
+    scores = {}
+    for u in range(n):
+        for v in range(n):
+            common = und[u] & und[v]
+            if u == v or v in out[u] or not common:
+                continue
+            adamic_adar = sum(1 / math.log(len(und[w])) for w in common if len(und[w]) > 1)
+            scores[u, v] = (len(common), len(common) / len(und[u] | und[v]), adamic_adar)
+    return scores
+
+
+def brute_force_top_k(scores, u, method, top_k):
+    column = LINK_PREDICTION_METHODS.index(method)
+    ranked = sorted(
+        ((score[column], v) for (s, v), score in scores.items() if s == u),
+        key=lambda item: (-item[0], item[1]),
+    )
+    return ranked[:top_k]
+
+
+class LinkPredictionTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.snapshot = random_snapshot(80, 200, 6)
+        cls.scores = brute_force_scores(cls.snapshot)
+
+    def test_score_block_matches_brute_force(self):
+        n = self.snapshot.node_count
+        rows = np.arange(n)
+        block = score_block(self.snapshot, rows)
+        found = {}
+        for i in range(len(block["row"])):
+            key = (int(rows[block["row"][i]]), int(block["column"][i]))
+            self.assertNotIn(key, found)
+            found[key] = (int(block["common_neighbors"][i]), block["jaccard"][i], block["adamic_adar"][i])
+        self.assertEqual(set(found), set(self.scores))
+        for key, (common, jaccard, adamic_adar) in found.items():
+            expected = self.scores[key]
+            self.assertEqual(common, expected[0], key)
+            self.assertAlmostEqual(jaccard, expected[1], places=9, msg=key)
+            self.assertAlmostEqual(adamic_adar, expected[2], places=9, msg=key)
+
+    def test_excludes_self_and_followed_users(self):
+        block = score_block(self.snapshot, np.arange(self.snapshot.node_count))
+        for row, column in zip(block["row"].tolist(), block["column"].tolist()):
+            self.assertNotEqual(row, column)
+            following = self.snapshot.out_neighbors[self.snapshot.out_offsets[row]:self.snapshot.out_offsets[row + 1]]
+            self.assertNotIn(column, following)
+
+    def test_top_k_of_a_block(self):
+        rows = np.array([5, 0, 77, 12])
+        block = score_block(self.snapshot, rows)
+        for method in LINK_PREDICTION_METHODS:
+            best = _top_k(block, method, 3)
+            for position, u in enumerate(rows.tolist()):
+                picked = best[block["row"][best] == position]
+                expected = brute_force_top_k(self.scores, u, method, 3)
+                self.assertEqual(block["column"][picked].tolist(), [v for _, v in expected], (method, u))
+
+    def test_recommend_for_user(self):
+        ids = self.snapshot.ids
+        for u in (0, 7, self.snapshot.node_count - 1):
+            candidates = recommend_for_user(self.snapshot, int(ids[u]), "jaccard", top_k=5)
+            expected = brute_force_top_k(self.scores, u, "jaccard", 5)
+            self.assertEqual([c["id"] for c in candidates], [int(ids[v]) for _, v in expected])
+        self.assertEqual(recommend_for_user(self.snapshot, -1), [])
+
+    def test_recommend_for_all_in_small_blocks(self):
+        ids = self.snapshot.ids
+        # Force many blocks, including rows heavier than a whole block
+        with mock.patch.object(link_prediction, "LINK_PREDICTION_BLOCK_WALKS", 25):
+            result = recommend_for_all(self.snapshot, "adamic_adar", top_k=4)
+        self.assertGreater(result["metrics"]["blocks"], 5)
+        self.assertEqual([user["user"] for user in result["users"]], ids.tolist())
+        for u, user in enumerate(result["users"]):
+            expected = brute_force_top_k(self.scores, u, "adamic_adar", 4)
+            self.assertEqual(user["candidates"], [int(ids[v]) for _, v in expected], u)
+            self.assertEqual(user["scores"], [round(score, 6) for score, _ in expected], u)
+        # Users without edges get empty rows
+        self.assertEqual(result["users"][-1], {"user": int(ids[-1]), "candidates": [], "scores": []})
+
+    def test_two_hop_walks(self):
+        degree = np.diff(self.snapshot.und_offsets)
+        expected = [
+            sum(degree[w] for w in self.snapshot.und_neighbors[self.snapshot.und_offsets[u]:self.snapshot.und_offsets[u + 1]])
+            for u in range(self.snapshot.node_count)
+        ]
+        self.assertEqual(two_hop_walks(self.snapshot).tolist(), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+InstrumentedSession labels: query_name, caller fallback, and `$name` parameters
+passed through to Neo4j.
+
+Run with `python -m pytest tests` or `python -m unittest discover tests`.
+"""
+
+import asyncio
+import unittest
+
+from app.db.metrics import neo4j_query_errors, neo4j_query_seconds
+from app.db.neo4j_connection import InstrumentedSession
+
+
+class FakeSession:
+    def __init__(self):
+        self.calls = []
+
+    async def run(self, query, *args, **kwargs):
+        self.calls.append((query, args, kwargs))
+        return "result"
+
+    async def execute_write(self, transaction_function, *args, **kwargs):
+        self.calls.append((transaction_function, args, kwargs))
+        return await transaction_function("tx", *args, **kwargs)
+
+
+async def add_user(tx, name):
+    return name
+
+
+async def failing(tx):
+    raise ValueError("boom")
+
+
+class InstrumentedSessionTest(unittest.TestCase):
+    def count(self, label):
+        series = neo4j_query_seconds.series.get((label,))
+        return series[2] if series else 0
+
+    def test_name_parameter_reaches_the_query(self):
+        fake = FakeSession()
+        session = InstrumentedSession(fake)
+        before = self.count("user_by_name")
+        result = asyncio.run(
+            session.run("MATCH (u:User {name: $name}) RETURN u", name="Ada", query_name="user_by_name")
+        )
+        self.assertEqual(result, "result")
+        self.assertEqual(fake.calls[0][2], {"name": "Ada"})
+        self.assertEqual(self.count("user_by_name"), before + 1)
+
+    def test_label_defaults_to_the_caller(self):
+        session = InstrumentedSession(FakeSession())
+
+        async def lookup_artist():
+            return await session.run("RETURN 1")
+
+        before = self.count("lookup_artist")
+        asyncio.run(lookup_artist())
+        self.assertEqual(self.count("lookup_artist"), before + 1)
+
+    def test_transaction_functions(self):
+        fake = FakeSession()
+        session = InstrumentedSession(fake)
+        before = self.count("add_user")
+        self.assertEqual(asyncio.run(session.execute_write(add_user, name="Ada")), "Ada")
+        self.assertEqual(self.count("add_user"), before + 1)
+
+        errors = neo4j_query_errors.values.get(("failing_write",), 0)
+        with self.assertRaises(ValueError):
+            asyncio.run(session.execute_write(failing, query_name="failing_write"))
+        self.assertEqual(neo4j_query_errors.values[("failing_write",)], errors + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
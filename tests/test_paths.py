@@ -0,0 +1,90 @@
+"""
+Bidirectional and batched single-source shortest paths against plain BFS.
+
+Run with `python -m pytest tests` or `python -m unittest discover tests`.
+"""
+
+import unittest
+from collections import deque
+
+import numpy as np
+
+from app.methods.graph_snapshot import GraphSnapshot
+from app.methods.paths import (
+    SINGLE_SOURCE_MIN_TARGETS,
+    batch_paths,
+    bidirectional_path,
+    single_source_paths,
+)
+
+
+def random_snapshot(n, m, seed):
+    rng = np.random.default_rng(seed)
+    edges = rng.integers(0, n - 10, size=(m, 2))
+    # The last ten IDs are isolated; IDs are spaced so indices and IDs differ
+    return GraphSnapshot(np.arange(n) * 3 + 1, edges[:, 0] * 3 + 1, edges[:, 1] * 3 + 1, source="test")
+
+
+def plain_distances(snapshot, source):
+    distance = {source: 0}
+    queue = deque([source])
+    while queue:
+        u = queue.popleft()
+        for v in snapshot.out_neighbors[snapshot.out_offsets[u]:snapshot.out_offsets[u + 1]]:
+            v = int(v)
+            if v not in distance:
+                distance[v] = distance[u] + 1
+                queue.append(v)
+    return distance
+
+
+class PathsTest(unittest.TestCase):
+    def setUp(self):
+        self.snapshot = random_snapshot(200, 360, 5)
+        self.rng = np.random.default_rng(11)
+
+    def assertShortest(self, source, target, path, distance):
+        if distance is None:
+            self.assertIsNone(path, (source, target))
+            return
+        self.assertIsNotNone(path, (source, target))
+        self.assertEqual(len(path) - 1, distance, (source, target))
+        self.assertEqual((path[0], path[-1]), (source, target))
+        for u, v in zip(path, path[1:]):
+            self.assertIn(v, self.snapshot.out_neighbors[self.snapshot.out_offsets[u]:self.snapshot.out_offsets[u + 1]])
+
+    def test_bidirectional_matches_bfs(self):
+        n = self.snapshot.node_count
+        unreachable = 0
+        for source, target in self.rng.integers(0, n, size=(400, 2)).tolist() + [(7, 7), (n - 1, 0), (0, n - 1)]:
+            distance = plain_distances(self.snapshot, source).get(target)
+            unreachable += distance is None
+            self.assertShortest(source, target, bidirectional_path(self.snapshot, source, target), distance)
+        self.assertGreater(unreachable, 0)
+
+    def test_single_source_matches_bfs(self):
+        n = self.snapshot.node_count
+        for source in self.rng.integers(0, n, size=20).tolist():
+            targets = self.rng.integers(0, n, size=30).tolist() + [source, n - 1]
+            distances = plain_distances(self.snapshot, source)
+            found = single_source_paths(self.snapshot, source, targets)
+            for target in targets:
+                self.assertShortest(source, target, found[target], distances.get(target))
+
+    def test_batch_switches_to_single_source(self):
+        snapshot, n = self.snapshot, self.snapshot.node_count
+        many = [(3, int(t)) for t in self.rng.integers(0, n, size=SINGLE_SOURCE_MIN_TARGETS + 4)] + [(3, 3)]
+        few = [(int(s), int(t)) for s, t in self.rng.integers(0, n, size=(SINGLE_SOURCE_MIN_TARGETS - 1, 2))]
+        pairs = many + few
+        ids = [(int(snapshot.ids[s]), int(snapshot.ids[t])) for s, t in pairs]
+        ids += [(snapshot.ids[0], 2), (0, snapshot.ids[0])]  # IDs not in the graph
+
+        results = batch_paths(snapshot, ids)
+        self.assertEqual(results[-2:], [None, None])
+        for (source, target), result in zip(pairs, results):
+            path = None if result is None else [snapshot.index_of(user_id) for user_id in result]
+            self.assertShortest(source, target, path, plain_distances(snapshot, source).get(target))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+"""
+MinHash/LSH taste index on a toy user -> artist matrix: recall, exact re-ranking
+and the saved index.
+
+Run with `python -m pytest tests` or `python -m unittest discover tests`.
+"""
+
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from app.methods import taste_index
+from app.methods.taste_index import TasteIndex
+
+
+def toy_top_artists(seed=0):
+    """
+    Users in small groups whose top-10 lists overlap heavily, plus noise users
+    and one user without artists.
+    """
+    rng = np.random.default_rng(seed)
+    top_artists = {}
+    user = 1000
+    for group in range(40):
+        base = rng.choice(2000, size=10, replace=False)
+        for _ in range(4):
+            artists = base.copy()
+            swapped = rng.integers(0, 3)
+            artists[:swapped] = rng.choice(2000, size=swapped, replace=False)
+            top_artists[user] = artists.tolist()
+            user += 1
+    for _ in range(60):
+        top_artists[user] = rng.choice(2000, size=10, replace=False).tolist()
+        user += 1
+    top_artists[user] = []
+    return top_artists
+
+
+def jaccard(a, b):
+    a, b = set(a), set(b)
+    return len(a & b) / len(a | b) if a | b else 0.0
+
+
+class TasteIndexTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.top_artists = toy_top_artists()
+        cls.index = TasteIndex.build(cls.top_artists, permutations=128, bands=32, rows=4)
+        cls.users = sorted(cls.top_artists)
+
+    def test_minhash_estimates_jaccard(self):
+        errors = []
+        signatures = self.index.signatures
+        for i, u in enumerate(self.users[:80]):
+            for j, v in enumerate(self.users[:80]):
+                if i < j and self.top_artists[u] and self.top_artists[v]:
+                    estimate = (signatures[i] == signatures[j]).mean()
+                    errors.append(abs(estimate - jaccard(self.top_artists[u], self.top_artists[v])))
+        # One standard error at J = 0.5 with 128 permutations is about 0.044
+        self.assertLess(np.mean(errors), 0.03)
+        self.assertLess(np.max(errors), 0.2)
+
+    def test_lsh_recall_of_similar_pairs(self):
+        similar_pairs = found = 0
+        for i, u in enumerate(self.users):
+            candidates = set(self.index.candidates(i).tolist())
+            self.assertNotIn(i, candidates)
+            for j, v in enumerate(self.users):
+                if i != j and jaccard(self.top_artists[u], self.top_artists[v]) >= 0.6:
+                    similar_pairs += 1
+                    found += j in candidates
+        self.assertGreater(similar_pairs, 100)
+        # A J = 0.6 pair shares a band with probability 1 - (1 - 0.6^4)^32, about 0.99
+        self.assertGreaterEqual(found / similar_pairs, 0.95)
+
+    def test_similar_reranks_by_exact_jaccard(self):
+        for i, u in enumerate(self.users[:60]):
+            result = self.index.similar(u, top_k=5)
+            candidates = self.index.candidates(i)
+            self.assertEqual(result["candidates_examined"], len(candidates))
+            expected = sorted(
+                (-jaccard(self.top_artists[u], self.top_artists[self.users[c]]), self.users[c])
+                for c in candidates.tolist()
+            )
+            scores = [row["jaccard"] for row in result["similar"]]
+            self.assertEqual(scores, sorted(scores, reverse=True))
+            self.assertEqual(scores, [round(-score, 4) for score, _ in expected[:5]])
+            for row in result["similar"]:
+                self.assertEqual(row["jaccard"], round(jaccard(self.top_artists[u], self.top_artists[row["id"]]), 4))
+                self.assertEqual(
+                    row["shared_artists"], len(set(self.top_artists[u]) & set(self.top_artists[row["id"]]))
+                )
+
+    def test_users_without_artists_and_unknown_users(self):
+        empty = self.users[-1]
+        self.assertEqual(self.index.similar(empty)["similar"], [])
+        self.assertIsNone(self.index.similar(-5))
+        rows = {row["user"]: row for row in self.index.all_similar(3)["users"]}
+        self.assertEqual(rows[empty]["similar"], [])
+
+    def test_all_similar_finds_group_members(self):
+        result = self.index.all_similar(top_k=3)
+        self.assertIs(self.index.all_similar(top_k=3), result)
+        rows = {row["user"]: row for row in result["users"]}
+        for u in self.users[:160]:  # grouped users
+            row = rows[u]
+            self.assertLessEqual(len(row["similar"]), 3)
+            self.assertEqual(row["estimated_jaccard"], sorted(row["estimated_jaccard"], reverse=True))
+            group = {v for v in self.users[:160] if (v - 1000) // 4 == (u - 1000) // 4 and v != u}
+            best = row["similar"][0]
+            self.assertIn(best, group, u)
+
+
+class SavedTasteIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "taste_index.npz")
+        self.patch = mock.patch.object(taste_index, "TASTE_INDEX_PATH", self.path)
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        self.dir.cleanup()
+
+    def test_round_trip(self):
+        index = TasteIndex.build(toy_top_artists(1), source_hash="abc")
+        index.save(self.path)
+        loaded = TasteIndex.load(self.path)
+        for name in ("ids", "artist_offsets", "artists", "signatures"):
+            np.testing.assert_array_equal(getattr(loaded, name), getattr(index, name))
+        self.assertEqual((loaded.bands, loaded.rows, loaded.source_hash), (index.bands, index.rows, "abc"))
+        for user_id in index.ids[:20].tolist():
+            self.assertEqual(loaded.similar(user_id), index.similar(user_id))
+
+    def test_saved_index_must_match_source_and_settings(self):
+        TasteIndex.build(toy_top_artists(1), source_hash="abc").save(self.path)
+        self.assertIsNotNone(asyncio.run(taste_index._load_saved("abc")))
+        self.assertIsNone(asyncio.run(taste_index._load_saved("changed")))
+        with mock.patch.object(taste_index, "LSH_BANDS", 16):
+            self.assertIsNone(asyncio.run(taste_index._load_saved("abc")))
+        os.remove(self.path)
+        self.assertIsNone(asyncio.run(taste_index._load_saved("abc")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+"""
+Triangle enumeration and the country analyses against brute force.
+
+Run with `python -m pytest tests` or `python -m unittest discover tests`.
+"""
+
+import itertools
+import os
+import unittest
+from collections import Counter
+from unittest import mock
+
+import numpy as np
+
+from app.methods import triangles
+from app.methods.graph_snapshot import EDGES_FILE, GraphSnapshot, load_snapshot_from_csv
+from app.methods.triangles import GROUP_NAMES, country_triangle_analysis, enumerate_triangles
+
+
+def random_snapshot(n, m, seed):
+    rng = np.random.default_rng(seed)
+    edges = rng.integers(0, n, size=(m, 2))
+    # Make some follows reciprocal, which must not count a triangle twice
+    edges = np.concatenate([edges, edges[: m // 3, ::-1]])
+    return GraphSnapshot(np.arange(n), edges[:, 0], edges[:, 1], source="test")
+
+
+def brute_force_triangles(snapshot):
+    adjacent = [set(snapshot.und_neighbors[snapshot.und_offsets[i]:snapshot.und_offsets[i + 1]])
+                for i in range(snapshot.node_count)]
+    return {
+        (a, b, c)
+        for a, b, c in itertools.combinations(range(snapshot.node_count), 3)
+        if b in adjacent[a] and c in adjacent[a] and c in adjacent[b]
+    }
+
+
+class EnumerateTrianglesTest(unittest.TestCase):
+    def test_matches_brute_force(self):
+        for seed, (n, m) in enumerate([(8, 20), (40, 200), (60, 900)]):
+            snapshot = random_snapshot(n, m, seed)
+            found = [tuple(sorted(t)) for t in enumerate_triangles(snapshot).tolist()]
+            self.assertEqual(len(found), len(set(found)))
+            self.assertEqual(set(found), brute_force_triangles(snapshot))
+
+    def test_chunked_wedges_give_the_same_triangles(self):
+        snapshot = random_snapshot(60, 900, 7)
+        expected = brute_force_triangles(snapshot)
+        with mock.patch.object(triangles, "WEDGE_CHUNK", 5):
+            found = {tuple(sorted(t)) for t in enumerate_triangles(snapshot).tolist()}
+        self.assertEqual(found, expected)
+
+    def test_graph_without_triangles(self):
+        snapshot = GraphSnapshot(np.arange(4), np.array([0, 1, 2]), np.array([1, 2, 3]), source="test")
+        self.assertEqual(enumerate_triangles(snapshot).shape, (0, 3))
+
+    @unittest.skipUnless(os.path.exists(EDGES_FILE), "LastFM Asia edge list not available")
+    def test_lastfm_asia_triangle_count(self):
+        snapshot = load_snapshot_from_csv()
+        self.assertEqual(len(enumerate_triangles(snapshot)), 40433)
+
+
+class CountryTriangleAnalysisTest(unittest.TestCase):
+    def test_matches_brute_force(self):
+        snapshot = random_snapshot(40, 250, 3)
+        rng = np.random.default_rng(3)
+        codes = np.array([rng.choice(["DE", "FR", "GB", None]) for _ in range(40)], dtype=object)
+
+        pairs, triples = Counter(), Counter()
+        for tri in brute_force_triangles(snapshot):
+            countries = [codes[i] for i in tri]
+            for a, b in itertools.combinations(countries, 2):
+                if a is not None and b is not None:
+                    pairs[tuple(sorted((a, b)))] += 1
+            triples[tuple(sorted(countries, key=lambda c: (c is not None, c or "")))] += 1
+
+        result = country_triangle_analysis(snapshot, codes)
+        pairwise = {
+            (row["countryA"], row["countryB"]): row["frequency"]
+            for row in result["pairwise_analysis"]["data"]
+        }
+        self.assertEqual(pairwise, dict(pairs))
+        grouped = {
+            tuple(row["countriesInvolved"]): row for row in result["grouped_analysis"]["data"]
+        }
+        self.assertEqual({k: row["triangleCount"] for k, row in grouped.items()}, dict(triples))
+        for key, row in grouped.items():
+            self.assertEqual(row["countryGroup"], GROUP_NAMES[len(set(key))])
+        self.assertEqual(
+            result["grouped_analysis"]["metrics"]["triangle_count"], sum(triples.values())
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()